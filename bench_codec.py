@@ -0,0 +1,258 @@
+"""Compare the quant.pyx bit-packing codec with the record.py JPEG paths.
+
+    python setup.py build_ext --inplace        # builds quant
+    python bench_codec.py [--video fpv.mp4] [--out bench_codec.json]
+    python bench_codec.py --compare old.json   # exit 1 on regressions
+
+Every codec/setting runs on the same frames at every resolution and
+reports encode and decode throughput (MB/s of raw BGR pixels), bytes per
+frame and PSNR against the original frame. "jpeg-yuv" is record.py's
+yuv420 encoder backend: its input is converted to I420 before timing, as
+the camera would deliver it, and "in" shows the input bytes per frame."""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import quant
+except ImportError:
+    quant = None
+
+try:
+    import lz4.frame as lz4f
+except ImportError:
+    lz4f = None
+
+import encoder
+
+RESOLUTIONS    = [(720, 480), (320, 320)]   # record.py default, README figures
+JPEG_QUALITIES = [50, 75, 90]
+QUANT_LAYOUTS  = [[5, 6, 5], [4, 4, 4], [3, 3, 2]]
+SYNTH_FRAMES   = 8
+MIN_TIME_S     = 0.5    # repeat each measurement at least this long
+REGRESS_TOL    = 0.10   # relative slowdown / growth flagged by --compare
+
+
+def _synthetic(w: int, h: int, n: int) -> list[np.ndarray]:
+    """Moving gradient + sensor-like noise: compressible but not trivial."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    frames = []
+    for i in range(n):
+        b = 128 + 100 * np.sin((x + 4 * i) / 37.0)
+        g = 128 + 100 * np.cos((y - 3 * i) / 23.0)
+        r = (x + y + 8 * i) % 256
+        img = np.stack([b, g, r], axis=-1) + rng.normal(0, 6, (h, w, 3))
+        frames.append(img.clip(0, 255).astype(np.uint8))
+    return frames
+
+
+def _recorded(path: str, w: int, h: int, n: int) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or n
+    step  = max(1, total // n)
+    frames = []
+    for i in range(n):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i * step)
+        ok, raw = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(raw, (w, h)))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No frames read from {path}")
+    return frames
+
+
+def _psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float("inf") if mse == 0 else float(10.0 * np.log10(255.0 ** 2 / mse))
+
+
+def _nbytes(frame) -> int:
+    return sum(p.nbytes for p in frame) if isinstance(frame, tuple) else frame.nbytes
+
+
+def _timed(fn, items: list) -> tuple[float, list]:
+    """Run fn over items repeatedly for at least MIN_TIME_S; return seconds
+    per pass and the outputs of the last pass."""
+    passes = 0
+    t0 = time.perf_counter()
+    while True:
+        out = [fn(x) for x in items]
+        passes += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= MIN_TIME_S:
+            return elapsed / passes, out
+
+
+def _codecs(w: int, h: int):
+    """Yield (codec, setting, encode_fn, decode_fn, prepare_fn). prepare_fn
+    (untimed) turns a BGR frame into the encoder's input, or is None."""
+    for q in JPEG_QUALITIES:
+        params = [cv2.IMWRITE_JPEG_QUALITY, q]
+
+        def enc(img, params=params):
+            ok, buf = cv2.imencode('.jpg', img, params)
+            if not ok:
+                raise RuntimeError("JPEG encode failed")
+            return buf
+
+        def dec(buf):
+            return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+        yield "jpeg", f"q{q}", enc, dec, None
+
+    if encoder.simplejpeg is not None:
+        yuv = encoder.Yuv420Encoder(w, h)
+        for q in JPEG_QUALITIES:
+            def enc_yuv(frame, q=q):
+                return yuv.encode(frame, q)
+
+            def dec_yuv(buf):
+                return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+            yield "jpeg-yuv", f"q{q}", enc_yuv, dec_yuv, yuv.from_bgr
+
+    if quant is None:
+        return
+    for bits in QUANT_LAYOUTS:
+        out = np.empty((h, w, 3), np.uint8)
+
+        def enc(img, bits=bits):
+            return quant.quantize_and_pack(img, bits)
+
+        def dec(packed, bits=bits, out=out):
+            # Copy so every decoded frame survives for the PSNR pass.
+            return quant.unpack_dequantize(packed, bits, h, w, out=out).copy()
+
+        setting = "".join(map(str, bits))
+        yield "quant", setting, enc, dec, None
+
+        if lz4f is not None:
+            def enc_lz4(img, bits=bits):
+                return lz4f.compress(quant.quantize_and_pack(img, bits))
+
+            def dec_lz4(blob, bits=bits, out=out):
+                packed = np.frombuffer(lz4f.decompress(blob), np.uint8)
+                return quant.unpack_dequantize(packed, bits, h, w, out=out).copy()
+
+            yield "quant+lz4", setting, enc_lz4, dec_lz4, None
+
+
+def run(sources: dict[str, object]) -> list[dict]:
+    results = []
+    for w, h in RESOLUTIONS:
+        for source, load in sources.items():
+            frames = load(w, h)
+            raw_mb = sum(f.nbytes for f in frames) / 1e6
+            for codec, setting, enc, dec, prepare in _codecs(w, h):
+                inputs = [prepare(f) for f in frames] if prepare else frames
+                t_enc, blobs = _timed(enc, inputs)
+                t_dec, decoded = _timed(dec, blobs)
+                row = {
+                    "source":       source,
+                    "resolution":   f"{w}x{h}",
+                    "codec":        codec,
+                    "setting":      setting,
+                    "encode_mb_s":  raw_mb / t_enc,
+                    "decode_mb_s":  raw_mb / t_dec,
+                    "bytes_frame":  sum(len(b) for b in blobs) / len(blobs),
+                    "input_bytes":  _nbytes(inputs[0]),
+                    "psnr_db":      float(np.mean([_psnr(a, b) for a, b in zip(frames, decoded)])),
+                }
+                results.append(row)
+                print(f"{source:9s} {w}x{h:<4d} {codec:9s} {setting:4s}"
+                      f"  enc {row['encode_mb_s']:7.1f} MB/s"
+                      f"  dec {row['decode_mb_s']:7.1f} MB/s"
+                      f"  {row['bytes_frame'] / 1024:7.1f} KB/frame"
+                      f"  {row['psnr_db']:5.1f} dB"
+                      f"  in {row['input_bytes'] / 1024:5.0f} KB", flush=True)
+    return results
+
+
+def _key(row: dict) -> tuple:
+    return row["source"], row["resolution"], row["codec"], row["setting"]
+
+
+def compare(old: list[dict], new: list[dict], tol: float) -> list[str]:
+    """Regressions: throughput down or size up by more than tol, PSNR down
+    by more than 0.5 dB."""
+    prev = {_key(r): r for r in old}
+    problems = []
+    for row in new:
+        ref = prev.get(_key(row))
+        if ref is None:
+            continue
+        name = " ".join(_key(row))
+        for field in ("encode_mb_s", "decode_mb_s"):
+            if row[field] < ref[field] * (1.0 - tol):
+                problems.append(f"{name}: {field} {ref[field]:.1f} -> {row[field]:.1f}")
+        if row["bytes_frame"] > ref["bytes_frame"] * (1.0 + tol):
+            problems.append(f"{name}: bytes_frame {ref['bytes_frame']:.0f} -> {row['bytes_frame']:.0f}")
+        if row["psnr_db"] < ref["psnr_db"] - 0.5:
+            problems.append(f"{name}: psnr_db {ref['psnr_db']:.2f} -> {row['psnr_db']:.2f}")
+    return problems
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--video", default=None, help="recorded input, e.g. fpv.mp4 (DEBUG_VIDEO)")
+    ap.add_argument("--frames", type=int, default=SYNTH_FRAMES)
+    ap.add_argument("--out", default="bench_codec.json")
+    ap.add_argument("--compare", default=None, help="previous results file")
+    ap.add_argument("--tolerance", type=float, default=REGRESS_TOL)
+    args = ap.parse_args()
+
+    if quant is None:
+        print("quant not built (python setup.py build_ext --inplace); JPEG only", file=sys.stderr)
+    if lz4f is None:
+        print("lz4 not installed; skipping quant+lz4", file=sys.stderr)
+    if encoder.simplejpeg is None:
+        print("simplejpeg not installed; skipping jpeg-yuv", file=sys.stderr)
+
+    sources = {"synthetic": lambda w, h: _synthetic(w, h, args.frames)}
+    if args.video:
+        sources["recorded"] = lambda w, h: _recorded(args.video, w, h, args.frames)
+
+    results = run(sources)
+    with open(args.out, "w") as f:
+        json.dump({
+            "commit":  _commit(),
+            "time":    time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.machine(),
+            "python":  platform.python_version(),
+            "opencv":  cv2.__version__,
+            "results": results,
+        }, f, indent=1)
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        problems = compare(old, results, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
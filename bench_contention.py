@@ -0,0 +1,175 @@
+"""Send-loop jitter with sensor work in-process (threads) vs in a separate process.
+
+    python setup.py build_ext --inplace     # builds fusion (kernel + seqlock)
+    python bench_contention.py [--seconds 10] [--fps 60] [--python-fusion]
+
+A 60 fps loop stands in for the record.py send loop: sleep to the next
+frame deadline, read the fused state, pack a packet. Sensor load is
+synthetic but follows sensors.py: a 1 kHz IMU drained every IMU_POLL_S into
+datafussion.update_imu_batch, NMEA sentences parsed at 10 Hz, a GPS anchor
+every GPS_ANCHOR_S. Modes:
+
+    idle      no sensor load (floor)
+    threads   load on threads in this process, state via datafussion.get_fused
+    process   load in a child process, state via datafussion.SharedFused
+
+Reports wake-up lateness past each deadline and the cost of reading the
+state, in microseconds. --python-fusion forces the per-sample Python filter
+to show the GIL-bound worst case."""
+
+import argparse
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+import datafussion
+import sensors
+from bench_fusion import synthetic_imu
+from gps import GNSSRecord, parse_sentence
+from packet import PacketRing
+
+JPEG_BYTES = 60_000
+GPS_HZ     = 10
+
+
+def _nmea(body: str) -> str:
+    checksum = 0
+    for ch in body:
+        checksum ^= ord(ch)
+    return f"${body}*{checksum:02X}"
+
+
+NMEA = (
+    _nmea("GNRMC,123519.00,A,4807.03800,N,01131.00000,E,022.4,084.4,230394,,,A"),
+    _nmea("GNGGA,123519.00,4807.03800,N,01131.00000,E,1,08,0.9,545.4,M,46.9,M,,"),
+)
+
+
+def _imu_load(stop, on_update=None) -> None:
+    n = int(sensors.IMU_RATE_HZ * sensors.IMU_POLL_S)
+    t, acc, gyr = synthetic_imu(n * 1000)
+    i = 0
+    while not stop.is_set():
+        if i + n > len(t):
+            i = 0
+        # Fresh timestamps so every sample integrates with a real dt.
+        ts = time.monotonic() - sensors.IMU_POLL_S + (t[i:i + n] - t[i])
+        datafussion.update_imu_batch(ts, acc[i:i + n], gyr[i:i + n])
+        if on_update is not None:
+            on_update()
+        i += n
+        time.sleep(sensors.IMU_POLL_S)
+
+
+def _gps_load(stop) -> None:
+    t_anchor = 0.0
+    while not stop.is_set():
+        rec = GNSSRecord()
+        for line in NMEA:
+            parse_sentence(line, rec)
+        now = time.monotonic()
+        if now - t_anchor >= sensors.GPS_ANCHOR_S:
+            t_anchor = now
+            datafussion.anchor((rec.latitude, rec.longitude, rec.altitude_m), (0.0, 0.0, 0.0),
+                               rec.fix_quality)
+        time.sleep(1.0 / GPS_HZ)
+
+
+def _start_load(stop, on_update=None) -> list[threading.Thread]:
+    threads = [threading.Thread(target=_imu_load, args=(stop, on_update), daemon=True),
+               threading.Thread(target=_gps_load, args=(stop,), daemon=True)]
+    for th in threads:
+        th.start()
+    return threads
+
+
+def _child(shm_name: str, stop, python_fusion: bool) -> None:
+    if python_fusion:
+        datafussion.fuse_imu = None
+    shared = datafussion.SharedFused(shm_name)
+    threads = _start_load(stop, lambda: shared.publish(datafussion.get_fused()))
+    stop.wait()
+    for th in threads:
+        th.join(timeout=1)
+    shared.close()
+
+
+def send_loop(read, seconds: float, fps: float) -> tuple[np.ndarray, np.ndarray]:
+    """Lateness past each frame deadline and read() cost, both in us."""
+    ring   = PacketRing()
+    jpeg   = np.zeros(JPEG_BYTES, np.uint8)
+    frames = int(seconds * fps)
+    late   = np.empty(frames)
+    cost   = np.empty(frames)
+    period = 1.0 / fps
+    deadline = time.perf_counter() + period
+    for k in range(frames):
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        late[k] = (t0 - deadline) * 1e6
+        f = read()
+        t1 = time.perf_counter()
+        cost[k] = (t1 - t0) * 1e6
+        ring.pack(jpeg, 720, 480, (f.pos_x, f.pos_y, f.pos_z), (f.vel_x, f.vel_y, f.vel_z),
+                  (f.acc_x, f.acc_y, f.acc_z), (f.gyr_x, f.gyr_y, f.gyr_z),
+                  f.rot_x, f.rot_y, f.rot_z, float(f.gps_fix))
+        # Keep the schedule; a late frame does not shift later deadlines.
+        deadline += period
+    return late, cost
+
+
+def run(mode: str, seconds: float, fps: float, python_fusion: bool) -> tuple[np.ndarray, np.ndarray]:
+    if mode == "idle":
+        return send_loop(datafussion.get_fused, seconds, fps)
+
+    if mode == "threads":
+        kernel = datafussion.fuse_imu
+        if python_fusion:
+            datafussion.fuse_imu = None
+        stop = threading.Event()
+        threads = _start_load(stop)
+        try:
+            return send_loop(datafussion.get_fused, seconds, fps)
+        finally:
+            stop.set()
+            for th in threads:
+                th.join(timeout=1)
+            datafussion.fuse_imu = kernel
+
+    mp     = multiprocessing.get_context("fork")
+    shared = datafussion.SharedFused(create=True)
+    stop   = mp.Event()
+    proc   = mp.Process(target=_child, args=(shared.name, stop, python_fusion), daemon=True)
+    proc.start()
+    try:
+        return send_loop(shared.read, seconds, fps)
+    finally:
+        stop.set()
+        proc.join(timeout=3)
+        shared.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=10.0, help="per mode")
+    ap.add_argument("--fps", type=float, default=60.0)
+    ap.add_argument("--python-fusion", action="store_true", help="disable the compiled fusion kernel")
+    ap.add_argument("--modes", default="idle,threads,process")
+    args = ap.parse_args()
+
+    if datafussion.fuse_imu is None and not args.python_fusion:
+        print("fusion not built (python setup.py build_ext --inplace); using Python fallbacks")
+    for mode in args.modes.split(","):
+        late, cost = run(mode, args.seconds, args.fps, args.python_fusion)
+        lp = np.percentile(late, (50, 99))
+        cp = np.percentile(cost, (50, 99))
+        print(f"{mode:8s} late p50 {lp[0]:7.0f}  p99 {lp[1]:7.0f}  max {late.max():7.0f} us"
+              f"   read p50 {cp[0]:5.1f}  p99 {cp[1]:6.1f} us", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""IMU fusion throughput: per-sample update_imu vs update_imu_batch.
+
+    python setup.py build_ext --inplace     # builds fusion
+    python bench_fusion.py [--samples N] [--batch B]
+
+Feeds the same synthetic 1 kHz IMU stream (gentle rotation, vibration,
+stationary stretches) through each path from the same initial state and
+reports samples per second plus the largest difference from the
+per-sample result."""
+
+import argparse
+import time
+
+import numpy as np
+
+import datafussion
+from gyro import GyroRecord
+
+RATE_HZ = 1000.0
+
+
+def synthetic_imu(n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    t = 1_000_000.0 + np.arange(n) / RATE_HZ
+    phase = 2 * np.pi * 0.2 * (t - t[0])
+    moving = (np.sin(phase / 7) > 0).astype(np.float32)
+    gyr = np.stack([0.3 * np.sin(phase), 0.2 * np.cos(phase), 0.1 * np.sin(phase / 3)], axis=1)
+    gyr = (gyr * moving[:, None] + rng.normal(0, 0.005, (n, 3))).astype(np.float32)
+    acc = np.stack([0.5 * np.sin(phase), 0.4 * np.cos(phase), np.full(n, datafussion.G)], axis=1)
+    acc[:, :2] *= moving[:, None]
+    acc = (acc + rng.normal(0, 0.05, (n, 3))).astype(np.float32)
+    return t, acc, gyr
+
+
+def _reset() -> None:
+    s = datafussion._s
+    s.pos[:] = [0.0, 0.0, 0.0]
+    s.vel[:] = [0.0, 0.0, 0.0]
+    s.pitch = s.roll = s.yaw = 0.0
+    s.t_last_imu = 0.0
+
+
+def _state() -> np.ndarray:
+    f = datafussion.get_fused()
+    return np.array([f.rot_x, f.rot_y, f.rot_z, f.vel_x, f.vel_y, f.vel_z,
+                     f.pos_x, f.pos_y, f.pos_z])
+
+
+def per_sample(t, acc, gyr) -> float:
+    records = [GyroRecord(timestamp=float(t[i]), acceleration=tuple(acc[i].tolist()),
+                          gyro=tuple(gyr[i].tolist()), temperature=25.0)
+               for i in range(len(t))]
+    _reset()
+    t0 = time.perf_counter()
+    for rec in records:
+        datafussion.update_imu(rec)
+    return time.perf_counter() - t0
+
+
+def batched(t, acc, gyr, batch: int) -> float:
+    _reset()
+    t0 = time.perf_counter()
+    for i in range(0, len(t), batch):
+        datafussion.update_imu_batch(t[i:i + batch], acc[i:i + batch], gyr[i:i + batch])
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--samples", type=int, default=200_000)
+    ap.add_argument("--batch", type=int, default=20, help="samples per batch (20 = 20 ms FIFO drain at 1 kHz)")
+    args = ap.parse_args()
+
+    t, acc, gyr = synthetic_imu(args.samples)
+    n = len(t)
+
+    dt = per_sample(t, acc, gyr)
+    ref = _state()
+    print(f"update_imu          {n / dt:12,.0f} samples/s")
+
+    kernel = datafussion.fuse_imu
+    if kernel is None:
+        print("fusion not built (python setup.py build_ext --inplace); compiled path skipped")
+    else:
+        dt = batched(t, acc, gyr, args.batch)
+        err = np.abs(_state() - ref).max()
+        print(f"update_imu_batch    {n / dt:12,.0f} samples/s  (compiled, batch {args.batch},"
+              f" max diff {err:.2e})")
+
+    datafussion.fuse_imu = None
+    try:
+        dt = batched(t, acc, gyr, args.batch)
+    finally:
+        datafussion.fuse_imu = kernel
+    err = np.abs(_state() - ref).max()
+    print(f"update_imu_batch    {n / dt:12,.0f} samples/s  (Python fallback, batch {args.batch},"
+          f" max diff {err:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""NMEA parser throughput: per-line parse_sentence vs NmeaStream vs parse_nmea_log.
+
+    python bench_nmea.py [--log capture.nmea] [--epochs N]
+
+Without --log a synthetic 10 Hz LC76G-style capture is generated (RMC, GGA
+plus GSA/GSV that the parsers have to skip). Reports sentences per second
+for each path and checks that the streaming and bulk parsers agree."""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from gps import (GNSSRecord, GPSReader, NmeaReplay, _ddmm, nmea_sentence, parse_nmea_log,
+                 parse_sentence)
+
+
+def synthetic_log(epochs: int, rate_hz: int = 10) -> bytes:
+    """A slow circle starting just before midnight so the date rolls over."""
+    out = bytearray()
+    t0 = 86400.0 - epochs / rate_hz / 2
+    for i in range(epochs):
+        t = t0 + i / rate_hz
+        day, tod = divmod(t, 86400.0)
+        hh, rem = divmod(tod, 3600.0)
+        mm, ss = divmod(rem, 60.0)
+        hms = f"{int(hh):02d}{int(mm):02d}{ss:05.2f}"
+        date = f"{23 + int(day):02d}0624"
+        a = 2 * math.pi * i / 3000
+        lat, ns = _ddmm(48.117 + 0.001 * math.sin(a), "N", "S", 2)
+        lon, ew = _ddmm(11.516 + 0.001 * math.cos(a), "E", "W", 3)
+        out += nmea_sentence(f"GNRMC,{hms},A,{lat},{ns},{lon},{ew},{5 + i % 7:.1f},{i % 360:.1f},{date},,,A")
+        out += nmea_sentence(f"GNGGA,{hms},{lat},{ns},{lon},{ew},1,{8 + i % 4:02d},0.9,{545 + i % 10:.1f},M,46.9,M,,")
+        out += nmea_sentence("GNGSA,A,3,03,04,06,13,17,19,,,,,,,1.6,0.9,1.3,1")
+        out += nmea_sentence("GPGSV,3,1,11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00")
+    return bytes(out)
+
+
+def per_line(data: bytes) -> int:
+    """The read_gps_records path: decode, checksum and split every line."""
+    epochs = 0
+    rec = GNSSRecord()
+    last = None
+    for raw in data.splitlines():
+        line = raw.decode("ascii", errors="replace").strip()
+        if not line:
+            continue
+        rec.raw.append(line)
+        parse_sentence(line, rec)
+        if line.startswith(("$GNRMC", "$GPRMC")):
+            if last is not None and rec.utc_time != last:
+                epochs += 1
+                rec = GNSSRecord()
+                rec.raw.append(line)
+                parse_sentence(line, rec)
+            last = rec.utc_time
+    return epochs + 1
+
+
+def streaming(data: bytes) -> list[GNSSRecord]:
+    reader = GPSReader(source=NmeaReplay(data, speed=0))
+    out = []
+    while (rec := reader.read_one()) is not None:
+        out.append(rec)
+    return out
+
+
+def _timed(fn, data):
+    t0 = time.perf_counter()
+    result = fn(data)
+    return time.perf_counter() - t0, result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--log", default=None, help="captured NMEA (default: synthetic)")
+    ap.add_argument("--epochs", type=int, default=50_000, help="synthetic epochs")
+    args = ap.parse_args()
+
+    if args.log:
+        with open(args.log, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_log(args.epochs)
+    n = data.count(b"\n")
+    print(f"{len(data) / 1e6:.1f} MB, {n:,} sentences")
+
+    dt, epochs = _timed(per_line, data)
+    print(f"parse_sentence      {n / dt:12,.0f} sentences/s  ({epochs:,} epochs)")
+    dt, recs = _timed(streaming, data)
+    print(f"NmeaStream          {n / dt:12,.0f} sentences/s  ({len(recs):,} epochs)")
+    dt, cols = _timed(parse_nmea_log, data)
+    print(f"parse_nmea_log      {n / dt:12,.0f} sentences/s  ({len(cols['time']):,} epochs)")
+
+    if len(recs) == len(cols["lat"]):
+        lat = np.array([r.latitude for r in recs], dtype=float)
+        alt = np.array([r.altitude_m for r in recs], dtype=float)
+        print(f"stream vs bulk: max |lat| diff {np.nanmax(np.abs(lat - cols['lat'])):.2e},"
+              f" max |alt| diff {np.nanmax(np.abs(alt - cols['alt'])):.2e}")
+    else:
+        print(f"stream vs bulk: epoch counts differ ({len(recs)} vs {len(cols['lat'])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Before/after cost of packet assembly + send in record.py.
+
+    python bench_packet.py [--frames N] [--quality Q] [--video fpv.mp4]
+
+"before" is the original path: jpeg_buf.tobytes(), struct.pack(...) + jpeg,
+sock.send(pkt, copy=False) on a socket with the default copy_threshold.
+"after" is PacketRing: header pack_into a reused slot, one copy of the JPEG,
+then PacketRing.send (pyzmq copy below copy_threshold, tracked zero-copy
+above it).
+
+CPU is the sending thread's CPU time per frame (time.thread_time), so the
+receiver and the ZMQ I/O thread are not counted. Bytes copied counts the
+Python-side copies plus the copy pyzmq makes for frames below its
+copy_threshold."""
+
+import argparse
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+import zmq
+
+from packet import HDR_FMT, HDR_SIZE, PacketRing
+
+W, H = 720, 480
+_STATE = ([1.0, 2.0, 3.0], [0.1, 0.2, 0.3], [0.0, 0.0, 9.8], [0.0, 0.0, 0.0])
+
+
+def _test_frame(video: str | None) -> np.ndarray:
+    if video:
+        cap = cv2.VideoCapture(video)
+        ok, raw = cap.read()
+        cap.release()
+        if ok:
+            return cv2.resize(raw, (W, H))
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:H, 0:W]
+    img = np.stack([x * 255 // W, y * 255 // H, (x + y) * 255 // (W + H)], axis=-1)
+    return (img + rng.integers(0, 24, img.shape)).clip(0, 255).astype(np.uint8)
+
+
+def _drain(ctx: zmq.Context, addr: str, stop: threading.Event) -> None:
+    pull = ctx.socket(zmq.PULL)
+    pull.setsockopt(zmq.RCVTIMEO, 100)
+    pull.connect(addr)
+    while not stop.is_set():
+        try:
+            pull.recv(copy=False)
+        except zmq.Again:
+            pass
+    pull.close(linger=0)
+
+
+def _before(sock, jpeg_buf, frames: int) -> float:
+    pos, vel, acc, gyr = _STATE
+    t0 = time.thread_time()
+    for _ in range(frames):
+        jpeg_bytes = jpeg_buf.tobytes()
+        pkt = struct.pack(
+            HDR_FMT, int(time.time()) & 0xFFFFFFFF, W, H, len(jpeg_bytes),
+            *pos, *vel, *acc, *gyr, 0.1, 0.2, 0.3, 1.0,
+        ) + jpeg_bytes
+        sock.send(pkt, copy=False)
+    return (time.thread_time() - t0) / frames
+
+
+def _after(sock, jpeg_buf, frames: int) -> tuple[float, int]:
+    pos, vel, acc, gyr = _STATE
+    ring = PacketRing()
+    busy = 0
+    t0 = time.thread_time()
+    for _ in range(frames):
+        # The loop runs far faster than 60 fps; wait (off-CPU) for ZMQ to
+        # release a slot instead of counting the frame as dropped.
+        while (pkt := ring.pack(jpeg_buf, W, H, pos, vel, acc, gyr,
+                                0.1, 0.2, 0.3, 1.0)) is None:
+            busy += 1
+            time.sleep(0.0002)
+        ring.send(sock, pkt)
+    return (time.thread_time() - t0) / frames, busy
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--frames", type=int, default=5000)
+    ap.add_argument("--quality", type=int, default=75)
+    ap.add_argument("--video", default=None, help="take the test frame from this video")
+    args = ap.parse_args()
+
+    ok, jpeg_buf = cv2.imencode('.jpg', _test_frame(args.video),
+                                [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+    if not ok:
+        raise RuntimeError("JPEG encode failed")
+    n = jpeg_buf.size
+    pkt_size = HDR_SIZE + n
+
+    ctx  = zmq.Context()
+    stop = threading.Event()
+    sock = ctx.socket(zmq.PUSH)
+    port = sock.bind_to_random_port("tcp://127.0.0.1")
+    addr = f"tcp://127.0.0.1:{port}"
+    drain = threading.Thread(target=_drain, args=(ctx, addr, stop), daemon=True)
+    drain.start()
+
+    zmq_copy = pkt_size if pkt_size < sock.copy_threshold else 0
+    cpu_before = _before(sock, jpeg_buf, args.frames)
+    copied_before = n + pkt_size + zmq_copy
+
+    cpu_after, busy = _after(sock, jpeg_buf, args.frames)
+    copied_after = n + zmq_copy
+
+    stop.set()
+    drain.join()
+    sock.close(linger=0)
+    ctx.term()
+
+    print(f"jpeg {n} B  packet {pkt_size} B  frames {args.frames}")
+    print(f"before  {copied_before:8d} B copied/frame  {cpu_before * 1e6:7.1f} us CPU/frame")
+    print(f"after   {copied_after:8d} B copied/frame  {cpu_after * 1e6:7.1f} us CPU/frame"
+          f"  (slots busy {busy})")
+
+
+if __name__ == "__main__":
+    main()
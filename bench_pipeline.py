@@ -0,0 +1,337 @@
+"""End-to-end sender -> relay -> subscribers benchmark on one machine.
+
+    python bench_pipeline.py [--video fpv.mp4] [--qualities 50,75,90] [--sizes 720x480,360x240]
+                             [--subscribers 1,3] [--seconds 8] [--out bench_pipeline.json]
+    python bench_pipeline.py --compare old.json   # exit 1 on regressions
+
+Each configuration runs record.py in DEBUG mode against a local stand-in
+for server/server.go: a PULL -> PUB relay with the same CONFLATE / HWM 1
+sockets. record.py runs with:
+
+- the video paced at --fps like the camera
+- simulated sensors
+- fixed quality and size
+- no scene skip
+
+Headless subscribers connect like the C client and decode every JPEG.
+The packet trace gives the latency (see latency.py).
+
+After --warmup, each configuration is measured for --seconds:
+
+    fps        frames received per second, mean over subscribers
+    drop       share of camera frames (--fps) that never reached a
+               subscriber; send_drop is the part lost before the relay
+    kbps       KB/s of packets into the relay
+    cpu        % of one core for the sender, the relay and the mean
+               subscriber. The sender's figure includes its sensor process
+               and decoding the debug video, which the Pi does not do.
+    latency    capture -> received p50/p95/p99 ms, with the per-stage
+               breakdown of latency.py
+
+Sender, relay and subscribers share the host's cores, so compare results
+from the same machine only."""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import zmq
+
+from latency import STAGES, LatencyStats, stage_ms
+from packet import header_size, parse_trace, read_header
+
+HERE        = os.path.dirname(os.path.abspath(__file__))
+QUALITIES   = [50, 75, 90]
+SIZES       = [(720, 480), (360, 240)]
+SUBSCRIBERS = [1, 3]
+CAMERA_FPS  = 60.0
+REGRESS_TOL = 0.20      # relative fps / cpu / latency change flagged by --compare (end to end is noisy)
+DROP_TOL    = 0.02      # absolute drop-rate increase flagged by --compare
+LAT_SLACK_MS = 1.0      # latency increases below this are noise
+_CLK_TCK    = os.sysconf("SC_CLK_TCK")
+
+
+def _bind_latest(ctx: zmq.Context, kind: int) -> tuple[zmq.Socket, int]:
+    """server.go's bindLatest on a free local port."""
+    sock = ctx.socket(kind)
+    sock.setsockopt(zmq.CONFLATE, 1)
+    sock.setsockopt(zmq.SNDHWM if kind == zmq.PUB else zmq.RCVHWM, 1)
+    sock.setsockopt(zmq.LINGER, 0)
+    return sock, sock.bind_to_random_port("tcp://127.0.0.1")
+
+
+def relay(conn, stop) -> None:
+    """PULL -> PUB forwarder. Sends its two ports, then, once stop is set,
+    an (n, 2) array of (monotonic receive time, bytes) per message."""
+    ctx = zmq.Context()
+    pull, pull_port = _bind_latest(ctx, zmq.PULL)
+    pub, pub_port   = _bind_latest(ctx, zmq.PUB)
+    conn.send((pull_port, pub_port))
+    rows = []
+    while not stop.is_set():
+        if not pull.poll(100):
+            continue
+        data = pull.recv(copy=False)
+        rows.append((time.monotonic(), len(data)))
+        pub.send(data, copy=False)
+    pull.close()
+    pub.close()
+    ctx.term()
+    conn.send(np.array(rows, np.float64).reshape(-1, 2))
+
+
+def subscriber(addr: str, conn, stop, decode: bool) -> None:
+    """Headless C client: SUB with CONFLATE, decode, read the trace. Sends
+    an (n, 1 + len(STAGES)) array of (monotonic receive time, stage ms...)
+    per frame once stop is set; stages are NaN without a trace."""
+    ctx  = zmq.Context()
+    sock = ctx.socket(zmq.SUB)
+    sock.setsockopt(zmq.CONFLATE, 1)
+    sock.setsockopt(zmq.RCVHWM, 1)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.connect(addr)
+    sock.setsockopt(zmq.SUBSCRIBE, b"")
+    untraced = (float("nan"),) * len(STAGES)
+    rows = []
+    while not stop.is_set():
+        if not sock.poll(100):
+            continue
+        msg = sock.recv(copy=False)
+        recv_ns, recv_t = time.time_ns(), time.monotonic()
+        buf = msg.buffer
+        size = int(read_header(buf)["jpeg_size"])
+        if size == 0:
+            continue    # keepalive
+        if decode:
+            off = header_size(buf)
+            cv2.imdecode(np.frombuffer(buf, np.uint8, size, off), cv2.IMREAD_COLOR)
+        trace = parse_trace(buf)
+        rows.append((recv_t, *(stage_ms(trace, recv_ns) if trace else untraced)))
+    sock.close()
+    ctx.term()
+    conn.send(np.array(rows, np.float64).reshape(-1, 1 + len(STAGES)))
+
+
+def _cpu_s(pid: int) -> float:
+    """User + system CPU seconds of pid, 0 once it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+
+def _tree(pid: int) -> list[int]:
+    """pid and all its descendants (record.py forks the sensor process)."""
+    parent = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parent[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                pass
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        out.append(p)
+        todo.extend(c for c, pp in parent.items() if pp == p)
+    return out
+
+
+def _in(rows: np.ndarray, t0: float, t1: float) -> np.ndarray:
+    return rows[(rows[:, 0] >= t0) & (rows[:, 0] < t1)]
+
+
+def run_one(args, quality: int, size: tuple[int, int], subs: int) -> dict:
+    mp = multiprocessing.get_context("fork")
+    stop = mp.Event()
+    relay_conn, child = mp.Pipe()
+    procs = [mp.Process(target=relay, args=(child, stop), daemon=True)]
+    procs[0].start()
+    pull_port, pub_port = relay_conn.recv()
+    sub_conns = []
+    for _ in range(subs):
+        conn, child = mp.Pipe()
+        procs.append(mp.Process(target=subscriber, daemon=True,
+                                args=(f"tcp://127.0.0.1:{pub_port}", child, stop, not args.no_decode)))
+        procs[-1].start()
+        sub_conns.append(conn)
+
+    env = dict(os.environ, GO_SERVER=f"tcp://127.0.0.1:{pull_port}",
+               GO_META_SERVER="", GO_PREVIEW_SERVER="")
+    cmd = [sys.executable, "-u", os.path.join(HERE, "record.py"),
+           "--debug-video", args.video, "--debug-fps", str(args.fps),
+           "--quality", str(quality), "--size", f"{size[0]}x{size[1]}", "--fixed",
+           "--encoder", args.encoder, "--sim-sensors", "--no-scene-skip"]
+    with tempfile.TemporaryFile() as log:
+        sender = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            time.sleep(args.warmup)
+            if sender.poll() is not None:
+                log.seek(0)
+                raise SystemExit(f"record.py exited ({sender.returncode}):\n"
+                                 + log.read().decode(errors="replace")[-2000:])
+            sender_pids = _tree(sender.pid)
+            t0 = time.monotonic()
+            cpu0 = [sum(map(_cpu_s, sender_pids))] + [_cpu_s(p.pid) for p in procs]
+            time.sleep(args.seconds)
+            t1 = time.monotonic()
+            cpu1 = [sum(map(_cpu_s, sender_pids))] + [_cpu_s(p.pid) for p in procs]
+        finally:
+            sender.send_signal(signal.SIGINT)
+            try:
+                sender.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                sender.kill()
+                sender.wait()
+            stop.set()
+
+    relayed = _in(relay_conn.recv(), t0, t1)
+    frames  = [_in(c.recv(), t0, t1) for c in sub_conns]
+    for p in procs:
+        p.join(timeout=5)
+
+    dt  = t1 - t0
+    cpu = [(b - a) / dt * 100 for a, b in zip(cpu0, cpu1)]
+    fps = [len(f) / dt for f in frames]
+    lat = LatencyStats(max(1, sum(len(f) for f in frames)))
+    for f in frames:
+        for row in f[:, 1:]:
+            if not np.isnan(row[0]):
+                lat.add(tuple(row))
+    return {
+        "quality":     quality,
+        "width":       size[0],
+        "height":      size[1],
+        "subscribers": subs,
+        "fps":         float(np.mean(fps)),
+        "fps_min":     float(np.min(fps)),
+        "drop":        max(0.0, 1.0 - float(np.mean(fps)) / args.fps),
+        "send_drop":   max(0.0, 1.0 - len(relayed) / dt / args.fps),
+        "kbps":        float(relayed[:, 1].sum()) / dt / 1024,
+        "cpu":         {"sender": cpu[0], "relay": cpu[1],
+                        "subscriber": float(np.mean(cpu[2:]))},
+        "latency":     lat.summarize(),
+    }
+
+
+def _print(row: dict) -> None:
+    total = row["latency"].get("total")
+    lat = (f"  total p50 {total['p50']:.1f}  p95 {total['p95']:.1f}  p99 {total['p99']:.1f} ms"
+           if total else "  no traced frames")
+    print(f"q{row['quality']} {row['width']}x{row['height']}  x{row['subscribers']} sub"
+          f"  {row['fps']:5.1f} fps  drop {row['drop']:5.1%} (send {row['send_drop']:5.1%})"
+          f"  {row['kbps']:7.1f} KB/s  cpu sender {row['cpu']['sender']:.0f}%"
+          f" relay {row['cpu']['relay']:.0f}% sub {row['cpu']['subscriber']:.0f}%" + lat,
+          flush=True)
+
+
+def _key(row: dict) -> tuple:
+    return row["quality"], row["width"], row["height"], row["subscribers"]
+
+
+def compare(old: list[dict], new: list[dict], tol: float) -> list[str]:
+    """Regressions: fps down or CPU / p95 latency up by more than tol, drop
+    rate up by more than DROP_TOL."""
+    prev = {_key(r): r for r in old}
+    problems = []
+    for row in new:
+        ref = prev.get(_key(row))
+        if ref is None:
+            continue
+        name = "q{} {}x{} x{}".format(*_key(row))
+        if row["fps"] < ref["fps"] * (1.0 - tol):
+            problems.append(f"{name}: fps {ref['fps']:.1f} -> {row['fps']:.1f}")
+        if row["drop"] > ref["drop"] + DROP_TOL:
+            problems.append(f"{name}: drop {ref['drop']:.1%} -> {row['drop']:.1%}")
+        for proc in ("sender", "relay", "subscriber"):
+            a, b = ref["cpu"][proc], row["cpu"][proc]
+            if b > a * (1.0 + tol) + 1.0:
+                problems.append(f"{name}: {proc} cpu {a:.0f}% -> {b:.0f}%")
+        a, b = ref["latency"].get("total"), row["latency"].get("total")
+        if a and b and b["p95"] > a["p95"] * (1.0 + tol) + LAT_SLACK_MS:
+            problems.append(f"{name}: latency p95 {a['p95']:.1f} -> {b['p95']:.1f} ms")
+    return problems
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _ints(text: str) -> list[int]:
+    return [int(v) for v in text.split(",")]
+
+
+def _sizes(text: str) -> list[tuple[int, int]]:
+    return [tuple(int(v) for v in s.lower().split("x")) for s in text.split(",")]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--video", default="fpv.mp4", help="sender input (record.py DEBUG_VIDEO)")
+    ap.add_argument("--qualities", type=_ints, default=QUALITIES)
+    ap.add_argument("--sizes", type=_sizes, default=SIZES, metavar="WxH,...")
+    ap.add_argument("--subscribers", type=_ints, default=SUBSCRIBERS)
+    ap.add_argument("--fps", type=float, default=CAMERA_FPS, help="paced capture rate")
+    ap.add_argument("--encoder", default="auto", help="record.py --encoder")
+    ap.add_argument("--no-decode", action="store_true", help="subscribers skip JPEG decode")
+    ap.add_argument("--warmup", type=float, default=3.0)
+    ap.add_argument("--seconds", type=float, default=8.0, help="measured time per configuration")
+    ap.add_argument("--out", default="bench_pipeline.json")
+    ap.add_argument("--compare", default=None, help="previous results file")
+    ap.add_argument("--tolerance", type=float, default=REGRESS_TOL)
+    args = ap.parse_args()
+    if args.fps <= 0:
+        ap.error("--fps must be positive: drop rates are counted against it")
+    if not os.path.exists(args.video):
+        ap.error(f"no video at {args.video}")
+    args.video = os.path.abspath(args.video)
+
+    results = []
+    for size in args.sizes:
+        for quality in args.qualities:
+            for subs in args.subscribers:
+                results.append(run_one(args, quality, size, subs))
+                _print(results[-1])
+
+    with open(args.out, "w") as f:
+        json.dump({
+            "commit":  _commit(),
+            "time":    time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.machine(),
+            "cpus":    os.cpu_count(),
+            "python":  platform.python_version(),
+            "fps":     args.fps,
+            "encoder": args.encoder,
+            "decode":  not args.no_decode,
+            "results": results,
+        }, f, indent=1)
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        problems = compare(old, results, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Static-scene skipping: change-detector cost and encoder/uplink savings.
+
+    python setup.py build_ext --inplace        # builds scene
+    python bench_scene.py [--video fpv.mp4] [--static-s 20] [--quality 75]
+
+Replays a flight at 60 fps: --static-s seconds on the pad (one frame plus
+sensor noise), then the moving clip. Every frame goes through
+scenegate.SceneGate; the report compares JPEG encodes, encoder CPU and
+payload bytes with and without the gate, and the per-frame cost of the
+signature (scene.pyx vs the NumPy fallback)."""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import scenegate
+from scenegate import KEEPALIVE, SEND, SceneGate
+from packet import HDR_SIZE
+
+W, H = 720, 480
+FPS  = 60.0
+NOISE = 4        # +- sensor noise on the static frames
+
+
+def _frames(video: str | None, static_s: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    clip = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while True:
+            ok, raw = cap.read()
+            if not ok:
+                break
+            clip.append(cv2.resize(raw, (W, H)))
+        cap.release()
+    if not clip:
+        y, x = np.mgrid[0:H, 0:W]
+        base = np.stack([x * 255 // W, y * 255 // H, (x + y) * 255 // (W + H)], -1).astype(np.uint8)
+        clip = [np.roll(base, 4 * i, axis=1) for i in range(120)]
+    pad = clip[0].astype(np.int16)
+    for _ in range(int(static_s * FPS)):
+        yield np.clip(pad + rng.integers(-NOISE, NOISE + 1, pad.shape), 0, 255).astype(np.uint8)
+    yield from clip
+
+
+def _signature_us(frame: np.ndarray, reps: int = 50) -> dict[str, float]:
+    out = np.zeros((H // scenegate.TILE, W // scenegate.TILE), np.uint8)
+    paths = {"numpy": lambda: scenegate._signature_np(frame, out, scenegate.SAMPLE_STEP)}
+    if scenegate.signature is not None:
+        paths["scene.pyx"] = lambda: scenegate.signature(frame, out, scenegate.SAMPLE_STEP)
+    res = {}
+    for name, fn in paths.items():
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            fn()
+        res[name] = (time.perf_counter() - t0) / reps * 1e6
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--video", default=None, help="recorded clip, e.g. fpv.mp4")
+    ap.add_argument("--static-s", type=float, default=20.0)
+    ap.add_argument("--quality", type=int, default=75)
+    args = ap.parse_args()
+
+    gate = SceneGate()
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.quality]
+    n = enc_all = 0
+    bytes_all = bytes_gated = 0
+    cpu_all = cpu_gated = cpu_gate = 0.0
+    first = None
+    for i, frame in enumerate(_frames(args.video, args.static_s)):
+        if first is None:
+            first = frame
+        now = i / FPS
+        t0 = time.thread_time()
+        action = gate.check(frame, now)
+        t1 = time.thread_time()
+        ok, jpeg = cv2.imencode('.jpg', frame, params)
+        t2 = time.thread_time()
+        n += 1
+        enc_all   += 1
+        cpu_gate  += t1 - t0
+        cpu_all   += t2 - t1
+        bytes_all += HDR_SIZE + jpeg.size
+        if action == SEND:
+            cpu_gated   += t2 - t1
+            bytes_gated += HDR_SIZE + jpeg.size
+        elif action == KEEPALIVE:
+            bytes_gated += HDR_SIZE
+
+    dur = n / FPS
+    print(f"{n} frames ({args.static_s:.0f} s static + {dur - args.static_s:.1f} s clip)"
+          f"  signature {' '.join(f'{k} {v:.0f} us' for k, v in _signature_us(first).items())}")
+    print(f"  no gate   {enc_all:6d} encodes  {cpu_all / dur * 100:5.1f} % CPU"
+          f"  {bytes_all / dur / 1024:8.1f} KB/s")
+    print(f"  gate      {gate.sent:6d} encodes  {(cpu_gated + cpu_gate) / dur * 100:5.1f} % CPU"
+          f"  {bytes_gated / dur / 1024:8.1f} KB/s"
+          f"  ({gate.keepalives} keepalives, {gate.skipped} skipped,"
+          f" detector {cpu_gate / n * 1e6:.0f} us/frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Servo update cost: per-register writes vs block writes with the output cache.
+
+    python bench_servo.py [--updates N] [--i2c-hz 400000]
+
+Runs ServoDriver against FakeSMBus and reports updates per second (host
+CPU only), I2C transactions and payload bytes per update, and the bus time
+those would take at --i2c-hz. The legacy column replays the old _set_pwm:
+four write_byte_data calls per channel, every time."""
+
+import argparse
+import math
+import time
+
+from servo import FakeSMBus, ServoDriver
+
+ADDRESS = 0x40
+_LED0_ON_L = 0x06
+
+
+def _legacy(bus: FakeSMBus, offs: dict[int, int]) -> None:
+    for ch, off in offs.items():
+        base = _LED0_ON_L + 4 * ch
+        bus.write_byte_data(ADDRESS, base,     0)
+        bus.write_byte_data(ADDRESS, base + 1, 0)
+        bus.write_byte_data(ADDRESS, base + 2, off & 0xFF)
+        bus.write_byte_data(ADDRESS, base + 3, off >> 8)
+
+
+def _scenarios(n: int):
+    """(name, list of {channel: angle}) update streams."""
+    four = [{ch: 90 + 60 * math.sin(i / 50 + ch) for ch in range(4)} for i in range(n)]
+    # Gimbal hold: roll/pitch servos move a little, two surfaces stay put.
+    steady = [{0: 90 + 20 * math.sin(i / 50), 1: 90, 2: 45, 3: 90 + 10 * math.cos(i / 80)}
+              for i in range(n)]
+    sixteen = [{ch: 90 + 60 * math.sin(i / 50 + ch) for ch in range(16)} for i in range(n)]
+    return [("4 ch moving", four), ("4 ch, 2 still", steady), ("16 ch moving", sixteen)]
+
+
+def _bus_us(bus: FakeSMBus, i2c_hz: float) -> float:
+    """Start + address + register + payload bytes + stop, 9 clocks a byte."""
+    clocks = bus.transactions * (2 * 9 + 2) + bus.bytes * 9
+    return clocks / i2c_hz * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--updates", type=int, default=20_000)
+    ap.add_argument("--i2c-hz", type=float, default=400_000)
+    args = ap.parse_args()
+
+    for name, stream in _scenarios(args.updates):
+        n = len(stream)
+
+        bus = FakeSMBus()
+        drv = ServoDriver(smbus=bus)
+        bus.transactions = bus.bytes = 0
+        t0 = time.perf_counter()
+        for u in stream:
+            _legacy(bus, {ch: drv._pulse_to_off(drv.angle_to_pulse(a)) for ch, a in u.items()})
+        dt = time.perf_counter() - t0
+        print(f"{name:14s} legacy    {n / dt:10,.0f} updates/s  {bus.transactions / n:5.1f} tx"
+              f"  {bus.bytes / n:5.1f} B  bus {_bus_us(bus, args.i2c_hz) / n:7.1f} us/update")
+
+        bus = FakeSMBus()
+        drv = ServoDriver(smbus=bus)
+        bus.transactions = bus.bytes = 0
+        t0 = time.perf_counter()
+        for u in stream:
+            drv.set_angles(u)
+        dt = time.perf_counter() - t0
+        print(f"{name:14s} block     {n / dt:10,.0f} updates/s  {bus.transactions / n:5.1f} tx"
+              f"  {bus.bytes / n:5.1f} B  bus {_bus_us(bus, args.i2c_hz) / n:7.1f} us/update"
+              f"  ({drv.skipped / n:.1f} ch/update skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Module import time and simulated sensor throughput, no hardware needed.
+
+    python bench_startup.py [--runs 5] [--seconds 3] [--json bench_startup.json]
+
+Imports every pipeline module in a fresh interpreter --runs times and
+reports the median import time, so a module that grows import-time work
+(or starts opening devices again) shows up. Then runs the simulated
+backends sensors.py uses with SIM_SENSORS: gyro.SimImu polled like
+imu_loop, gps.NmeaEmitter read through a pty by GPSReader, and
+ServoDriver on FakeSMBus. Reports time to first use, throughput, CPU per
+second and, for GPS, the age of each fix when read_one returns it."""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MODULES = ("packet", "bitrate", "scenegate", "encoder", "gyro", "gps", "servo",
+           "datafussion", "gimbal", "motion", "sensors", "flightlog", "latency",
+           "receiver", "record")
+
+_PROBE = ("import time; t = time.perf_counter(); import {0}; "
+          "print(time.perf_counter() - t)")
+
+
+def import_times(runs: int) -> dict[str, float]:
+    """Median seconds to import each module, in a new interpreter each run."""
+    out = {}
+    for mod in MODULES:
+        samples = []
+        for _ in range(runs):
+            r = subprocess.run([sys.executable, "-c", _PROBE.format(mod)],
+                               capture_output=True, text=True)
+            if r.returncode != 0:
+                raise SystemExit(f"import {mod} failed:\n{r.stderr.strip()}")
+            samples.append(float(r.stdout.strip().splitlines()[-1]))
+        out[mod] = statistics.median(samples)
+        print(f"import {mod:12s} {out[mod] * 1e3:8.1f} ms", flush=True)
+    return out
+
+
+def bench_imu(seconds: float) -> dict[str, float]:
+    from gyro import SimImu
+    from sensors import IMU_POLL_S, IMU_RATE_HZ
+
+    t0 = time.perf_counter()
+    imu = SimImu(rate_hz=IMU_RATE_HZ, seed=0)
+    init_s = time.perf_counter() - t0
+    samples = batches = 0
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        samples += len(imu.read_batch())
+        batches += 1
+        time.sleep(IMU_POLL_S)
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    imu.close()
+    res = {"init_ms": init_s * 1e3, "samples_per_s": samples / wall,
+           "batch_us": cpu / batches * 1e6, "cpu_pct": cpu / wall * 100,
+           "overflows": imu.overflows}
+    print(f"SimImu       init {res['init_ms']:6.2f} ms  {res['samples_per_s']:7.0f} samples/s"
+          f"  {res['batch_us']:6.0f} us/batch  cpu {res['cpu_pct']:.1f}%"
+          f"  overflows {imu.overflows}", flush=True)
+    return res
+
+
+def bench_gps(seconds: float, rate_hz: float) -> dict[str, float]:
+    from gps import GPSReader, NmeaEmitter
+
+    emitter = NmeaEmitter(rate_hz=rate_hz)
+    t0 = time.perf_counter()
+    reader = GPSReader(port=emitter.port)
+    first = reader.read_one()
+    first_s = time.perf_counter() - t0
+    ages = []
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        rec = reader.read_one()
+        if rec is None:
+            break
+        h, m, s = rec.utc_time.split(":")
+        age = time.time() % 86400.0 - (int(h) * 3600 + int(m) * 60 + float(s))
+        ages.append((age + 43200.0) % 86400.0 - 43200.0)   # across midnight
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    reader.close()
+    emitter.close()
+    if first is None or not ages:
+        raise SystemExit("no fixes from NmeaEmitter")
+    age = np.array(ages) * 1e3
+    res = {"first_fix_ms": first_s * 1e3, "epochs_per_s": len(ages) / wall,
+           "cpu_pct": cpu / wall * 100, "dropped": emitter.dropped,
+           "age_p50_ms": float(np.percentile(age, 50)),
+           "age_p99_ms": float(np.percentile(age, 99))}
+    print(f"NmeaEmitter  open+fix {res['first_fix_ms']:6.1f} ms  {res['epochs_per_s']:7.1f} epochs/s"
+          f" (target {rate_hz:g})  cpu {res['cpu_pct']:.1f}%  age p50 {res['age_p50_ms']:.1f}"
+          f"  p99 {res['age_p99_ms']:.1f} ms  dropped {emitter.dropped}", flush=True)
+    return res
+
+
+def bench_servo(seconds: float) -> dict[str, float]:
+    from gimbal import PITCH_CH, ROLL_CH
+    from servo import FakeSMBus, ServoDriver
+
+    bus = FakeSMBus()
+    t0 = time.perf_counter()
+    drv = ServoDriver(smbus=bus)
+    init_s = time.perf_counter() - t0
+    init_tx = bus.transactions
+    bus.transactions = bus.bytes = 0
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        a = 90 + 30 * np.sin(n / 50)
+        drv.set_angles({PITCH_CH: a, ROLL_CH: 180 - a})
+        n += 1
+    wall = time.perf_counter() - t0
+    res = {"init_ms": init_s * 1e3, "init_tx": init_tx, "updates_per_s": n / wall,
+           "tx_per_update": bus.transactions / n}
+    print(f"FakeSMBus    init {res['init_ms']:6.2f} ms ({init_tx} tx)"
+          f"  {res['updates_per_s']:7.0f} updates/s  {res['tx_per_update']:.2f} tx/update",
+          flush=True)
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5, help="interpreters per module")
+    ap.add_argument("--seconds", type=float, default=3.0, help="per simulated backend")
+    ap.add_argument("--gps-rate", type=float, default=10.0, help="NmeaEmitter epochs/s")
+    ap.add_argument("--json", help="write the results here")
+    args = ap.parse_args()
+
+    results = {
+        "import_s": import_times(args.runs),
+        "imu": bench_imu(args.seconds),
+        "gps": bench_gps(args.seconds, args.gps_rate),
+        "servo": bench_servo(args.seconds),
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import time
+
+# Closed-loop JPEG quality / resolution control for the video sender.
+#
+# Every WINDOW_S the controller looks at what happened since the last
+# decision: send attempts that failed with zmq.Again (uplink or relay can't
+# keep up), bytes actually sent, frames sent and mean encode time. Quality
+# moves in small steps; when it is pinned at a bound for long enough the
+# output resolution moves one rung on the ladder instead.
+
+WINDOW_S        = 0.5       # decision interval
+TARGET_BPS      = 1_500_000 # uplink budget, bytes/s of JPEG payload
+TARGET_FPS      = 60.0      # camera rate (FrameDurationLimits 16666 us)
+FAIL_HI         = 0.05      # send-failure fraction that means congestion
+FPS_LO          = 0.9       # below TARGET_FPS * FPS_LO the sender is behind
+BPS_HEADROOM    = 0.75      # only raise quality while under this share of TARGET_BPS
+Q_MIN           = 30
+Q_MAX           = 90
+Q_STEP_DOWN     = 10
+Q_STEP_UP       = 2
+Q_AFTER_DOWN    = 70        # quality after stepping to a lower resolution
+Q_AFTER_UP      = 45        # quality after stepping to a higher resolution
+DOWN_WINDOWS    = 2         # consecutive bad windows at Q_MIN before a smaller rung
+UP_WINDOWS      = 8         # consecutive good windows at Q_MAX before a larger rung
+LADDER_SCALES   = (1.0, 0.75, 0.5, 0.375)
+
+
+def resolution_ladder(width: int, height: int) -> list[tuple[int, int]]:
+    """Full resolution first, then smaller rungs with the same aspect ratio.
+    Sizes are kept even so every rung also works for 4:2:0 chroma."""
+    rungs = []
+    for s in LADDER_SCALES:
+        size = (int(width * s) & ~1, int(height * s) & ~1)
+        if size not in rungs:
+            rungs.append(size)
+    return rungs
+
+
+class BitrateController:
+    """Picks (quality, width, height) for the next frames.
+
+    settings is replaced as a whole tuple, so encode workers can read it
+    without a lock; only the send loop calls the record_* and update
+    methods."""
+
+    def __init__(self, width: int, height: int, quality: int,
+                 target_bps: float = TARGET_BPS, target_fps: float = TARGET_FPS) -> None:
+        self._ladder     = resolution_ladder(width, height)
+        self._rung       = 0
+        self._quality    = max(Q_MIN, min(Q_MAX, quality))
+        self.target_bps  = target_bps
+        self.target_fps  = target_fps
+        self.settings    = (self._quality, *self._ladder[0])
+        self._bad        = 0
+        self._good       = 0
+        self._reset_window(time.monotonic())
+
+    def _reset_window(self, now: float) -> None:
+        self._t0       = now
+        self._attempts = 0
+        self._fails    = 0
+        self._bytes    = 0
+        self._enc_s    = 0.0
+
+    def record_send(self, ok: bool, nbytes: int, encode_s: float) -> None:
+        self._attempts += 1
+        self._enc_s    += encode_s
+        if ok:
+            self._bytes += nbytes
+        else:
+            self._fails += 1
+
+    def update(self, workers: int, now: float | None = None) -> bool:
+        """Run one control step if the window elapsed. Returns True when
+        settings changed."""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._t0
+        if elapsed < WINDOW_S or self._attempts == 0:
+            return False
+
+        sent      = self._attempts - self._fails
+        fail_rate = self._fails / self._attempts
+        bps       = self._bytes / elapsed
+        fps       = sent / elapsed
+        # Frames/s the encode pool could sustain at the current setting.
+        enc_fps   = workers * self._attempts / self._enc_s if self._enc_s > 0 else float("inf")
+        self._reset_window(now)
+
+        congested  = fail_rate > FAIL_HI or bps > self.target_bps
+        enc_bound  = enc_fps < self.target_fps * FPS_LO
+        headroom   = (fail_rate == 0.0 and bps < self.target_bps * BPS_HEADROOM
+                      and not enc_bound and fps >= self.target_fps * FPS_LO)
+
+        quality, rung = self._quality, self._rung
+        if congested or enc_bound:
+            self._good = 0
+            if quality > Q_MIN:
+                quality = max(Q_MIN, quality - Q_STEP_DOWN)
+            else:
+                self._bad += 1
+                if self._bad >= DOWN_WINDOWS and rung + 1 < len(self._ladder):
+                    rung += 1
+                    quality = Q_AFTER_DOWN
+                    self._bad = 0
+        elif headroom:
+            self._bad = 0
+            if quality < Q_MAX:
+                quality = min(Q_MAX, quality + Q_STEP_UP)
+            else:
+                self._good += 1
+                if self._good >= UP_WINDOWS and rung > 0:
+                    rung -= 1
+                    quality = Q_AFTER_UP
+                    self._good = 0
+        else:
+            self._bad = self._good = 0
+
+        if quality == self._quality and rung == self._rung:
+            return False
+        old = self.settings
+        self._quality, self._rung = quality, rung
+        self.settings = (quality, *self._ladder[rung])
+        print(f"[abr] q{old[0]} {old[1]}x{old[2]} -> q{quality}"
+              f" {self.settings[1]}x{self.settings[2]}"
+              f"  ({bps / 1024:.0f} KB/s  {fps:.1f} fps  fail={fail_rate:.0%}"
+              f"  enc_cap={enc_fps:.0f} fps)", flush=True)
+        return True
@@ -1,15 +1,30 @@
 import math
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
 
 from gps import GNSSRecord
 from gyro import GyroRecord
 
+try:
+    from fusion import STATE_LEN, SEQLOCK_HEADER_BYTES, fuse_imu, seqlock_read, seqlock_write
+except ImportError:
+    # Not built (python setup.py build_ext --inplace): batches fall back to
+    # the per-sample Python filter and SharedFused to a Python seqlock.
+    STATE_LEN, SEQLOCK_HEADER_BYTES = 10, 8
+    fuse_imu = seqlock_read = seqlock_write = None
+
 ALPHA           = 0.98    # complementary filter: trust gyro 98 %, accel tilt 2 %
 G               = 9.80665 # standard gravity m/s^2
 ZUPT_ACC_THRESH = 0.3     # |acc| deviation from G below which we consider stationary
 ZUPT_GYR_THRESH = 0.05    # gyro magnitude below which we consider stationary
 GPS_VEL_INTERVAL = 60     # every N GPS readings update velocity from GPS
+IMU_MAX_DT      = 0.5     # larger gaps only reset the IMU clock
+SHM_NAME        = "flycam_fused"
+SEQLOCK_TRIES   = 10000   # reader gives up (valid=False) after this many torn reads
 
 
 @dataclass
@@ -26,74 +41,155 @@ class FusedState:
     rot_x: float = 0.0  # pitch
     rot_y: float = 0.0  # roll
     rot_z: float = 0.0  # yaw
+    # Latest raw body-frame sample
+    acc_x: float = 0.0  # m/s^2
+    acc_y: float = 0.0
+    acc_z: float = 0.0
+    gyr_x: float = 0.0  # rad/s
+    gyr_y: float = 0.0
+    gyr_z: float = 0.0
     gps_fix: int = 0
+    # Slow-changing status, sent on the metadata channel
+    gps_sats: int = 0  # satellites used (GGA)
+    gps_hdop: float = 0.0
+    imu_temp: float = 0.0  # deg C
     valid: bool = False
 
 
 class _State:
     pos        = [0.0, 0.0, 0.0]
     vel        = [0.0, 0.0, 0.0]
+    acc        = [0.0, 0.0, 0.0]
+    gyr        = [0.0, 0.0, 0.0]
     pitch      = 0.0
     roll       = 0.0
     yaw        = 0.0
     gps_fix    = 0
     gps_count  = 0
+    gps_sats   = 0
+    gps_hdop   = 0.0
+    imu_temp   = 0.0
     t_last_imu = 0.0
 
 
 _s    = _State()
 _lock = threading.Lock()
+_vec  = np.zeros(STATE_LEN, np.float64)   # fuse_imu state, only touched under _lock
 
 
 def update_imu(rec: GyroRecord) -> None:
     ax, ay, az = rec.acceleration
     gx, gy, gz = rec.gyro
-    now = rec.timestamp
-
     with _lock:
-        dt = now - _s.t_last_imu if _s.t_last_imu > 0.0 else 0.0
-        _s.t_last_imu = now
+        _step(rec.timestamp, ax, ay, az, gx, gy, gz)
+
+
+def _step(now: float, ax: float, ay: float, az: float,
+          gx: float, gy: float, gz: float) -> None:
+    # Caller holds _lock.
+    _s.acc[:] = [ax, ay, az]
+    _s.gyr[:] = [gx, gy, gz]
+    dt = now - _s.t_last_imu if _s.t_last_imu > 0.0 else 0.0
+    _s.t_last_imu = now
+
+    if not (0.0 < dt < IMU_MAX_DT):
+        return
+
+    # --- Orientation (complementary filter) ---
+    acc_mag = math.sqrt(ax * ax + ay * ay + az * az)
+    if 0.5 * G < acc_mag < 2.0 * G:
+        acc_pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+        acc_roll  = math.atan2(ay, az)
+        _s.pitch = ALPHA * (_s.pitch + gy * dt) + (1.0 - ALPHA) * acc_pitch
+        _s.roll  = ALPHA * (_s.roll  + gx * dt) + (1.0 - ALPHA) * acc_roll
+    else:
+        _s.pitch += gy * dt
+        _s.roll  += gx * dt
+    _s.yaw += gz * dt
+
+    # --- Remove gravity from body-frame acceleration ---
+    sp = math.sin(_s.pitch); cp = math.cos(_s.pitch)
+    sr = math.sin(_s.roll);  cr = math.cos(_s.roll)
+    cy = math.cos(_s.yaw);   sy = math.sin(_s.yaw)
+    lax = ax - (-G * sp)
+    lay = ay - ( G * cp * sr)
+    laz = az - ( G * cp * cr)
+
+    # --- Rotate linear acceleration to world frame: R = Rz(yaw)*Ry(pitch)*Rx(roll) ---
+    wx = cy*cp*lax + (cy*sp*sr - sy*cr)*lay + (cy*sp*cr + sy*sr)*laz
+    wy = sy*cp*lax + (sy*sp*sr + cy*cr)*lay + (sy*sp*cr - cy*sr)*laz
+    wz =   -sp*lax +       cp*sr*lay         +       cp*cr*laz
 
-        if not (0.0 < dt < 0.5):
+    # --- ZUPT: zero velocity when stationary to stop bias drift ---
+    gyro_mag = math.sqrt(gx * gx + gy * gy + gz * gz)
+    if abs(acc_mag - G) < ZUPT_ACC_THRESH and gyro_mag < ZUPT_GYR_THRESH:
+        _s.vel[:] = [0.0, 0.0, 0.0]
+    else:
+        _s.vel[0] += wx * dt
+        _s.vel[1] += wy * dt
+        _s.vel[2] += wz * dt
+
+    _s.pos[0] += _s.vel[0] * dt
+    _s.pos[1] += _s.vel[1] * dt
+    _s.pos[2] += _s.vel[2] * dt
+
+
+def update_imu_batch(timestamp, acceleration, gyro, temperature: float | None = None) -> None:
+    """Fuse n samples at once: timestamp (n,) seconds, acceleration (n, 3)
+    m/s^2, gyro (n, 3) rad/s, e.g. the arrays of a gyro.ImuBatch. Same
+    filter as update_imu, taking the lock once per batch. temperature
+    (deg C), if given, is kept for get_fused."""
+    t   = np.ascontiguousarray(timestamp, dtype=np.float64)
+    acc = np.ascontiguousarray(acceleration, dtype=np.float32)
+    gyr = np.ascontiguousarray(gyro, dtype=np.float32)
+    if acc.shape != (len(t), 3) or gyr.shape != (len(t), 3):
+        raise ValueError(f"expected acceleration and gyro of shape ({len(t)}, 3), "
+                         f"got {acc.shape} and {gyr.shape}")
+
+    if len(t) == 0:
+        return
+
+    with _lock:
+        if temperature is not None:
+            _s.imu_temp = temperature
+        if fuse_imu is None:
+            for i in range(len(t)):
+                ax, ay, az = acc[i].tolist()
+                gx, gy, gz = gyr[i].tolist()
+                _step(float(t[i]), ax, ay, az, gx, gy, gz)
             return
 
-        # --- Orientation (complementary filter) ---
-        acc_mag = math.sqrt(ax * ax + ay * ay + az * az)
-        if 0.5 * G < acc_mag < 2.0 * G:
-            acc_pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az))
-            acc_roll  = math.atan2(ay, az)
-            _s.pitch = ALPHA * (_s.pitch + gy * dt) + (1.0 - ALPHA) * acc_pitch
-            _s.roll  = ALPHA * (_s.roll  + gx * dt) + (1.0 - ALPHA) * acc_roll
-        else:
-            _s.pitch += gy * dt
-            _s.roll  += gx * dt
-        _s.yaw += gz * dt
-
-        # --- Remove gravity from body-frame acceleration ---
-        sp = math.sin(_s.pitch); cp = math.cos(_s.pitch)
-        sr = math.sin(_s.roll);  cr = math.cos(_s.roll)
-        cy = math.cos(_s.yaw);   sy = math.sin(_s.yaw)
-        lax = ax - (-G * sp)
-        lay = ay - ( G * cp * sr)
-        laz = az - ( G * cp * cr)
-
-        # --- Rotate linear acceleration to world frame: R = Rz(yaw)*Ry(pitch)*Rx(roll) ---
-        wx = cy*cp*lax + (cy*sp*sr - sy*cr)*lay + (cy*sp*cr + sy*sr)*laz
-        wy = sy*cp*lax + (sy*sp*sr + cy*cr)*lay + (sy*sp*cr - cy*sr)*laz
-        wz =   -sp*lax +       cp*sr*lay         +       cp*cr*laz
-
-        # --- ZUPT: zero velocity when stationary to stop bias drift ---
-        gyro_mag = math.sqrt(gx * gx + gy * gy + gz * gz)
-        if abs(acc_mag - G) < ZUPT_ACC_THRESH and gyro_mag < ZUPT_GYR_THRESH:
-            _s.vel[:] = [0.0, 0.0, 0.0]
-        else:
-            _s.vel[0] += wx * dt
-            _s.vel[1] += wy * dt
-            _s.vel[2] += wz * dt
+        _vec[0:3] = (_s.pitch, _s.roll, _s.yaw)
+        _vec[3:6] = _s.vel
+        _vec[6:9] = _s.pos
+        _vec[9]   = _s.t_last_imu
+        fuse_imu(t, acc, gyr, _vec, ALPHA, G, ZUPT_ACC_THRESH, ZUPT_GYR_THRESH, IMU_MAX_DT)
+        _s.pitch, _s.roll, _s.yaw = _vec[0:3].tolist()
+        _s.vel[:] = _vec[3:6].tolist()
+        _s.pos[:] = _vec[6:9].tolist()
+        _s.t_last_imu = float(_vec[9])
+        _s.acc[:] = acc[-1].tolist()
+        _s.gyr[:] = gyr[-1].tolist()
 
-        _s.pos[0] += _s.vel[0] * dt
-        _s.pos[1] += _s.vel[1] * dt
-        _s.pos[2] += _s.vel[2] * dt
+
+def anchor(pos: tuple[float, float, float], vel: tuple[float, float, float],
+           gps_fix: int) -> None:
+    """Overwrite position and velocity, e.g. with a GPS fix, and record
+    its fix quality. Dead reckoning continues from there."""
+    with _lock:
+        _s.pos[:] = list(pos)
+        _s.vel[:] = list(vel)
+        _s.gps_fix = gps_fix
+
+
+def update_gnss_quality(satellites: int | None, hdop: float | None) -> None:
+    """Record the receiver's satellites used and HDOP (None keeps the last
+    value), with or without a fix."""
+    with _lock:
+        if satellites is not None:
+            _s.gps_sats = satellites
+        if hdop is not None:
+            _s.gps_hdop = hdop
 
 
 def update_gps(rec: GNSSRecord) -> None:
@@ -126,6 +222,100 @@ def get_fused() -> FusedState:
             pos_x=_s.pos[0], pos_y=_s.pos[1], pos_z=_s.pos[2],
             vel_x=_s.vel[0], vel_y=_s.vel[1], vel_z=_s.vel[2],
             rot_x=_s.pitch,  rot_y=_s.roll,   rot_z=_s.yaw,
+            acc_x=_s.acc[0], acc_y=_s.acc[1], acc_z=_s.acc[2],
+            gyr_x=_s.gyr[0], gyr_y=_s.gyr[1], gyr_z=_s.gyr[2],
             gps_fix=_s.gps_fix,
+            gps_sats=_s.gps_sats, gps_hdop=_s.gps_hdop, imu_temp=_s.imu_temp,
             valid=True,
         )
+
+
+_SHM_FIELDS = tuple(f.name for f in fields(FusedState) if f.name != "valid")
+
+
+class SharedFused:
+    """FusedState in shared memory behind a seqlock, so a sensor process can
+    publish and a video process read without locks or IPC round-trips.
+
+    Layout: u64 sequence number, then one float64 per FusedState field.
+    The writer makes the sequence odd, stores the values, makes it even
+    again; a reader retries until it sees the same even sequence before and
+    after copying. Exactly one process may publish. read() returns
+    valid=False until the first publish."""
+
+    def __init__(self, name: str = SHM_NAME, create: bool = False) -> None:
+        size = SEQLOCK_HEADER_BYTES + 8 * len(_SHM_FIELDS)
+        if create:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = self._attach(name)
+        self._owner = create
+        self._buf   = np.ndarray((size,), np.uint8, self._shm.buf)
+        self._seq   = np.ndarray((1,), np.uint64, self._shm.buf, 0)
+        self._data  = np.ndarray((len(_SHM_FIELDS),), np.float64, self._shm.buf, SEQLOCK_HEADER_BYTES)
+        self._vals  = np.zeros(len(_SHM_FIELDS), np.float64)
+        if create:
+            self._buf[:] = 0
+
+    @staticmethod
+    def _attach(name: str) -> shared_memory.SharedMemory:
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)   # 3.13+
+        except TypeError:
+            pass
+        shm = shared_memory.SharedMemory(name=name)
+        # Older versions register every attach with this process's resource
+        # tracker, which unlinks the segment when we exit. A multiprocessing
+        # child shares the creator's tracker, where it is registered anyway.
+        if multiprocessing.parent_process() is None:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def publish(self, st: FusedState) -> None:
+        self._vals[:] = [getattr(st, n) for n in _SHM_FIELDS]
+        if seqlock_write is not None:
+            seqlock_write(self._buf, self._vals)
+            return
+        # Python fallback: no memory fences, relies on the GIL-sized gaps
+        # between statements and is only strictly ordered on x86.
+        seq = int(self._seq[0])
+        self._seq[0] = seq + 1
+        self._data[:] = self._vals
+        self._seq[0] = seq + 2
+
+    def read(self) -> FusedState:
+        if seqlock_read is not None:
+            seq = seqlock_read(self._buf, self._vals)
+        else:
+            for _ in range(SEQLOCK_TRIES):
+                seq = int(self._seq[0])
+                if seq & 1:
+                    continue
+                self._vals[:] = self._data
+                if int(self._seq[0]) == seq:
+                    break
+            else:
+                seq = -1
+        if seq <= 0:
+            return FusedState(valid=False)
+        st = FusedState(**dict(zip(_SHM_FIELDS, self._vals.tolist())), valid=True)
+        st.gps_fix  = int(st.gps_fix)
+        st.gps_sats = int(st.gps_sats)
+        return st
+
+    def close(self) -> None:
+        del self._buf, self._seq, self._data
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+
+try:
+    import simplejpeg
+except ImportError:
+    # Comes with picamera2; without it only the BGR path is available.
+    simplejpeg = None
+
+# JPEG encoder backends for record.py, chosen once at startup.
+#
+# "cv2" captures BGR888 and encodes with cv2.imencode, which converts every
+# pixel back to YCbCr and downsamples chroma inside libjpeg. "yuv420"
+# captures planar YUV420 (I420) and hands the planes to libjpeg-turbo's
+# raw-data path (simplejpeg.encode_jpeg_yuv_planes): no colour conversion,
+# no chroma downsampling, and 1.5 instead of 3 bytes per pixel from the
+# camera onwards.
+#
+# A frame is whatever from_camera()/from_bgr() return for the backend: an
+# (h, w, 3) BGR array, or a (Y, U, V) tuple of plane views. Both are views
+# of a buffer in the camera's layout, so capture can fill reused buffers;
+# from_bgr and resize write into out= when it has the right shape.
+
+ENCODERS = ("cv2", "yuv420")
+
+
+class Cv2Encoder:
+    name          = "cv2"
+    camera_format = "BGR888"
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width, self.height = width, height
+        self.raw_shape = (height, width, 3)    # from_bgr's out buffer
+
+    def from_camera(self, raw: np.ndarray) -> np.ndarray:
+        return raw
+
+    def from_bgr(self, bgr: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        if out is not None and out is not bgr:
+            np.copyto(out, bgr)
+            return out
+        return bgr
+
+    def luma(self, frame: np.ndarray) -> np.ndarray:
+        return frame                  # scenegate derives luma from BGR
+
+    def size(self, frame: np.ndarray) -> tuple[int, int]:
+        return frame.shape[1], frame.shape[0]
+
+    def resize(self, frame: np.ndarray, width: int, height: int,
+               out: np.ndarray | None = None) -> np.ndarray:
+        if out is not None and out.shape[:2] != (height, width):
+            out = None
+        return cv2.resize(frame, (width, height), dst=out, interpolation=cv2.INTER_AREA)
+
+    def encode(self, frame: np.ndarray, quality: int) -> np.ndarray | None:
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buf if ok else None
+
+
+class Yuv420Encoder:
+    name          = "yuv420"
+    camera_format = "YUV420"
+
+    def __init__(self, width: int, height: int) -> None:
+        if simplejpeg is None:
+            raise RuntimeError("yuv420 encoder needs simplejpeg (pip install simplejpeg)")
+        if width % 2 or height % 2:
+            raise ValueError(f"YUV420 needs an even size, got {width}x{height}")
+        self.width, self.height = width, height
+        self.raw_shape = (height * 3 // 2, width)
+        self._ycc  = None    # from_bgr scratch (capture thread only)
+        self._half = None
+
+    def from_camera(self, raw: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Plane views of a YUV420 capture: height * 3/2 rows of stride
+        bytes, the U and V planes packed at half stride after Y. No copy.
+        Preview configurations use the full-range sYCC colour space, which
+        is what a JFIF decoder assumes."""
+        h, w = self.height, self.width
+        stride = raw.shape[1]
+        n = h * stride
+        flat = raw.reshape(-1)
+        u = flat[n:n + n // 4].reshape(h // 2, stride // 2)
+        v = flat[n + n // 4:n + n // 2].reshape(h // 2, stride // 2)
+        return raw[:h, :w], u[:, :w // 2], v[:, :w // 2]
+
+    def from_bgr(self, bgr: np.ndarray, out: np.ndarray | None = None):
+        """DEBUG input, converted the way the camera delivers it: full-range
+        YCbCr (sYCC, picamera2's preview default and what JFIF expects;
+        COLOR_BGR2YUV_I420 would be limited range) with 2x2 chroma, written
+        into out (height * 3/2 rows of width bytes). Not thread-safe."""
+        h, w = self.height, self.width
+        if bgr.shape[:2] != (h, w):
+            raise ValueError(f"expected a {w}x{h} frame, got {bgr.shape[1]}x{bgr.shape[0]}")
+        if out is None:
+            out = np.empty(self.raw_shape, np.uint8)
+        if self._ycc is None:
+            self._ycc  = np.empty((h, w, 3), np.uint8)
+            self._half = np.empty((h // 2, w // 2, 3), np.uint8)
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2YCrCb, dst=self._ycc)
+        cv2.resize(self._ycc, (w // 2, h // 2), dst=self._half, interpolation=cv2.INTER_AREA)
+        y, u, v = self.from_camera(out)
+        cv2.extractChannel(self._ycc, 0, dst=y)
+        cv2.extractChannel(self._half, 2, dst=u)
+        cv2.extractChannel(self._half, 1, dst=v)
+        return y, u, v
+
+    def luma(self, frame) -> np.ndarray:
+        return frame[0]
+
+    def size(self, frame) -> tuple[int, int]:
+        return frame[0].shape[1], frame[0].shape[0]
+
+    def resize(self, frame, width: int, height: int, out=None):
+        if out is not None and out[0].shape != (height, width):
+            out = None
+        oy, ou, ov = out if out is not None else (None, None, None)
+        y, u, v = frame
+        half = (width // 2, height // 2)
+        return (cv2.resize(y, (width, height), dst=oy, interpolation=cv2.INTER_AREA),
+                cv2.resize(u, half, dst=ou, interpolation=cv2.INTER_AREA),
+                cv2.resize(v, half, dst=ov, interpolation=cv2.INTER_AREA))
+
+    def encode(self, frame, quality: int) -> np.ndarray:
+        y, u, v = frame
+        return np.frombuffer(simplejpeg.encode_jpeg_yuv_planes(y, u, v, quality), np.uint8)
+
+
+def make_encoder(name: str, width: int, height: int):
+    """name is one of ENCODERS or "auto" (yuv420 when simplejpeg is
+    installed, else cv2)."""
+    if name == "auto":
+        name = "yuv420" if simplejpeg is not None else "cv2"
+    if name == "cv2":
+        return Cv2Encoder(width, height)
+    if name == "yuv420":
+        return Yuv420Encoder(width, height)
+    raise ValueError(f"encoder must be auto or one of {ENCODERS}, got {name!r}")
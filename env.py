@@ -2,6 +2,9 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-SECRET         = os.getenv("SECRET")
-GO_SERVER      = os.getenv("GO_SERVER")
-GO_META_SERVER = os.getenv("GO_META_SERVER")
\ No newline at end of file
+SECRET             = os.getenv("SECRET")
+GO_SERVER          = os.getenv("GO_SERVER")
+GO_META_SERVER     = os.getenv("GO_META_SERVER")
+GO_PREVIEW_SERVER  = os.getenv("GO_PREVIEW_SERVER")
+FLYCAM_SERVER      = os.getenv("FLYCAM_SERVER")
+FLYCAM_META_SERVER = os.getenv("FLYCAM_META_SERVER")
@@ -0,0 +1,393 @@
+import argparse
+import glob
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from packet import HDR_SIZE, HEADER_DTYPE, header_size, parse_trace, v1_header
+
+# On-board flight log: the exact wire packets (header + JPEG [+ trailer]),
+# appended to segment files so footage and telemetry survive uplink drops.
+#
+# Segment file:
+#   [0]  segment header, SEG_HDR_SIZE bytes (zero padded)
+#          magic      4s   b'FCLG'
+#          version    u16
+#          hdr_size   u16  SEG_HDR_SIZE
+#          segment    u32  sequence number within the flight
+#          start_ns   u64  time.time_ns() when the segment was opened
+#   [..] records, each 8-byte aligned:
+#          magic      4s   b'FCPK'
+#          length     u32  packet bytes that follow
+#          packet     length bytes, zero padded to a multiple of 8
+#   [..] zero padding to ALIGN (only at the end of the data)
+#   [..] index, one INDEX_ENTRY per record in order:
+#          ts_ns      u64  capture wall clock (time.time_ns())
+#          offset     u64  file offset of the packet (after magic/length)
+#          size       u32  packet bytes
+#          flags      u32  reserved, 0
+#          header     80s  copy of the packet header, so the index alone
+#                          covers all telemetry (slim version 2 headers
+#                          are stored in the version 1 layout)
+#   [-24] footer
+#          magic      4s   b'FCIX'
+#          count      u32  index entries
+#          index_off  u64
+#          data_end   u64  end of the last record
+#
+# A segment without a footer (power loss) is still readable record by record
+# from SEG_HDR_SIZE.
+
+SEG_MAGIC     = b'FCLG'
+SEG_VERSION   = 1
+SEG_HDR_FMT   = '<4sHHIQ'
+SEG_HDR_SIZE  = 64
+REC_MAGIC     = b'FCPK'
+REC_FMT       = '<4sI'
+REC_SIZE      = struct.calcsize(REC_FMT)      # 8
+INDEX_FMT     = f'<QQII{HDR_SIZE}s'
+INDEX_SIZE    = struct.calcsize(INDEX_FMT)    # 104
+FOOTER_MAGIC  = b'FCIX'
+FOOTER_FMT    = '<4sIQQ'
+FOOTER_SIZE   = struct.calcsize(FOOTER_FMT)   # 24
+SEG_SUFFIX    = ".fclog"
+
+ALIGN         = 4096               # write size / offset granularity
+BLOCK_BYTES   = 1 << 20            # one write
+BLOCKS        = 16                 # memory bound: BLOCKS * BLOCK_BYTES
+SEGMENT_BYTES = 256 << 20          # roll over to a new file past this
+
+INDEX_DTYPE = np.dtype([
+    ('ts_ns',  '<u8'),
+    ('offset', '<u8'),
+    ('size',   '<u4'),
+    ('flags',  '<u4'),
+    ('header', HEADER_DTYPE),
+])
+assert INDEX_DTYPE.itemsize == INDEX_SIZE
+
+_SEG_HDR = struct.Struct(SEG_HDR_FMT)
+_REC     = struct.Struct(REC_FMT)
+_INDEX   = struct.Struct(INDEX_FMT)
+_FOOTER  = struct.Struct(FOOTER_FMT)
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class FlightRecorder:
+    """Append packets to a segmented log without ever blocking the caller.
+
+    append() copies the packet into the current BLOCK_BYTES buffer of a
+    fixed pool; full buffers go to a writer thread that issues one
+    block-sized write per buffer. When the writer falls behind (disk stall)
+    and no buffer is free, the packet is dropped and counted instead.
+    Only one thread may call append()."""
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES,
+                 block_bytes: int = BLOCK_BYTES, blocks: int = BLOCKS) -> None:
+        if block_bytes % ALIGN:
+            raise ValueError(f"block_bytes must be a multiple of {ALIGN}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory     = directory
+        self.segment_bytes = segment_bytes
+        self._block        = block_bytes
+        self._free: queue.Queue = queue.Queue()
+        for _ in range(blocks):
+            self._free.put(bytearray(block_bytes))
+        self._work: queue.Queue = queue.Queue()
+        self._buf: bytearray | None = None
+        self._fill    = 0          # bytes used in _buf
+        self._offset  = 0          # file offset of the next byte appended
+        self._index   = bytearray()
+        self._segment = -1
+        self._open    = False      # a segment has been started and not ended
+        self._prefix  = time.strftime("flight_%Y%m%d_%H%M%S")
+        self.dropped  = 0
+        self.written  = 0          # packets handed to the writer
+        self.write_errors = 0
+        self._closed  = False
+        self._thread  = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _take(self) -> bool:
+        try:
+            self._buf = self._free.get_nowait()
+        except queue.Empty:
+            return False
+        self._fill = 0
+        return True
+
+    def _put(self, data) -> None:
+        """Copy data into the buffer chain. The caller has checked that
+        enough buffers are free."""
+        view = memoryview(data)
+        pos = 0
+        while pos < len(view):
+            if self._fill == self._block:
+                self._work.put(("data", self._buf, self._block))
+                self._take()
+            n = min(len(view) - pos, self._block - self._fill)
+            self._buf[self._fill:self._fill + n] = view[pos:pos + n]
+            self._fill += n
+            pos += n
+        self._offset += len(view)
+
+    def _blocks_needed(self, nbytes: int) -> int:
+        room = self._block - self._fill if self._buf is not None else 0
+        return max(0, -(-(nbytes - room) // self._block))
+
+    def _start_segment(self) -> bool:
+        if self._blocks_needed(SEG_HDR_SIZE) > self._free.qsize():
+            return False
+        self._segment += 1
+        path = os.path.join(self.directory, f"{self._prefix}_{self._segment:03d}{SEG_SUFFIX}")
+        self._work.put(("open", path, 0))
+        self._offset = 0
+        self._index  = bytearray()
+        if self._buf is None:
+            self._take()
+        hdr = bytearray(SEG_HDR_SIZE)
+        _SEG_HDR.pack_into(hdr, 0, SEG_MAGIC, SEG_VERSION, SEG_HDR_SIZE,
+                           self._segment, time.time_ns())
+        self._put(hdr)
+        self._open = True
+        return True
+
+    def _end_segment(self) -> None:
+        """Flush the partial buffer (padded to ALIGN) and queue the index."""
+        data_end = self._offset
+        if self._buf is not None and self._fill:
+            used = -(-self._fill // ALIGN) * ALIGN
+            self._buf[self._fill:used] = bytes(used - self._fill)
+            self._work.put(("data", self._buf, used))
+            self._buf = None
+            self._offset += used - self._fill
+        count = len(self._index) // INDEX_SIZE
+        tail = bytes(self._index) + _FOOTER.pack(FOOTER_MAGIC, count, self._offset, data_end)
+        self._work.put(("end", tail, 0))
+        self._open = False
+
+    def append(self, pkt, ts_ns: int | None = None) -> bool:
+        """Queue one packet; returns False if it was dropped."""
+        if self._closed:
+            return False
+        size = len(pkt)
+        rec  = REC_SIZE + _pad8(size)
+        if not self._open or (self._offset + rec > self.segment_bytes
+                              and self._offset > SEG_HDR_SIZE):
+            if self._open:
+                self._end_segment()
+            if not self._start_segment():
+                self.dropped += 1
+                return False
+        if self._blocks_needed(rec) > self._free.qsize():
+            self.dropped += 1
+            return False
+        if self._buf is None:
+            self._take()
+
+        offset = self._offset + REC_SIZE
+        self._put(_REC.pack(REC_MAGIC, size))
+        self._put(pkt)
+        if rec - REC_SIZE > size:
+            self._put(bytes(rec - REC_SIZE - size))
+        if ts_ns is None:
+            ts_ns = time.time_ns()
+        self._index += _INDEX.pack(ts_ns, offset, size, 0, v1_header(pkt, ts_ns // 1_000_000_000))
+        self.written += 1
+        return True
+
+    def _writer(self) -> None:
+        fd = -1
+        pos = 0
+        while True:
+            kind, item, n = self._work.get()
+            if kind == "stop":
+                return
+            try:
+                if kind == "open":
+                    fd = os.open(item, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                    pos = 0
+                    print(f"[rec] {item}", flush=True)
+                elif fd < 0:
+                    pass   # open failed; drain until the next segment
+                elif kind == "data":
+                    os.write(fd, memoryview(item)[:n])
+                    # Written video is not read back; keep it out of the
+                    # page cache so it does not squeeze the encoder.
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(fd, pos, n, os.POSIX_FADV_DONTNEED)
+                    pos += n
+                else:
+                    os.write(fd, item)
+                    os.fsync(fd)
+                    os.close(fd)
+                    fd = -1
+            except OSError as e:
+                self.write_errors += 1
+                print(f"[rec] write failed: {e}", flush=True)
+            finally:
+                if kind == "data":
+                    self._free.put(item)
+
+    def close(self) -> None:
+        """Write the pending data and the segment index, then stop."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._open:
+            self._end_segment()
+        self._work.put(("stop", None, 0))
+        self._thread.join()
+
+
+def segment_paths(path) -> list[str]:
+    """Segments of a flight: a segment file, a list of them, a directory
+    (every segment in it) or a path prefix such as flights/flight_20240623_101500.
+    Names sort in recording order."""
+    if isinstance(path, (list, tuple)):
+        return list(path)
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*" + SEG_SUFFIX)))
+    if os.path.isfile(path):
+        return [path]
+    return sorted(glob.glob(glob.escape(path) + "*" + SEG_SUFFIX))
+
+
+def _scan(mm: mmap.mmap) -> np.ndarray:
+    """Rebuild the index of a segment that has no footer."""
+    entries = bytearray()
+    off, end = SEG_HDR_SIZE, len(mm)
+    with memoryview(mm) as view:
+        while off + REC_SIZE <= end:
+            magic, size = _REC.unpack_from(view, off)
+            start = off + REC_SIZE
+            if magic != REC_MAGIC or start + size > end:
+                break
+            pkt   = view[start:start + size]
+            trace = parse_trace(pkt)
+            ts_ns = trace["capture_wall_ns"] if trace else 0
+            entries += _INDEX.pack(ts_ns, start, size, 0,
+                                   v1_header(pkt, ts_ns // 1_000_000_000) if size >= header_size(pkt)
+                                   else bytes(pkt))
+            off = start + _pad8(size)
+    return np.frombuffer(bytes(entries), INDEX_DTYPE)
+
+
+def _load_index(mm: mmap.mmap, path: str) -> np.ndarray:
+    if len(mm) < SEG_HDR_SIZE or mm[:4] != SEG_MAGIC:
+        raise ValueError(f"{path}: not a flight log segment")
+    if len(mm) >= SEG_HDR_SIZE + FOOTER_SIZE:
+        magic, count, index_off, _ = _FOOTER.unpack_from(mm, len(mm) - FOOTER_SIZE)
+        if magic == FOOTER_MAGIC and index_off + count * INDEX_SIZE <= len(mm) - FOOTER_SIZE:
+            return np.frombuffer(mm, INDEX_DTYPE, count, index_off)
+    print(f"[log] {path}: no index (recorder stopped early), scanning records", flush=True)
+    return _scan(mm)
+
+
+class FlightLog:
+    """Random access to a recorded flight through mmap.
+
+    index holds one INDEX_DTYPE row per frame and headers (= index['header'])
+    the telemetry as HEADER_DTYPE records. For a single segment both are
+    views of the segment's index block; a flight of several segments
+    concatenates their indexes once (INDEX_SIZE bytes per frame). JPEG data
+    is only paged in when jpeg() or frame() asks for it."""
+
+    def __init__(self, path) -> None:
+        self.paths = [p for p in segment_paths(path) if os.path.getsize(p) > 0]
+        if not self.paths:
+            raise FileNotFoundError(f"no {SEG_SUFFIX} segments at {path}")
+        self._maps: list[mmap.mmap] = []
+        parts = []
+        for p in self.paths:
+            with open(p, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mm)
+            parts.append(_load_index(mm, p))
+        if len(parts) == 1:
+            self.index = parts[0]
+            self._seg  = np.zeros(len(parts[0]), np.int32)
+        else:
+            self.index = np.concatenate(parts)
+            self._seg  = np.repeat(np.arange(len(parts), dtype=np.int32), [len(x) for x in parts])
+        self.headers = self.index['header']
+        self.ts_ns   = self.index['ts_ns']
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def seek(self, ts_ns: int) -> int:
+        """Frame captured at or just before ts_ns (the first frame if ts_ns
+        is earlier). Binary search over capture wall-clock times."""
+        return max(0, int(np.searchsorted(self.ts_ns, ts_ns, side="right")) - 1)
+
+    def packet(self, i: int) -> memoryview:
+        """Wire packet of frame i (header + JPEG [+ trailer]), zero-copy."""
+        off, size = int(self.index['offset'][i]), int(self.index['size'][i])
+        return memoryview(self._maps[self._seg[i]])[off:off + size]
+
+    def jpeg(self, i: int) -> np.ndarray:
+        """JPEG bytes of frame i as a read-only uint8 view of the file."""
+        mm  = self._maps[self._seg[i]]
+        off = int(self.index['offset'][i])
+        off += header_size(mm[off:off + 4])
+        return np.frombuffer(mm, np.uint8,
+                             int(self.headers['jpeg_size'][i]), off)
+
+    def frame(self, i: int) -> np.ndarray | None:
+        """Decode frame i to BGR; None for a keepalive (jpeg_size 0) or a
+        corrupt JPEG."""
+        jpeg = self.jpeg(i)
+        return cv2.imdecode(jpeg, cv2.IMREAD_COLOR) if jpeg.size else None
+
+    def close(self) -> None:
+        self.index = self.headers = self.ts_ns = None
+        for mm in self._maps:
+            try:
+                mm.close()
+            except BufferError:
+                pass   # caller still holds a view; unmapped when it is freed
+        self._maps = []
+
+    def __enter__(self) -> "FlightLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Summarize a recorded flight log.")
+    ap.add_argument("path", help="segment file, directory or flight prefix")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with FlightLog(args.path) as log:
+        hdr = log.headers
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        n = len(log)
+        if n == 0:
+            print(f"{len(log.paths)} segment(s), no frames")
+            return
+        span = (int(log.ts_ns[-1]) - int(log.ts_ns[0])) / 1e9
+        print(f"{len(log.paths)} segment(s)  {n} frames  {span:.1f} s"
+              f"  ({n / span if span > 0 else 0:.1f} fps)  index loaded in {load_ms:.1f} ms")
+        sizes = hdr['jpeg_size'][hdr['jpeg_size'] > 0]
+        if sizes.size:
+            print(f"jpeg  mean {sizes.mean() / 1024:.1f} KB  max {sizes.max() / 1024:.1f} KB"
+                  f"  ({n - sizes.size} keepalives)")
+        print(f"gps   fix in {np.count_nonzero(hdr['gps_fix'] > 0) / n:.0%} of frames")
+        print(f"yaw   {np.degrees(hdr['yaw'].min()):.1f} .. {np.degrees(hdr['yaw'].max()):.1f} deg")
+
+
+if __name__ == "__main__":
+    main()
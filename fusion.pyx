@@ -0,0 +1,157 @@
+# cython: boundscheck=False
+# cython: wraparound=False
+# cython: cdivision=True
+
+from libc.math cimport atan2, cos, fabs, sin, sqrt
+
+# State vector shared with datafussion.update_imu_batch
+STATE_LEN = 10
+cdef enum:
+    S_PITCH  = 0
+    S_ROLL   = 1
+    S_YAW    = 2
+    S_VEL    = 3   # 3..5
+    S_POS    = 6   # 6..8
+    S_T_LAST = 9
+
+
+def fuse_imu(
+    const double[::1] t,
+    const float[:, ::1] acc,
+    const float[:, ::1] gyr,
+    double[::1] state,
+    double alpha,
+    double g,
+    double zupt_acc,
+    double zupt_gyr,
+    double max_dt,
+):
+    """
+    Run the complementary filter, gravity removal, world rotation, ZUPT and
+    integration of datafussion.update_imu over n samples, updating state in
+    place. Samples whose dt is outside (0, max_dt) only advance the clock.
+    """
+    cdef Py_ssize_t n = t.shape[0]
+    if acc.shape[0] != n or gyr.shape[0] != n or acc.shape[1] != 3 or gyr.shape[1] != 3:
+        raise ValueError(f"expected acc and gyro of shape ({n}, 3)")
+    if state.shape[0] != STATE_LEN:
+        raise ValueError(f"state must have {STATE_LEN} elements")
+
+    cdef Py_ssize_t i
+    cdef double ax, ay, az, gx, gy, gz, now, dt
+    cdef double acc_mag, gyro_mag, sp, cp, sr, cr, sy, cy
+    cdef double lax, lay, laz, wx, wy, wz
+    cdef double pitch = state[S_PITCH], roll = state[S_ROLL], yaw = state[S_YAW]
+    cdef double vx = state[S_VEL], vy = state[S_VEL + 1], vz = state[S_VEL + 2]
+    cdef double px = state[S_POS], py = state[S_POS + 1], pz = state[S_POS + 2]
+    cdef double t_last = state[S_T_LAST]
+
+    with nogil:
+        for i in range(n):
+            ax = acc[i, 0]; ay = acc[i, 1]; az = acc[i, 2]
+            gx = gyr[i, 0]; gy = gyr[i, 1]; gz = gyr[i, 2]
+            now = t[i]
+            dt = now - t_last if t_last > 0.0 else 0.0
+            t_last = now
+            if not (0.0 < dt < max_dt):
+                continue
+
+            acc_mag = sqrt(ax * ax + ay * ay + az * az)
+            if 0.5 * g < acc_mag < 2.0 * g:
+                pitch = alpha * (pitch + gy * dt) + (1.0 - alpha) * atan2(-ax, sqrt(ay * ay + az * az))
+                roll  = alpha * (roll  + gx * dt) + (1.0 - alpha) * atan2(ay, az)
+            else:
+                pitch += gy * dt
+                roll  += gx * dt
+            yaw += gz * dt
+
+            sp = sin(pitch); cp = cos(pitch)
+            sr = sin(roll);  cr = cos(roll)
+            sy = sin(yaw);   cy = cos(yaw)
+            lax = ax + g * sp
+            lay = ay - g * cp * sr
+            laz = az - g * cp * cr
+
+            wx = cy*cp*lax + (cy*sp*sr - sy*cr)*lay + (cy*sp*cr + sy*sr)*laz
+            wy = sy*cp*lax + (sy*sp*sr + cy*cr)*lay + (sy*sp*cr - cy*sr)*laz
+            wz =   -sp*lax +       cp*sr*lay         +       cp*cr*laz
+
+            gyro_mag = sqrt(gx * gx + gy * gy + gz * gz)
+            if fabs(acc_mag - g) < zupt_acc and gyro_mag < zupt_gyr:
+                vx = 0.0; vy = 0.0; vz = 0.0
+            else:
+                vx += wx * dt; vy += wy * dt; vz += wz * dt
+
+            px += vx * dt; py += vy * dt; pz += vz * dt
+
+    state[S_PITCH] = pitch; state[S_ROLL] = roll; state[S_YAW] = yaw
+    state[S_VEL] = vx; state[S_VEL + 1] = vy; state[S_VEL + 2] = vz
+    state[S_POS] = px; state[S_POS + 1] = py; state[S_POS + 2] = pz
+    state[S_T_LAST] = t_last
+
+
+# Seqlock over a shared buffer: u64 sequence at offset 0, float64 values
+# from offset 8. One writer; readers never block it. An odd sequence means
+# a write is in progress. The fences order the sequence and data stores on
+# weakly ordered CPUs (the Pi's Cortex-A cores).
+cdef extern from *:
+    """
+    #include <stdint.h>
+    #include <string.h>
+    static inline void flycam_fence(void) { __atomic_thread_fence(__ATOMIC_SEQ_CST); }
+    static inline uint64_t flycam_load_seq(const unsigned char *p) {
+        return __atomic_load_n((const uint64_t *)p, __ATOMIC_ACQUIRE);
+    }
+    static inline void flycam_store_seq(unsigned char *p, uint64_t v) {
+        __atomic_store_n((uint64_t *)p, v, __ATOMIC_RELEASE);
+    }
+    """
+    void flycam_fence() nogil
+    unsigned long long flycam_load_seq(const unsigned char* p) nogil
+    void flycam_store_seq(unsigned char* p, unsigned long long v) nogil
+    void* memcpy(void* dst, const void* src, size_t n) nogil
+
+cdef enum:
+    SEQLOCK_HEADER = 8
+    SEQLOCK_TRIES  = 10000
+
+SEQLOCK_HEADER_BYTES = SEQLOCK_HEADER
+
+
+def seqlock_write(unsigned char[::1] buf, const double[::1] values):
+    """Publish values; returns the new (even) sequence number."""
+    cdef Py_ssize_t n = values.shape[0]
+    if buf.shape[0] < SEQLOCK_HEADER + n * 8:
+        raise ValueError("seqlock buffer too small")
+    cdef unsigned long long seq
+    with nogil:
+        seq = flycam_load_seq(&buf[0])
+        flycam_store_seq(&buf[0], seq + 1)
+        flycam_fence()
+        memcpy(&buf[SEQLOCK_HEADER], &values[0], n * 8)
+        flycam_fence()
+        flycam_store_seq(&buf[0], seq + 2)
+    return seq + 2
+
+
+def seqlock_read(const unsigned char[::1] buf, double[::1] out):
+    """Copy a consistent snapshot into out; returns its sequence number,
+    or -1 if the writer kept interfering for SEQLOCK_TRIES attempts."""
+    cdef Py_ssize_t n = out.shape[0]
+    if buf.shape[0] < SEQLOCK_HEADER + n * 8:
+        raise ValueError("seqlock buffer too small")
+    cdef unsigned long long s1, s2
+    cdef long long result = -1
+    cdef int tries
+    with nogil:
+        for tries in range(SEQLOCK_TRIES):
+            s1 = flycam_load_seq(&buf[0])
+            if s1 & 1:
+                continue
+            memcpy(&out[0], &buf[SEQLOCK_HEADER], n * 8)
+            flycam_fence()
+            s2 = flycam_load_seq(&buf[0])
+            if s1 == s2:
+                result = <long long>s1
+                break
+    return result
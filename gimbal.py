@@ -0,0 +1,173 @@
+"""Camera gimbal stabilization: fused pitch/roll -> PID -> servos at a fixed rate.
+
+    python gimbal.py [--rate 200] [--fake-bus] [--shm]
+
+Each tick (servo.Ticker deadline, not a sleep) reads the latest fused
+orientation, runs one PID per axis with the gyro rate as the derivative
+term, maps the servo angles to PCA9685 counts through precomputed tables
+and pushes both channels in one ServoDriver.set_offs call. Lateness past
+each deadline, missed deadlines and the work time per tick are reported
+every LOG_S."""
+
+import argparse
+import math
+import threading
+import time
+
+import numpy as np
+
+import datafussion
+from servo import ANGLE_MAX, ANGLE_MIN, FakeSMBus, ServoDriver, Ticker
+
+RATE_HZ     = 200
+LOG_S       = 1.0
+PITCH_CH    = 0
+ROLL_CH     = 1
+NEUTRAL_DEG = 90.0      # servo angle that holds the camera level
+TABLE_STEP  = 0.1       # degrees per angle-to-count table entry
+KP, KI, KD  = 1.0, 0.5, 0.02   # deflection per rad, per rad*s, per rad/s
+I_LIMIT     = math.radians(10)
+OUT_LIMIT   = math.radians(80)
+STATS_TICKS = 4096      # samples kept for the jitter percentiles
+
+
+class PID:
+    """PID on angle error. The derivative comes from the measured rate
+    (gyro), not from differencing the error, so it has no setpoint kick
+    and no extra noise."""
+
+    def __init__(self, kp: float, ki: float, kd: float,
+                 i_limit: float = I_LIMIT, out_limit: float = OUT_LIMIT) -> None:
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.i_limit   = i_limit
+        self.out_limit = out_limit
+        self._i        = 0.0
+
+    def update(self, error: float, rate: float, dt: float) -> float:
+        self._i = max(-self.i_limit, min(self.i_limit, self._i + self.ki * error * dt))
+        out = self.kp * error + self._i - self.kd * rate
+        return max(-self.out_limit, min(self.out_limit, out))
+
+    def reset(self) -> None:
+        self._i = 0.0
+
+
+def pulse_table(driver: ServoDriver, neutral_deg: float = NEUTRAL_DEG,
+                direction: float = 1.0) -> np.ndarray:
+    """PCA9685 OFF counts for deflections -90..+90 deg in TABLE_STEP steps
+    (index = round((deflection + 90) / TABLE_STEP))."""
+    deflection = np.arange(-90.0, 90.0 + TABLE_STEP / 2, TABLE_STEP)
+    angle = np.clip(neutral_deg + direction * deflection, ANGLE_MIN, ANGLE_MAX)
+    return np.array([driver._pulse_to_off(driver.angle_to_pulse(a)) for a in angle], np.int32)
+
+
+class Gimbal:
+    """Stabilization loop on its own thread. read_fused returns a FusedState
+    (datafussion.get_fused, or SharedFused.read across processes)."""
+
+    def __init__(self, driver: ServoDriver, read_fused=datafussion.get_fused,
+                 rate_hz: float = RATE_HZ, log: bool = True) -> None:
+        self.driver  = driver
+        self._read   = read_fused
+        self._rate   = rate_hz
+        self._log    = log
+        self._pitch  = PID(KP, KI, KD)
+        self._roll   = PID(KP, KI, KD)
+        self._tables = {PITCH_CH: pulse_table(driver), ROLL_CH: pulse_table(driver)}
+        self._late   = np.zeros(STATS_TICKS)
+        self._work   = np.zeros(STATS_TICKS)
+        self._n      = 0
+        self.ticker: Ticker | None = None
+        self.setpoint = (0.0, 0.0)   # camera pitch, roll (rad)
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self) -> "Gimbal":
+        self._thread.start()
+        return self
+
+    def _index(self, deflection: float) -> int:
+        return int(round((math.degrees(deflection) + 90.0) / TABLE_STEP))
+
+    def _loop(self) -> None:
+        ticker = self.ticker = Ticker(self._rate)
+        dt = ticker.period
+        t_log = time.perf_counter()
+        while not self._stop.is_set():
+            late = ticker.wait()
+            t0 = time.perf_counter()
+            f = self._read()
+            sp_pitch, sp_roll = self.setpoint
+            # Servo deflection counteracts the body attitude.
+            cmd_p = self._pitch.update(sp_pitch - f.rot_x, f.gyr_y, dt)
+            cmd_r = self._roll.update(sp_roll - f.rot_y, f.gyr_x, dt)
+            self.driver.set_offs({
+                PITCH_CH: int(self._tables[PITCH_CH][self._index(cmd_p)]),
+                ROLL_CH:  int(self._tables[ROLL_CH][self._index(cmd_r)]),
+            })
+            k = self._n % STATS_TICKS
+            self._late[k] = late
+            self._work[k] = time.perf_counter() - t0
+            self._n += 1
+            if self._log and t0 - t_log >= LOG_S:
+                t_log = t0
+                self.report()
+
+    def stats(self) -> dict[str, float]:
+        """Jitter over the last STATS_TICKS ticks, in microseconds."""
+        n = min(self._n, STATS_TICKS)
+        if n == 0:
+            return {}
+        late = self._late[:n] * 1e6
+        work = self._work[:n] * 1e6
+        t = self.ticker
+        return {
+            "ticks":     t.ticks if t else 0,
+            "missed":    t.missed if t else 0,
+            "late_p50":  float(np.percentile(late, 50)),
+            "late_p99":  float(np.percentile(late, 99)),
+            "late_max":  float(late.max()),
+            "work_p99":  float(np.percentile(work, 99)),
+        }
+
+    def report(self) -> None:
+        s = self.stats()
+        if s:
+            print(f"[gimbal] {self._rate:.0f} Hz  late p50 {s['late_p50']:.0f}"
+                  f"  p99 {s['late_p99']:.0f}  max {s['late_max']:.0f} us"
+                  f"  work p99 {s['work_p99']:.0f} us"
+                  f"  missed {s['missed']}/{s['ticks']}", flush=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1)
+        self._pitch.reset()
+        self._roll.reset()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rate", type=float, default=RATE_HZ)
+    ap.add_argument("--fake-bus", action="store_true", help="no PCA9685: FakeSMBus")
+    ap.add_argument("--shm", action="store_true",
+                    help="read fused state from a running sensor process (SharedFused)")
+    args = ap.parse_args()
+
+    driver = ServoDriver(smbus=FakeSMBus() if args.fake_bus else None)
+    shared = datafussion.SharedFused() if args.shm else None
+    gimbal = Gimbal(driver, shared.read if shared else datafussion.get_fused, args.rate).start()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gimbal.stop()
+        driver.close()
+        if shared:
+            shared.close()
+
+
+if __name__ == "__main__":
+    main()
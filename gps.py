@@ -1,19 +1,43 @@
 from __future__ import annotations
 
+import math
+import os
+import select
 import sys
+import threading
 import time
+import tty
+from collections import deque
+from functools import reduce
+from operator import xor
 from dataclasses import dataclass, field
 from typing import Optional
 
+import numpy as np
+
 try:
     import serial
 except ImportError:
-    print("ERROR: pyserial not installed. Run: pip install pyserial", file=sys.stderr)
-    sys.exit(1)
+    # Only opening a real port needs it: parsing, NmeaReplay and
+    # GPSReader(source=...) work without.
+    serial = None
+
+
+def _require_serial() -> None:
+    if serial is None:
+        raise ImportError("pyserial not installed. Run: pip install pyserial")
 
 PORT = "/dev/ttyS0"   # or /dev/ttyAMA0
 BAUD_RATE = 115200
 TIMEOUT = 2.0
+MAX_SENTENCE = 256    # NMEA allows 82; longer runs without a newline are line noise
+
+# Quectel LC76G (PAIR command set, see the LC76G GNSS protocol spec)
+LC76G_RATES_HZ = (1, 2, 5, 10)
+LC76G_BAUDS    = (115200, 230400, 460800, 921600)
+# PAIR062 message types; everything except GGA and RMC is switched off at
+# higher rates so the UART and the parser only carry what we use.
+LC76G_OFF = (1, 2, 3, 5)     # GLL, GSA, GSV, VTG
 
 
 @dataclass
@@ -45,6 +69,13 @@ def _nmea_to_decimal(value: str, hemisphere: str) -> float:
     return decimal
 
 
+def _ddmm(value: float, pos: str, neg: str, width: int) -> tuple[str, str]:
+    """Decimal degrees to NMEA (d)ddmm.mmmmm and hemisphere letter."""
+    a = abs(value)
+    deg = int(a)
+    return f"{deg:0{width}d}{(a - deg) * 60:08.5f}", pos if value >= 0 else neg
+
+
 def _verify_checksum(sentence: str) -> bool:
     if "*" not in sentence:
         return True
@@ -112,55 +143,299 @@ def parse_sentence(line: str, record: GNSSRecord) -> None:
         _parse_gga(fields, record)
 
 
+def _xor_bytes(data: bytes) -> int:
+    return reduce(xor, data, 0)
+
+
+def nmea_sentence(body: str) -> bytes:
+    """Frame a sentence body (no '$', no checksum) for writing to the receiver."""
+    data = body.encode("ascii")
+    return b"$%s*%02X\r\n" % (data, _xor_bytes(data))
+
+
+def lc76g_commands(rate_hz: int, baud: Optional[int] = None) -> list[bytes]:
+    """PAIR commands for rate_hz GGA+RMC output and, optionally, a new UART
+    baud rate (PAIR864, applies immediately; reopen the port at baud)."""
+    if rate_hz not in LC76G_RATES_HZ:
+        raise ValueError(f"LC76G rate must be one of {LC76G_RATES_HZ} Hz")
+    cmds = [nmea_sentence(f"PAIR062,{t},0") for t in LC76G_OFF]
+    cmds.append(nmea_sentence(f"PAIR050,{1000 // rate_hz}"))
+    if baud is not None:
+        if baud not in LC76G_BAUDS:
+            raise ValueError(f"LC76G baud must be one of {LC76G_BAUDS}")
+        cmds.append(nmea_sentence(f"PAIR864,0,0,{baud}"))
+    return cmds
+
+
+class NmeaStream:
+    """Incremental NMEA parser for arbitrary byte chunks.
+
+    Bytes accumulate in one bytearray; complete RMC and GGA lines are
+    checksummed on the raw bytes, decoded and split once, and merged into
+    the record for their UTC time; other sentences are skipped unparsed. An epoch is emitted as soon as both RMC and GGA for the
+    same time have arrived, instead of waiting for the next RMC."""
+
+    def __init__(self, keep_raw: bool = False) -> None:
+        self._buf      = bytearray()
+        self._keep_raw = keep_raw
+        self._rec      = GNSSRecord()
+        self._time: Optional[str] = None   # raw hhmmss.ss of the open epoch
+        self._have     = 0              # 1 = RMC, 2 = GGA
+        self.bad_checksums = 0
+        self.sentences     = 0
+
+    def feed(self, data: bytes) -> list[GNSSRecord]:
+        """Consume data; return the epochs it completed (usually 0 or 1)."""
+        buf = self._buf
+        buf += data
+        epochs = []
+        start = 0
+        while True:
+            end = buf.find(b"\n", start)
+            if end < 0:
+                break
+            rec = self._line(bytes(buf[start:end]))
+            if rec is not None:
+                epochs.append(rec)
+            start = end + 1
+        del buf[:start]
+        if len(buf) > MAX_SENTENCE:
+            buf.clear()
+        return epochs
+
+    def _line(self, line: bytes) -> Optional[GNSSRecord]:
+        dollar = line.find(b"$")
+        star   = line.rfind(b"*")
+        if dollar < 0 or star < dollar:
+            return None
+        self.sentences += 1
+        body = line[dollar + 1:star]
+        kind = body[2:5]
+        if kind == b"RMC":
+            bit = 1
+        elif kind == b"GGA":
+            bit = 2
+        else:
+            return None
+        try:
+            if _xor_bytes(body) != int(line[star + 1:star + 3], 16):
+                self.bad_checksums += 1
+                return None
+        except ValueError:
+            self.bad_checksums += 1
+            return None
+        fields = body.decode("ascii", errors="replace").split(",")
+        if fields[1] != self._time:
+            self._rec  = GNSSRecord()
+            self._time = fields[1]
+            self._have = 0
+        rec = self._rec
+        if bit == 1:
+            _parse_rmc(fields, rec)
+        else:
+            _parse_gga(fields, rec)
+        if self._keep_raw:
+            rec.raw.append(line[dollar:].decode("ascii", errors="replace").strip())
+        self._have |= bit
+        if self._have != 3:
+            return None
+        self._rec  = GNSSRecord()
+        self._have = 0
+        return rec
+
+
+NMEA_COLUMNS = ("time", "lat", "lon", "alt", "speed", "course", "fix", "sats", "hdop")
+
+_HEX = np.full(256, -1, np.int16)
+for _i, _c in enumerate(b"0123456789ABCDEF"):
+    _HEX[_c] = _HEX[ord(chr(_c).lower())] = _i
+
+
+def _sentences(data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Offsets of every checksum-valid sentence in data: ('$', '*', line
+    number). Framing and checksums are computed for the whole buffer at once
+    from a running XOR."""
+    arr = np.frombuffer(data, np.uint8)
+    nl = np.flatnonzero(arr == ord("\n"))
+    starts = np.concatenate(([0], nl + 1))
+    ends   = np.concatenate((nl, [len(arr)]))
+    dollars = np.flatnonzero(arr == ord("$"))
+    stars   = np.flatnonzero(arr == ord("*"))
+    if len(dollars) == 0 or len(stars) == 0:
+        empty = np.empty(0, np.int64)
+        return empty, empty, empty
+    d = dollars[np.minimum(np.searchsorted(dollars, starts), len(dollars) - 1)]
+    s = stars[np.maximum(np.searchsorted(stars, ends) - 1, 0)]
+    ok = (d >= starts) & (s > d) & (s + 3 <= ends)
+    d, s, line = d[ok], s[ok], np.flatnonzero(ok)
+    px = np.bitwise_xor.accumulate(arr)
+    hi, lo = _HEX[arr[s + 1]], _HEX[arr[s + 2]]
+    ok = (hi >= 0) & (lo >= 0) & ((px[s - 1] ^ px[d]) == hi * 16 + lo)
+    return d[ok], s[ok], line[ok]
+
+
+def _kind(arr: np.ndarray, d: np.ndarray, kind: bytes) -> np.ndarray:
+    """Sentences whose type (after the two-letter talker) is kind."""
+    return ((arr[d + 3] == kind[0]) & (arr[d + 4] == kind[1])
+            & (arr[d + 5] == kind[2]))
+
+
+def _rows(data: bytes, d: np.ndarray, s: np.ndarray, line: np.ndarray,
+          nfields: int) -> tuple[list[tuple], np.ndarray]:
+    rows, keep = [], []
+    for a, b, n in zip(d.tolist(), s.tolist(), line.tolist()):
+        f = data[a + 1:b].split(b",")
+        if len(f) >= nfields:
+            rows.append(f[:nfields])
+            keep.append(n)
+    return rows, np.array(keep, np.int64)
+
+
+def _floats(col) -> np.ndarray:
+    return np.array([v or b"nan" for v in col], dtype="S").astype(np.float64)
+
+
+def _degrees(value, hemi) -> np.ndarray:
+    v = _floats(value)
+    deg = np.floor(v / 100.0)
+    out = deg + (v - deg * 100.0) / 60.0
+    neg = np.isin(np.array(hemi, dtype="S1"), (b"S", b"W"))
+    return np.where(neg, -out, out)
+
+
+def _time_of_day(col) -> np.ndarray:
+    v = _floats(col)
+    return np.floor(v / 10000.0) * 3600.0 + (np.floor(v / 100.0) % 100.0) * 60.0 + v % 100.0
+
+
+def _epoch_days(col) -> np.ndarray:
+    """ddmmyy -> days since 1970-01-01 (NaN if malformed)."""
+    raw = np.array(col, dtype="S6")
+    dig = raw.view(np.uint8).reshape(-1, 6).astype(np.int64) - ord("0")
+    ok = ((dig >= 0) & (dig <= 9)).all(axis=1)
+    dig[~ok] = [0, 1, 0, 1, 0, 0]
+    dd = dig[:, 0] * 10 + dig[:, 1]
+    mm = dig[:, 2] * 10 + dig[:, 3]
+    yy = dig[:, 4] * 10 + dig[:, 5]
+    days = ((np.datetime64("2000-01", "M") + (yy * 12 + mm - 1).astype("m8[M]")).astype("M8[D]")
+            + (dd - 1).astype("m8[D]")).astype(np.int64).astype(np.float64)
+    days[~ok] = np.nan
+    return days
+
+
+def parse_nmea_log(data: bytes) -> dict[str, np.ndarray]:
+    """Parse a whole NMEA capture into NMEA_COLUMNS arrays, one row per RMC.
+
+    time is POSIX seconds (RMC date + time), lat/lon decimal degrees, alt
+    metres, speed knots, course degrees. GGA fields come from the GGA with
+    the same UTC time next to the RMC in the log; rows without one have
+    alt/hdop NaN and fix/sats -1."""
+    arr = np.frombuffer(data, np.uint8)
+    d, s, line = _sentences(data)
+    is_rmc, is_gga = _kind(arr, d, b"RMC"), _kind(arr, d, b"GGA")
+    rmc, r_line = _rows(data, d[is_rmc], s[is_rmc], line[is_rmc], 10)
+    gga, g_line = _rows(data, d[is_gga], s[is_gga], line[is_gga], 10)
+
+    n = len(rmc)
+    out = {
+        "time":   np.full(n, np.nan),
+        "lat":    np.full(n, np.nan),
+        "lon":    np.full(n, np.nan),
+        "alt":    np.full(n, np.nan),
+        "speed":  np.full(n, np.nan),
+        "course": np.full(n, np.nan),
+        "fix":    np.full(n, -1, np.int8),
+        "sats":   np.full(n, -1, np.int16),
+        "hdop":   np.full(n, np.nan),
+    }
+    if n == 0:
+        return out
+
+    _, r_time, _, r_lat, r_ns, r_lon, r_ew, r_spd, r_crs, r_date = zip(*rmc)
+    tod = _time_of_day(r_time)
+    out["time"][:]   = _epoch_days(r_date) * 86400.0 + tod
+    out["lat"][:]    = _degrees(r_lat, r_ns)
+    out["lon"][:]    = _degrees(r_lon, r_ew)
+    out["speed"][:]  = _floats(r_spd)
+    out["course"][:] = _floats(r_crs)
+
+    if gga:
+        cols = list(zip(*gga))
+        g_time, g_fix, g_sats, g_hdop, g_alt = cols[1], cols[6], cols[7], cols[8], cols[9]
+        g_tod = _time_of_day(g_time)
+        # The matching GGA is the nearest one before or after the RMC.
+        after  = np.searchsorted(g_line, r_line)
+        before = np.maximum(after - 1, 0)
+        after  = np.minimum(after, len(g_line) - 1)
+        pick = np.where(g_tod[before] == tod, before, after)
+        hit  = g_tod[pick] == tod
+        idx  = pick[hit]
+        fix  = _floats(g_fix)
+        sats = _floats(g_sats)
+        out["alt"][hit]  = _floats(g_alt)[idx]
+        out["hdop"][hit] = _floats(g_hdop)[idx]
+        out["fix"][hit]  = np.nan_to_num(fix[idx], nan=-1).astype(np.int8)
+        out["sats"][hit] = np.nan_to_num(sats[idx], nan=-1).astype(np.int16)
+    return out
+
+
 class GPSReader:
     """Persistent NMEA reader — opens the serial port once and streams records.
     Use this in long-running threads instead of read_gps_records, which
-    opens and closes the port on every call."""
+    opens and closes the port on every call.
+
+    rate_hz / fast_baud configure an LC76G for faster output (see
+    lc76g_commands). The receiver keeps a changed baud rate until it is
+    power cycled, so a restarted process should open at fast_baud directly.
+
+    source replaces the serial port with anything that has the same read /
+    in_waiting / write interface, e.g. NmeaReplay."""
 
     def __init__(self, port: str = PORT, baud: int = BAUD_RATE,
-                 timeout: float = TIMEOUT) -> None:
-        print(f"Opening {port} at {baud} baud …", flush=True)
-        try:
-            self._ser = serial.Serial(
-                port, baud, timeout=timeout,
-                dsrdtr=False, rtscts=False, xonxoff=False,
-            )
-        except serial.SerialException as e:
-            print(f"ERROR: Cannot open {port}: {e}", file=sys.stderr)
-            raise
-        self._current = GNSSRecord()
-        self._last_rmc_time: Optional[str] = None
+                 timeout: float = TIMEOUT, rate_hz: Optional[int] = None,
+                 fast_baud: Optional[int] = None, source=None) -> None:
+        if source is not None:
+            self._ser = source
+        else:
+            _require_serial()
+            print(f"Opening {port} at {baud} baud …", flush=True)
+            try:
+                self._ser = serial.Serial(
+                    port, baud, timeout=timeout,
+                    dsrdtr=False, rtscts=False, xonxoff=False,
+                )
+            except serial.SerialException as e:
+                print(f"ERROR: Cannot open {port}: {e}", file=sys.stderr)
+                raise
+        self._stream = NmeaStream()
+        self._ready: deque[GNSSRecord] = deque()
+        if rate_hz is not None:
+            self.configure(rate_hz, fast_baud)
+
+    def configure(self, rate_hz: int, baud: Optional[int] = None) -> None:
+        """Switch the receiver to rate_hz GGA+RMC output and optionally to a
+        new baud rate, following it on our side of the UART."""
+        for cmd in lc76g_commands(rate_hz, baud):
+            self._ser.write(cmd)
+        self._ser.flush()
+        if baud is not None and baud != self._ser.baudrate:
+            time.sleep(0.1)   # let the PAIR864 reply drain at the old rate
+            self._ser.baudrate = baud
+            self._ser.reset_input_buffer()
+        print(f"[gps] LC76G {rate_hz} Hz at {self._ser.baudrate} baud", flush=True)
 
     def read_one(self) -> Optional[GNSSRecord]:
-        """Block until the next complete NMEA epoch (one full RMC cycle).
-        Returns None on serial error; the caller should then close and retry."""
-        while True:
+        """Block until the next complete NMEA epoch (RMC and GGA of one fix).
+        Returns None on serial error or at the end of a replay; the caller
+        should then close and retry."""
+        while not self._ready:
             try:
-                raw_line = self._ser.readline()
-            except serial.SerialException:
+                data = self._ser.read(self._ser.in_waiting or 1)
+            except (OSError, EOFError):   # serial.SerialException is an OSError
                 return None
-            if not raw_line:
-                continue
-            try:
-                line = raw_line.decode("ascii", errors="replace").strip()
-            except Exception:
-                continue
-            if not line:
-                continue
-
-            self._current.raw.append(line)
-            parse_sentence(line, self._current)
-
-            if line.startswith(("$GNRMC", "$GPRMC")):
-                if (self._last_rmc_time is not None
-                        and self._current.utc_time != self._last_rmc_time):
-                    completed = self._current
-                    self._current = GNSSRecord()
-                    self._current.raw.append(line)
-                    parse_sentence(line, self._current)
-                    self._last_rmc_time = self._current.utc_time
-                    return completed
-                self._last_rmc_time = self._current.utc_time
+            if data:
+                self._ready.extend(self._stream.feed(data))
+        return self._ready.popleft()
 
     def close(self) -> None:
         try:
@@ -169,6 +444,184 @@ class GPSReader:
             pass
 
 
+class NmeaReplay:
+    """Serial stand-in that plays a captured NMEA log back to GPSReader.
+
+    speed 1.0 releases each sentence when its UTC time comes up, N plays N
+    times faster, 0 hands out bytes as fast as they are read. Sentence times
+    come from RMC/GGA; other sentences go out with the timed sentence before
+    them. Past the end read() raises EOFError, or restarts when loop is
+    set."""
+
+    def __init__(self, log, speed: float = 1.0, loop: bool = False,
+                 timeout: float = TIMEOUT) -> None:
+        if isinstance(log, (bytes, bytearray, memoryview)):
+            self._data = bytes(log)
+        else:
+            with open(log, "rb") as f:
+                self._data = f.read()
+        self.speed    = speed
+        self.loop     = loop
+        self.timeout  = timeout
+        self.baudrate = BAUD_RATE
+        self._ends, self._times = self._schedule(self._data)
+        self._pos = 0
+        self._t0  = time.monotonic()
+
+    @staticmethod
+    def _schedule(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+        """Byte offset just past each line and its playback time in seconds
+        from the first timed sentence (midnight rollovers unwrapped)."""
+        lines = data.split(b"\n")
+        ends  = np.cumsum([len(x) + 1 for x in lines])
+        ends[-1] = min(ends[-1], len(data))
+        times = np.full(len(lines), np.nan)
+        for i, line in enumerate(lines):
+            dollar = line.find(b"$")
+            if dollar >= 0 and line[dollar + 3:dollar + 6] in (b"RMC", b"GGA"):
+                f = line.split(b",", 2)
+                if len(f) > 1 and len(f[1]) >= 6:
+                    try:
+                        times[i] = (int(f[1][0:2]) * 3600 + int(f[1][2:4]) * 60
+                                    + float(f[1][4:]))
+                    except ValueError:
+                        pass
+        timed = np.flatnonzero(~np.isnan(times))
+        if len(timed) == 0:
+            return ends, np.zeros(len(lines))
+        # Forward-fill, then unwrap days.
+        idx = np.maximum.accumulate(np.where(np.isnan(times), -1, np.arange(len(times))))
+        idx[idx < 0] = timed[0]
+        times = times[idx]
+        times += 86400.0 * np.cumsum(np.diff(times, prepend=times[0]) < -43200.0)
+        return ends, times - times[0]
+
+    def _available(self) -> int:
+        if self.speed <= 0:
+            return len(self._data)
+        elapsed = (time.monotonic() - self._t0) * self.speed
+        k = int(np.searchsorted(self._times, elapsed, side="right"))
+        return int(self._ends[k - 1]) if k else 0
+
+    @property
+    def in_waiting(self) -> int:
+        return max(0, self._available() - self._pos)
+
+    def read(self, size: int = 1) -> bytes:
+        if self._pos >= len(self._data):
+            if not self.loop:
+                raise EOFError("end of NMEA replay")
+            self._pos = 0
+            self._t0  = time.monotonic()
+        avail = self._available()
+        if avail <= self._pos:
+            # Sleep until the next sentence is due, like a serial timeout.
+            k = int(np.searchsorted(self._ends, self._pos, side="right"))
+            due = self._t0 + self._times[min(k, len(self._times) - 1)] / self.speed
+            time.sleep(max(0.0, min(self.timeout, due - time.monotonic())))
+            avail = self._available()
+        end = min(avail, self._pos + size)
+        chunk = self._data[self._pos:end]
+        self._pos = max(self._pos, end)
+        return chunk
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NmeaEmitter:
+    """Simulated receiver behind a pseudo-terminal. A daemon thread writes
+    one RMC + GGA epoch every 1 / rate_hz seconds to the pty master;
+    GPSReader(port=emitter.port) opens the slave side through pyserial like
+    the real UART. The fix drives a circle of radius_m every period_s
+    around (lat, lon, alt), stamped with the current UTC time. Bytes the
+    reader writes (PAIR commands) are drained and ignored.
+
+    When nobody reads, epochs that no longer fit in the pty buffer are
+    counted in dropped instead of blocking, as a UART would overrun."""
+
+    def __init__(self, rate_hz: float = 10, lat: float = 48.117, lon: float = 11.516,
+                 alt: float = 545.0, radius_m: float = 20.0, period_s: float = 60.0,
+                 satellites: int = 9, hdop: float = 0.9, fix_quality: int = 1) -> None:
+        self.rate_hz    = rate_hz
+        self.lat, self.lon, self.alt = lat, lon, alt
+        self.radius_m   = radius_m
+        self.period_s   = period_s
+        self.satellites = satellites
+        self.hdop       = hdop
+        self.fix_quality = fix_quality
+        self.epochs     = 0
+        self.dropped    = 0
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)                 # no echo, no CR/LF translation
+        os.set_blocking(self._master, False)
+        self.port  = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def epoch(self, t: float) -> bytes:
+        """RMC + GGA sentences for wall-clock time t."""
+        t = math.floor(t * 100) / 100          # NMEA carries centiseconds; never round up
+        day, tod = divmod(t, 86400.0)
+        hh, rem = divmod(tod, 3600.0)
+        mm, ss = divmod(rem, 60.0)
+        hms  = f"{int(hh):02d}{int(mm):02d}{ss:05.2f}"
+        date = time.strftime("%d%m%y", time.gmtime(t))
+        a = 2 * math.pi * (t % self.period_s) / self.period_s
+        w = 2 * math.pi / self.period_s
+        north, east = self.radius_m * math.sin(a), self.radius_m * math.cos(a)
+        v_north, v_east = self.radius_m * w * math.cos(a), -self.radius_m * w * math.sin(a)
+        lat, ns = _ddmm(self.lat + north / 111_320.0, "N", "S", 2)
+        lon, ew = _ddmm(self.lon + east / (111_320.0 * math.cos(math.radians(self.lat))),
+                        "E", "W", 3)
+        knots  = math.hypot(v_north, v_east) / 0.514444
+        course = math.degrees(math.atan2(v_east, v_north)) % 360.0
+        status = "A" if self.fix_quality else "V"
+        return (nmea_sentence(f"GNRMC,{hms},{status},{lat},{ns},{lon},{ew},{knots:.2f},"
+                              f"{course:.1f},{date},,,A")
+                + nmea_sentence(f"GNGGA,{hms},{lat},{ns},{lon},{ew},{self.fix_quality},"
+                                f"{self.satellites:02d},{self.hdop:.1f},{self.alt:.1f},M,46.9,M,,"))
+
+    def _run(self) -> None:
+        period = 1.0 / self.rate_hz
+        due = time.monotonic()
+        while not self._stop.is_set():
+            while select.select([self._master], [], [], 0)[0]:
+                try:
+                    if not os.read(self._master, 1024):
+                        break
+                except OSError:
+                    break
+            try:
+                os.write(self._master, self.epoch(time.time()))
+                self.epochs += 1
+            except BlockingIOError:
+                self.dropped += 1
+            except OSError:
+                break
+            due += period
+            self._stop.wait(max(0.0, due - time.monotonic()))
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
 def read_gps_records(
     count: int = 5,
     port: str = PORT,
@@ -177,6 +630,7 @@ def read_gps_records(
     require_fix: bool = False,
 ) -> list[GNSSRecord]:
     records: list[GNSSRecord] = []
+    _require_serial()
     print(f"Opening {port} at {baud} baud …", flush=True)
     try:
         ser_obj = serial.Serial(port, baud, timeout=timeout)
@@ -1,10 +1,26 @@
+import math
 import time
-import board
-import adafruit_mpu6050
+import numpy as np
 from dataclasses import dataclass, field
 
-i2c = board.I2C()
-mpu = adafruit_mpu6050.MPU6050(i2c)
+try:
+    import smbus2
+except ImportError:
+    # Only ImuFifo needs it; SimImu and the parsing side import without it.
+    smbus2 = None
+
+_mpu = None   # adafruit MPU6050 for read_gyro_records, opened on first use
+
+
+def _sensor():
+    """The adafruit MPU6050 driver. board / adafruit_mpu6050 are imported
+    here rather than at module load, so importing gyro needs no I2C bus."""
+    global _mpu
+    if _mpu is None:
+        import adafruit_mpu6050
+        import board
+        _mpu = adafruit_mpu6050.MPU6050(board.I2C())
+    return _mpu
 
 @dataclass
 class GyroRecord:
@@ -15,6 +31,7 @@ class GyroRecord:
     raw: list[str] = field(default_factory=list)
 
 def read_gyro_records() -> list[GyroRecord]:
+    mpu = _sensor()
     record = GyroRecord(
         timestamp=time.time(),
         acceleration=mpu.acceleration,
@@ -23,7 +40,187 @@ def read_gyro_records() -> list[GyroRecord]:
     )
     return [record]
 
+
+# MPU-6050 registers used by the FIFO reader
+_SMPLRT_DIV   = 0x19
+_CONFIG       = 0x1A
+_GYRO_CONFIG  = 0x1B
+_ACCEL_CONFIG = 0x1C
+_FIFO_EN      = 0x23
+_INT_STATUS   = 0x3A
+_TEMP_OUT_H   = 0x41
+_USER_CTRL    = 0x6A
+_PWR_MGMT_1   = 0x6B
+_FIFO_COUNTH  = 0x72
+_FIFO_R_W     = 0x74
+
+MPU_ADDRESS   = 0x68
+FIFO_RATE_HZ  = 1000        # gyro output rate is 1 kHz with the DLPF on
+FIFO_BYTES    = 1024        # hardware FIFO size: ~85 ms of samples at 1 kHz
+SAMPLE_BYTES  = 12          # accel xyz + gyro xyz, big-endian int16
+ACC_SCALE     = 9.80665 / 8192.0          # +-4 g  -> m/s^2
+GYR_SCALE     = math.radians(1.0 / 65.5)  # +-500 deg/s -> rad/s
+
+
+@dataclass
+class ImuBatch:
+    timestamp: np.ndarray       # (n,) float64, time.time() clock
+    acceleration: np.ndarray    # (n, 3) float32 m/s^2
+    gyro: np.ndarray            # (n, 3) float32 rad/s
+    temperature: float          # deg C, read once per batch
+    overflowed: bool = False    # FIFO filled up and was reset; samples were lost
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+class ImuFifo:
+    """MPU-6050 driven from its hardware FIFO.
+
+    The chip samples at rate_hz on its own clock and queues accel + gyro in
+    the FIFO; read_batch() drains everything queued with one I2C burst
+    read. Poll well inside FIFO_BYTES / (SAMPLE_BYTES * rate_hz) seconds
+    or the FIFO overflows and is reset."""
+
+    def __init__(self, bus: int = 1, address: int = MPU_ADDRESS,
+                 rate_hz: int = FIFO_RATE_HZ) -> None:
+        if not 4 <= rate_hz <= 1000:
+            raise ValueError(f"rate_hz must be 4-1000, got {rate_hz}")
+        if smbus2 is None:
+            raise ImportError("smbus2 not installed. Run: pip install smbus2")
+        self._bus     = smbus2.SMBus(bus)
+        self._address = address
+        self.rate_hz  = 1000.0 / round(1000.0 / rate_hz)
+        self.overflows = 0
+
+        self._write(_PWR_MGMT_1, 0x80)                  # device reset
+        time.sleep(0.1)
+        self._write(_PWR_MGMT_1, 0x01)                  # wake, PLL on gyro X
+        self._write(_CONFIG, 0x01)                      # DLPF ~185 Hz, 1 kHz output
+        self._write(_SMPLRT_DIV, round(1000.0 / rate_hz) - 1)
+        self._write(_GYRO_CONFIG, 0x08)                 # +-500 deg/s
+        self._write(_ACCEL_CONFIG, 0x08)                # +-4 g
+        self._write(_FIFO_EN, 0x78)                     # accel + gyro xyz
+        self._reset_fifo()
+
+    def _write(self, reg: int, value: int) -> None:
+        self._bus.write_byte_data(self._address, reg, value)
+
+    def _reset_fifo(self) -> None:
+        self._write(_USER_CTRL, 0x04)                   # FIFO reset
+        self._write(_USER_CTRL, 0x40)                   # FIFO enable
+
+    def read_batch(self) -> ImuBatch:
+        """Drain all complete samples queued since the last call. The last
+        sample is stamped with the read time, earlier ones are spaced by
+        the sample period."""
+        overflowed = bool(self._bus.read_byte_data(self._address, _INT_STATUS) & 0x10)
+        if overflowed:
+            self.overflows += 1
+            self._reset_fifo()
+            count = 0
+        else:
+            hi, lo = self._bus.read_i2c_block_data(self._address, _FIFO_COUNTH, 2)
+            count = ((hi << 8) | lo) // SAMPLE_BYTES
+        t_read = time.time()
+
+        if count:
+            select = smbus2.i2c_msg.write(self._address, [_FIFO_R_W])
+            data   = smbus2.i2c_msg.read(self._address, count * SAMPLE_BYTES)
+            self._bus.i2c_rdwr(select, data)
+            raw = np.frombuffer(bytes(data), dtype='>i2').reshape(count, 6)
+            acc = raw[:, 0:3].astype(np.float32) * np.float32(ACC_SCALE)
+            gyr = raw[:, 3:6].astype(np.float32) * np.float32(GYR_SCALE)
+        else:
+            acc = np.empty((0, 3), np.float32)
+            gyr = np.empty((0, 3), np.float32)
+
+        th, tl = self._bus.read_i2c_block_data(self._address, _TEMP_OUT_H, 2)
+        temp_raw = (th << 8) | tl
+        if temp_raw >= 0x8000:
+            temp_raw -= 0x10000
+
+        ts = t_read - (count - 1 - np.arange(count, dtype=np.float64)) / self.rate_hz
+        return ImuBatch(
+            timestamp=ts,
+            acceleration=acc,
+            gyro=gyr,
+            temperature=temp_raw / 340.0 + 36.53,
+            overflowed=overflowed,
+        )
+
+    def close(self) -> None:
+        self._bus.close()
+
+
+class SimImu:
+    """Synthetic stand-in for ImuFifo: same read_batch() / close() interface,
+    no bus. Samples are generated on the wall clock at rate_hz for a camera
+    rocking in pitch and roll (amplitude_deg, period_s), with Gaussian noise
+    on both sensors and a constant gyro bias. Like the hardware FIFO, a poll
+    later than FIFO_BYTES worth of samples counts an overflow and loses
+    them."""
+
+    def __init__(self, rate_hz: int = FIFO_RATE_HZ, acc_noise: float = 0.05,
+                 gyr_noise: float = 0.005, gyr_bias: float = 0.002,
+                 amplitude_deg: float = 10.0, period_s: float = 4.0,
+                 temperature: float = 35.0, seed: int | None = None) -> None:
+        if not 4 <= rate_hz <= 1000:
+            raise ValueError(f"rate_hz must be 4-1000, got {rate_hz}")
+        self.rate_hz    = 1000.0 / round(1000.0 / rate_hz)
+        self.acc_noise  = acc_noise
+        self.gyr_noise  = gyr_noise
+        self.gyr_bias   = gyr_bias
+        self.amplitude  = math.radians(amplitude_deg)
+        self.omega      = 2 * math.pi / period_s
+        self.temperature = temperature
+        self.overflows  = 0
+        self._rng  = np.random.default_rng(seed)
+        self._t0   = time.time()
+        self._next = 0            # index of the next sample not yet read
+
+    def read_batch(self) -> ImuBatch:
+        t_read = time.time()
+        due = int((t_read - self._t0) * self.rate_hz) + 1
+        count = due - self._next
+        overflowed = count > FIFO_BYTES // SAMPLE_BYTES
+        if overflowed:
+            self.overflows += 1
+            count = 0
+        i = np.arange(due - count, due, dtype=np.float64)
+        self._next = due
+
+        t = i / self.rate_hz
+        wp, wr = self.omega, 0.7 * self.omega
+        pitch = self.amplitude * np.sin(wp * t)
+        roll  = self.amplitude * np.sin(wr * t + 1.0)
+        acc = np.empty((count, 3), np.float32)
+        acc[:, 0] = -np.sin(pitch)
+        acc[:, 1] = np.sin(roll) * np.cos(pitch)
+        acc[:, 2] = np.cos(roll) * np.cos(pitch)
+        acc *= np.float32(9.80665)
+        acc += self._rng.normal(0.0, self.acc_noise, (count, 3)).astype(np.float32)
+        gyr = np.empty((count, 3), np.float32)
+        gyr[:, 0] = self.amplitude * wr * np.cos(wr * t + 1.0)
+        gyr[:, 1] = self.amplitude * wp * np.cos(wp * t)
+        gyr[:, 2] = 0.0
+        gyr += np.float32(self.gyr_bias)
+        gyr += self._rng.normal(0.0, self.gyr_noise, (count, 3)).astype(np.float32)
+
+        return ImuBatch(
+            timestamp=self._t0 + t,
+            acceleration=acc,
+            gyro=gyr,
+            temperature=self.temperature + float(self._rng.normal(0.0, 0.05)),
+            overflowed=overflowed,
+        )
+
+    def close(self) -> None:
+        pass
+
+
 if __name__ == "__main__":
+    mpu = _sensor()
     while True:
         print(
             f"Acceleration: X:{mpu.acceleration[0]:.2f}, Y: {mpu.acceleration[1]:.2f}, Z: {mpu.acceleration[2]:.2f} m/s^2"  # noqa: E501
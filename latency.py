@@ -0,0 +1,135 @@
+"""Per-stage latency percentiles from the packet trace trailer.
+
+    python latency.py [tcp://relay:5556] [--interval 5] [--out latency.json]
+
+Subscribes to the relay like the C client and turns the trace marks that
+record.py appends (LATENCY_TRACE) into p50/p95/p99 per pipeline stage:
+
+    queue    capture -> encode worker picked the frame up
+    encode   worker resize + cv2.imencode
+    pack     reorder wait + header/JPEG assembly
+    send     packed -> handed to zmq (sensor lock, send loop)
+    network  zmq send -> received here (PUSH, relay, PUB, SUB)
+    total    capture -> received here
+
+network and total compare the sender's wall clock with ours, so they are
+only as good as NTP on both machines; the other stages use the sender's
+monotonic clock and are exact."""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import zmq
+
+from env import FLYCAM_SERVER
+from packet import parse_trace
+
+STAGES      = ("queue", "encode", "pack", "send", "network", "total")
+PERCENTILES = (50, 95, 99)
+MAX_SAMPLES = 100_000   # per stage per report interval
+
+
+def stage_ms(trace: dict, recv_wall_ns: int) -> tuple[float, ...]:
+    """Stage durations in milliseconds, ordered as STAGES."""
+    claim, enc, packed, send = (trace["claim_us"], trace["encoded_us"],
+                                trace["packed_us"], trace["send_us"])
+    total_us = (recv_wall_ns - trace["capture_wall_ns"]) / 1000.0
+    return (
+        claim / 1000.0,
+        (enc - claim) / 1000.0,
+        (packed - enc) / 1000.0,
+        (send - packed) / 1000.0,
+        (total_us - send) / 1000.0,
+        total_us / 1000.0,
+    )
+
+
+class LatencyStats:
+    """Fixed-size sample buffer per stage; summarize() returns percentiles
+    and clears it."""
+
+    def __init__(self, capacity: int = MAX_SAMPLES) -> None:
+        self._buf = np.empty((capacity, len(STAGES)), np.float64)
+        self._n   = 0
+
+    def add(self, row: tuple[float, ...]) -> None:
+        if self._n < len(self._buf):
+            self._buf[self._n] = row
+            self._n += 1
+
+    def summarize(self) -> dict[str, dict[str, float]]:
+        data = self._buf[:self._n]
+        out = {}
+        if self._n:
+            pct = np.percentile(data, PERCENTILES, axis=0)
+            for j, stage in enumerate(STAGES):
+                out[stage] = {f"p{p}": float(pct[k, j]) for k, p in enumerate(PERCENTILES)}
+                out[stage]["max"] = float(data[:, j].max())
+        out["frames"] = self._n
+        self._n = 0
+        return out
+
+
+def _print(summary: dict, untraced: int) -> None:
+    print(f"[lat] {summary['frames']} frames  ({untraced} without trace)", flush=True)
+    for stage in STAGES:
+        if stage in summary:
+            s = summary[stage]
+            print(f"  {stage:8s} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}"
+                  f"  p99 {s['p99']:7.2f}  max {s['max']:7.2f} ms", flush=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("addr", nargs="?", default=FLYCAM_SERVER)
+    ap.add_argument("--interval", type=float, default=5.0, help="seconds per report")
+    ap.add_argument("--out", default=None, help="append each report as a JSON line")
+    args = ap.parse_args()
+    if not args.addr:
+        ap.error("no relay address (argument or FLYCAM_SERVER)")
+
+    ctx  = zmq.Context()
+    sock = ctx.socket(zmq.SUB)
+    sock.setsockopt(zmq.CONFLATE, 1)
+    sock.setsockopt(zmq.RCVHWM, 1)
+    sock.setsockopt(zmq.RCVTIMEO, 500)
+    sock.connect(args.addr)
+    sock.setsockopt(zmq.SUBSCRIBE, b"")
+    print(f"[lat] listening on {args.addr}", flush=True)
+
+    stats    = LatencyStats()
+    untraced = 0
+    t_report = time.monotonic()
+    try:
+        while True:
+            try:
+                msg = sock.recv(copy=False)
+                recv_wall_ns = time.time_ns()
+                trace = parse_trace(msg.buffer)
+                if trace is None:
+                    untraced += 1
+                else:
+                    stats.add(stage_ms(trace, recv_wall_ns))
+            except zmq.Again:
+                pass
+
+            now = time.monotonic()
+            if now - t_report >= args.interval:
+                summary = stats.summarize()
+                _print(summary, untraced)
+                if args.out:
+                    with open(args.out, "a") as f:
+                        f.write(json.dumps({"time": time.time(), "untraced": untraced, **summary}) + "\n")
+                untraced = 0
+                t_report = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close(linger=0)
+        ctx.term()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,14 @@
 #include <stdio.h>
 #include <jpeglib.h>
 // clang-format on
+#include <math.h>
 #include <setjmp.h>
 #include <stdlib.h>
 #include <string.h>
 #include <zmq.h>
 
-#define VIDEO_HEADER_SIZE FLYCAM_VIDEO_HEADER_SIZE /* 68 */
+#define VIDEO_HEADER_SIZE FLYCAM_VIDEO_HEADER_SIZE /* 80 */
+#define VIDEO_HEADER_V2_SIZE FLYCAM_VIDEO_HEADER_V2_SIZE /* 56 */
 
 static inline uint32_t read_u32le(const uint8_t *p) {
   return (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) |
@@ -162,16 +164,22 @@ frame_t *readSocket(flycam_socket_t *sock) {
   const uint8_t *buf = (const uint8_t *)zmq_msg_data(&sock->msg);
   size_t wire_size = zmq_msg_size(&sock->msg);
 
-  if (wire_size < VIDEO_HEADER_SIZE) {
+  int v2 = wire_size >= 4 && memcmp(buf, FLYCAM_VIDEO_HEADER_V2_MAGIC, 4) == 0;
+  size_t header_size = v2 ? VIDEO_HEADER_V2_SIZE : VIDEO_HEADER_SIZE;
+
+  if (wire_size < header_size) {
     fprintf(stderr, "readSocket: packet too small (%zu bytes)\n", wire_size);
     return NULL;
   }
 
-  uint32_t ts = read_u32le(buf + 0);
+  uint32_t ts = v2 ? 0 : read_u32le(buf + 0);
   uint32_t width = read_u32le(buf + 4);
   uint32_t height = read_u32le(buf + 8);
   uint32_t jpeg_size = read_u32le(buf + 12);
 
+  if (jpeg_size == 0) /* keepalive: telemetry only, nothing to display */
+    return NULL;
+
   if (width == 0 || height == 0) {
     fprintf(stderr, "readSocket: zero dimension (%ux%u)\n", width, height);
     return NULL;
@@ -181,9 +189,9 @@ frame_t *readSocket(flycam_socket_t *sock) {
     fprintf(stderr, "readSocket: dimension overflow\n");
     return NULL;
   }
-  if (wire_size < VIDEO_HEADER_SIZE + (size_t)jpeg_size) {
-    fprintf(stderr, "readSocket: truncated JPEG (need %u got %zu)\n",
-            VIDEO_HEADER_SIZE + jpeg_size, wire_size);
+  if (wire_size < header_size + (size_t)jpeg_size) {
+    fprintf(stderr, "readSocket: truncated JPEG (need %zu got %zu)\n",
+            header_size + jpeg_size, wire_size);
     return NULL;
   }
 
@@ -196,7 +204,7 @@ frame_t *readSocket(flycam_socket_t *sock) {
     return NULL;
   }
 
-  if (decode_jpeg_to_pixels(buf + VIDEO_HEADER_SIZE, jpeg_size, width, height,
+  if (decode_jpeg_to_pixels(buf + header_size, jpeg_size, width, height,
                             frame->pixels) != 0) {
     fprintf(stderr, "readSocket: JPEG decode failed\n");
     free(frame->pixels);
@@ -215,16 +223,25 @@ frame_t *readSocket(flycam_socket_t *sock) {
   frame->vel_x = read_f32le(buf + 28);
   frame->vel_y = read_f32le(buf + 32);
   frame->vel_z = read_f32le(buf + 36);
-  frame->acc_x = read_f32le(buf + 40);
-  frame->acc_y = read_f32le(buf + 44);
-  frame->acc_z = read_f32le(buf + 48);
-  frame->gyr_x = read_f32le(buf + 52);
-  frame->gyr_y = read_f32le(buf + 56);
-  frame->gyr_z = read_f32le(buf + 60);
-  frame->pitch = read_f32le(buf + 64);
-  frame->roll = read_f32le(buf + 68);
-  frame->yaw = read_f32le(buf + 72);
-  frame->gps_fix = read_f32le(buf + 76);
+  if (v2) {
+    frame->acc_x = frame->acc_y = frame->acc_z = NAN;
+    frame->gyr_x = frame->gyr_y = frame->gyr_z = NAN;
+    frame->pitch = read_f32le(buf + 40);
+    frame->roll = read_f32le(buf + 44);
+    frame->yaw = read_f32le(buf + 48);
+    frame->gps_fix = read_f32le(buf + 52);
+  } else {
+    frame->acc_x = read_f32le(buf + 40);
+    frame->acc_y = read_f32le(buf + 44);
+    frame->acc_z = read_f32le(buf + 48);
+    frame->gyr_x = read_f32le(buf + 52);
+    frame->gyr_y = read_f32le(buf + 56);
+    frame->gyr_z = read_f32le(buf + 60);
+    frame->pitch = read_f32le(buf + 64);
+    frame->roll = read_f32le(buf + 68);
+    frame->yaw = read_f32le(buf + 72);
+    frame->gps_fix = read_f32le(buf + 76);
+  }
 
   return frame;
 }
@@ -28,9 +28,29 @@
  *  72     | yaw       | float32 | 4  (gyro-integrated, drifts without mag)
  *  76     | gps_fix   | float32 | 4  (0=no fix)
  *  80     | jpeg_data | bytes   | jpeg_size
+ *
+ * An optional extension trailer (magic "FCXT", e.g. latency trace marks)
+ * may follow jpeg_data; it is not parsed here. See packet.py.
+ *
+ * jpeg_size 0 marks a telemetry-only keepalive sent while the scene is
+ * static; readSocket skips it and the last frame stays on screen.
+ *
+ * Slim header, version 2 (56 bytes), recognised by its magic "FCH2" at
+ * offset 0 in place of the timestamp. Offsets 4..39 are as above, then:
+ *
+ *  40     | pitch     | float32 | 4
+ *  44     | roll      | float32 | 4
+ *  48     | yaw       | float32 | 4
+ *  52     | gps_fix   | float32 | 4
+ *  56     | jpeg_data | bytes   | jpeg_size
+ *
+ * It has no timestamp or raw IMU sample (those go on the metadata
+ * channel): readSocket sets timestamp to 0 and acc/gyr to NAN.
  */
 
 #define FLYCAM_VIDEO_HEADER_SIZE 80
+#define FLYCAM_VIDEO_HEADER_V2_SIZE 56
+#define FLYCAM_VIDEO_HEADER_V2_MAGIC "FCH2"
 
 typedef struct {
   uint32_t timestamp;
@@ -0,0 +1,254 @@
+"""Servo motion profiles and a background trajectory scheduler.
+
+    python motion.py [--fake-bus] [--profile s_curve]   # pan/tilt sweep demo
+
+Profiles are computed once, when a move is requested, as arrays of
+positions (degrees) at the scheduler tick. One MotionScheduler thread then
+streams every active channel on a servo.Ticker deadline and sends all of a
+tick's channels in one ServoDriver.set_angles call, so callers never block
+and no move needs its own thread.
+
+    sched = MotionScheduler(ServoDriver()).start()
+    sched.move(2, 150, v_max=90, a_max=180)               # queued after 2's current moves
+    sched.move(3, 30, v_max=60, a_max=120, profile_kind="s_curve")
+    sched.move(2, 90, mode="blend")                       # cross-fade into a new target
+    sched.cancel(3)                                       # hold where it is now"""
+
+import argparse
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from servo import ANGLE_MAX, ANGLE_MIN, FakeSMBus, ServoDriver, Ticker
+
+TICK_HZ  = 100
+V_MAX    = 90.0     # deg/s
+A_MAX    = 360.0    # deg/s^2
+J_MAX    = 3600.0   # deg/s^3 (s_curve)
+BLEND_S  = 0.2      # cross-fade length for mode="blend"
+PROFILES = ("trapezoid", "s_curve")
+
+
+def trapezoid(start: float, end: float, v_max: float, a_max: float, dt: float) -> np.ndarray:
+    """Positions every dt for a move with velocity limit v_max and
+    acceleration limit a_max, from rest to rest. Short moves never reach
+    v_max and become triangular. The last sample is exactly end."""
+    dist = abs(end - start)
+    if dist == 0.0:
+        return np.array([end])
+    t_acc = v_max / a_max
+    if a_max * t_acc * t_acc > dist:        # triangular
+        t_acc = math.sqrt(dist / a_max)
+        v_max = a_max * t_acc
+    t_flat  = (dist - a_max * t_acc * t_acc) / v_max
+    t_total = 2 * t_acc + t_flat
+    t = np.arange(1, int(math.ceil(t_total / dt)) + 1) * dt
+    t = np.minimum(t, t_total)
+    s = np.where(t < t_acc, 0.5 * a_max * t * t,
+        np.where(t < t_acc + t_flat, 0.5 * a_max * t_acc * t_acc + v_max * (t - t_acc),
+                 dist - 0.5 * a_max * (t_total - t) ** 2))
+    s[-1] = dist
+    return start + np.copysign(s, end - start)
+
+
+def s_curve(start: float, end: float, v_max: float, a_max: float, j_max: float,
+            dt: float) -> np.ndarray:
+    """Jerk-limited move: the trapezoid's velocity averaged over a window of
+    a_max / j_max seconds. The moving average keeps the distance, turns each
+    acceleration step into a ramp of slope j_max and lengthens the move by
+    the window."""
+    pos = trapezoid(start, end, v_max, a_max, dt)
+    n = max(1, int(round(a_max / j_max / dt)))
+    if n == 1 or len(pos) < 2:
+        return pos
+    vel = np.diff(pos, prepend=start)
+    vel = np.convolve(vel, np.full(n, 1.0 / n))
+    out = start + np.cumsum(vel)
+    out[-1] = end
+    return out
+
+
+def profile(kind: str, start: float, end: float, v_max: float, a_max: float,
+            j_max: float, dt: float) -> np.ndarray:
+    if kind == "trapezoid":
+        return trapezoid(start, end, v_max, a_max, dt)
+    if kind == "s_curve":
+        return s_curve(start, end, v_max, a_max, j_max, dt)
+    raise ValueError(f"profile must be one of {PROFILES}, got {kind!r}")
+
+
+class _Channel:
+    __slots__ = ("pos", "path", "i", "fade_from", "fade_i", "fade", "queue", "end")
+
+    def __init__(self, pos: float) -> None:
+        self.pos  = pos        # last commanded angle
+        self.path = None       # active profile
+        self.i    = 0
+        self.fade_from = None  # profile being blended out
+        self.fade_i    = 0
+        self.fade      = None  # blend weights for the new profile
+        self.queue: deque[np.ndarray] = deque()
+        self.end  = pos        # target of the last queued move
+
+
+class MotionScheduler:
+    """One thread, fixed tick, many channels. move()/cancel() only touch
+    small per-channel state under a lock; profiles are built by the caller
+    before the lock is taken."""
+
+    def __init__(self, driver: ServoDriver, tick_hz: float = TICK_HZ,
+                 home: dict[int, float] | None = None) -> None:
+        self.driver  = driver
+        self.dt      = 1.0 / tick_hz
+        self._home   = home or {}
+        self._ch: dict[int, _Channel] = {}
+        self._cv     = threading.Condition()
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self.ticker: Ticker | None = None
+
+    def start(self) -> "MotionScheduler":
+        self._thread.start()
+        return self
+
+    def _channel(self, ch: int) -> _Channel:
+        c = self._ch.get(ch)
+        if c is None:
+            c = self._ch[ch] = _Channel(self._home.get(ch, (ANGLE_MIN + ANGLE_MAX) / 2))
+        return c
+
+    def move(self, ch: int, target: float, v_max: float = V_MAX, a_max: float = A_MAX,
+             j_max: float = J_MAX, profile_kind: str = "trapezoid",
+             mode: str = "queue") -> float:
+        """Move channel ch to target degrees. mode "queue" starts after the
+        channel's pending moves, "replace" drops them and starts now from
+        the current position, "blend" does the same but cross-fades from
+        the old motion over BLEND_S. Returns the move's duration in s."""
+        target = max(ANGLE_MIN, min(ANGLE_MAX, target))
+        with self._cv:
+            c = self._channel(ch)
+            start = c.end if mode == "queue" else c.pos
+        path = profile(profile_kind, start, target, v_max, a_max, j_max, self.dt)
+        with self._cv:
+            c = self._channel(ch)
+            if mode == "queue":
+                c.queue.append(path)
+            elif mode in ("replace", "blend"):
+                old, old_i = c.path, c.i
+                c.queue.clear()
+                c.path, c.i = path, 0
+                if mode == "blend" and old is not None:
+                    n = max(1, int(BLEND_S / self.dt))
+                    c.fade_from, c.fade_i = old, old_i
+                    c.fade = np.linspace(1.0 / n, 1.0, n)
+                else:
+                    c.fade_from = c.fade = None
+            else:
+                raise ValueError(f"mode must be queue, replace or blend, got {mode!r}")
+            c.end = target
+            self._cv.notify_all()
+        return len(path) * self.dt
+
+    def cancel(self, ch: int | None = None) -> None:
+        """Stop ch (or every channel) at its current position."""
+        with self._cv:
+            for k in ([ch] if ch is not None else list(self._ch)):
+                c = self._ch.get(k)
+                if c is not None:
+                    c.queue.clear()
+                    c.path = c.fade_from = c.fade = None
+                    c.end = c.pos
+            self._cv.notify_all()
+
+    def busy(self, ch: int) -> bool:
+        with self._cv:
+            c = self._ch.get(ch)
+            return c is not None and (c.path is not None or bool(c.queue))
+
+    def wait(self, ch: int, timeout: float | None = None) -> bool:
+        """Block until ch has no active or queued move."""
+        with self._cv:
+            return self._cv.wait_for(lambda: not (self._ch.get(ch) and
+                                                  (self._ch[ch].path is not None or self._ch[ch].queue)),
+                                     timeout)
+
+    def position(self, ch: int) -> float:
+        with self._cv:
+            return self._channel(ch).pos
+
+    def _step(self, c: _Channel) -> float | None:
+        """Next position of channel c, or None if it is idle."""
+        if c.path is None:
+            if not c.queue:
+                return None
+            c.path, c.i = c.queue.popleft(), 0
+        pos = c.path[c.i]
+        c.i += 1
+        if c.fade is not None:
+            old = c.fade_from[min(c.fade_i, len(c.fade_from) - 1)]
+            w = c.fade[0]
+            pos = (1.0 - w) * old + w * pos
+            c.fade_i += 1
+            c.fade = c.fade[1:] if len(c.fade) > 1 else None
+            if c.fade is None:
+                c.fade_from = None
+        if c.i >= len(c.path):
+            if c.fade is not None:
+                c.i = len(c.path) - 1    # hold the end while the fade finishes
+            else:
+                c.path = None
+        c.pos = float(pos)
+        return c.pos
+
+    def _loop(self) -> None:
+        ticker = self.ticker = Ticker(1.0 / self.dt)
+        while not self._stop.is_set():
+            ticker.wait()
+            updates = {}
+            with self._cv:
+                for ch, c in self._ch.items():
+                    pos = self._step(c)
+                    if pos is not None:
+                        updates[ch] = pos
+                if updates:
+                    self._cv.notify_all()
+            if updates:
+                self.driver.set_angles(updates)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--fake-bus", action="store_true", help="no PCA9685: FakeSMBus")
+    ap.add_argument("--profile", choices=PROFILES, default="s_curve")
+    ap.add_argument("--channels", default="2,3", help="pan,tilt channels")
+    args = ap.parse_args()
+
+    driver = ServoDriver(smbus=FakeSMBus() if args.fake_bus else None)
+    sched  = MotionScheduler(driver).start()
+    pan, tilt = (int(c) for c in args.channels.split(","))
+    try:
+        while True:
+            for a, b in ((30, 60), (150, 120), (90, 90)):
+                t = max(sched.move(pan, a, profile_kind=args.profile),
+                        sched.move(tilt, b, v_max=45, profile_kind=args.profile))
+                print(f"pan -> {a}  tilt -> {b}  ({t:.2f} s)", flush=True)
+                sched.wait(pan)
+                sched.wait(tilt)
+                time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sched.stop()
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import struct
+import time
+
+import numpy as np
+
+# Packet layout, header version 1 (80-byte header + JPEG; the default):
+#   [0]  timestamp  u32
+#   [4]  width      u32
+#   [8]  height     u32
+#   [12] jpeg_size  u32
+#   [16] pos_x      f32  (lat/lon/alt from GPS, or dead-reckoned metres)
+#   [20] pos_y      f32
+#   [24] pos_z      f32
+#   [28] vel_x      f32  (m/s world frame, or speed_knots from GPS)
+#   [32] vel_y      f32  (m/s, or course_deg from GPS)
+#   [36] vel_z      f32
+#   [40] acc_x      f32
+#   [44] acc_y      f32
+#   [48] acc_z      f32
+#   [52] gyr_x      f32
+#   [56] gyr_y      f32
+#   [60] gyr_z      f32
+#   [64] pitch      f32  (radians, complementary filter)
+#   [68] roll       f32
+#   [72] yaw        f32  (radians, gyro-integrated — drifts without magnetometer)
+#   [76] gps_fix    f32  (0=no fix)
+#   [80] jpeg bytes
+# jpeg_size 0 is a telemetry-only keepalive (scene unchanged, see
+# scenegate.py): width/height are the current stream size, no image.
+HDR_FMT  = '<IIII16f'
+HDR_SIZE = struct.calcsize(HDR_FMT)  # 80
+_HDR     = struct.Struct(HDR_FMT)
+
+# The same header as a NumPy record, for viewing many headers at once
+# (flightlog.FlightLog) or one received packet without unpacking.
+HEADER_DTYPE = np.dtype([
+    ('timestamp', '<u4'),
+    ('width',     '<u4'),
+    ('height',    '<u4'),
+    ('jpeg_size', '<u4'),
+    ('pos',       '<f4', (3,)),
+    ('vel',       '<f4', (3,)),
+    ('acc',       '<f4', (3,)),
+    ('gyr',       '<f4', (3,)),
+    ('pitch',     '<f4'),
+    ('roll',      '<f4'),
+    ('yaw',       '<f4'),
+    ('gps_fix',   '<f4'),
+])
+assert HEADER_DTYPE.itemsize == HDR_SIZE
+
+# Slim header, version 2 (56-byte header + JPEG), sent by record.py with
+# HEADER_VERSION = 2 once every client reads it. Only what changes at frame
+# rate stays; the raw IMU sample and the whole-second timestamp go to the
+# metadata channel. The first 40 bytes keep the v1 offsets, with a magic
+# where v1 has its timestamp (which equals it only in September 1996):
+#   [0]  magic      4s   b'FCH2'
+#   [4]  width      u32
+#   [8]  height     u32
+#   [12] jpeg_size  u32
+#   [16] pos_x      f32  (x/y/z as in v1)
+#   [28] vel_x      f32
+#   [40] pitch      f32
+#   [44] roll       f32
+#   [48] yaw        f32
+#   [52] gps_fix    f32  (kept: it says how to read pos/vel)
+#   [56] jpeg bytes
+HDR2_MAGIC = b'FCH2'
+HDR2_FMT   = '<4sIII10f'
+HDR2_SIZE  = struct.calcsize(HDR2_FMT)  # 56
+_HDR2      = struct.Struct(HDR2_FMT)
+HEADER_VERSIONS = (1, 2)
+
+HEADER_V2_DTYPE = np.dtype([
+    ('magic',     'S4'),
+    ('width',     '<u4'),
+    ('height',    '<u4'),
+    ('jpeg_size', '<u4'),
+    ('pos',       '<f4', (3,)),
+    ('vel',       '<f4', (3,)),
+    ('pitch',     '<f4'),
+    ('roll',      '<f4'),
+    ('yaw',       '<f4'),
+    ('gps_fix',   '<f4'),
+])
+assert HEADER_V2_DTYPE.itemsize == HDR2_SIZE
+_V2_FIELDS = HEADER_V2_DTYPE.names[1:]
+
+# Metadata message, sent on its own channel (record.py -> relay :5557 ->
+# clients :5558) about once a second: slow-changing values as named floats.
+#   [0]        timestamp  u32  seconds since epoch
+#   [4]        count      u32  entries
+#   [8 + 12i]  name       8s   ASCII, NUL padded
+#   [16 + 12i] value      f32
+META_FMT        = '<II'
+META_SIZE       = struct.calcsize(META_FMT)         # 8
+META_ENTRY_FMT  = '<8sf'
+META_ENTRY_SIZE = struct.calcsize(META_ENTRY_FMT)   # 12
+META_NAME_LEN   = 8
+_META           = struct.Struct(META_FMT)
+_META_ENTRY     = struct.Struct(META_ENTRY_FMT)
+
+# Optional extension trailer after the JPEG. lib/packet.c reads exactly
+# header + jpeg_size bytes and accepts longer packets, so old clients
+# ignore it.
+#   [0] magic    4s   b'FCXT'
+#   [4] version  u16  payload layout version
+#   [6] length   u16  payload bytes that follow
+# Trace payload, version 1 (all offsets from the capture instant):
+#   capture_ns       u64  time.monotonic_ns() at capture, sender clock
+#   capture_wall_ns  u64  time.time_ns() at capture, for cross-host latency
+#   claim_us         u32  an encode worker picked the frame up
+#   encoded_us       u32  JPEG ready
+#   packed_us        u32  packet assembled (includes reorder wait)
+#   send_us          u32  handed to zmq
+EXT_MAGIC     = b'FCXT'
+EXT_FMT       = '<4sHH'
+EXT_SIZE      = struct.calcsize(EXT_FMT)   # 8
+TRACE_VERSION = 1
+TRACE_FMT     = '<QQIIII'
+TRACE_SIZE    = struct.calcsize(TRACE_FMT)  # 32
+_EXT          = struct.Struct(EXT_FMT)
+_TRACE        = struct.Struct(TRACE_FMT)
+_SEND_US      = struct.Struct('<I')
+_SEND_US_OFF  = EXT_SIZE + TRACE_SIZE - 4   # send_us within the trailer
+
+SEND_SLOTS    = 4            # > SNDHWM + 1 so a free slot is normally available
+SLOT_CAPACITY = 256 * 1024   # grows on demand for unusually large JPEGs
+
+
+class PacketRing:
+    """Preallocated, reused send buffers.
+
+    The wire format is a single ZMQ frame and the relay and clients use
+    CONFLATE, which rejects multipart messages, so header and JPEG have to be
+    contiguous. The header is written in place with pack_into and the JPEG
+    is copied straight behind it: one memcpy per frame instead of three.
+
+    send() lets pyzmq copy packets below the socket's copy_threshold (a
+    tracked zero-copy send costs more CPU than a memcpy of a typical
+    30-60 KB frame) and sends larger ones zero-copy, reusing that slot only
+    once its tracker reports that ZMQ has released it."""
+
+    def __init__(self, slots: int = SEND_SLOTS, capacity: int = SLOT_CAPACITY,
+                 version: int = 1) -> None:
+        if version not in HEADER_VERSIONS:
+            raise ValueError(f"header version must be one of {HEADER_VERSIONS}, got {version}")
+        self.version   = version
+        self.hdr_size  = HDR_SIZE if version == 1 else HDR2_SIZE
+        self._bufs     = [bytearray(capacity) for _ in range(slots)]
+        self._views    = [memoryview(b) for b in self._bufs]
+        self._trackers = [None] * slots
+        self._next     = 0
+        self._cur      = 0
+        self._trace_at = -1    # offset of the trailer in the current slot
+        self._cap_ns   = 0
+
+    def _claim(self) -> int:
+        n = len(self._bufs)
+        for k in range(n):
+            i = (self._next + k) % n
+            tracker = self._trackers[i]
+            if tracker is None or tracker.done:
+                self._trackers[i] = None
+                self._next = (i + 1) % n
+                return i
+        return -1
+
+    def pack(self, jpeg_buf, width: int, height: int, pos, vel, acc, gyr,
+             pitch: float, roll: float, yaw: float, gps_fix: float,
+             trace: tuple[int, int, int, int] | None = None):
+        """Assemble header + JPEG into a free slot. jpeg_buf is the ndarray
+        returned by cv2.imencode (or any C-contiguous buffer). trace, when
+        given, is (capture_ns, capture_wall_ns, claim_ns, encoded_ns) with
+        monotonic_ns marks and appends the trace trailer; its send mark is
+        filled in by send(). A version 2 ring ignores acc and gyr. Returns
+        a memoryview of the packet, or None when every slot is still held
+        by ZMQ."""
+        i = self._claim()
+        if i < 0:
+            return None
+        src  = memoryview(jpeg_buf).cast('B')
+        body = self.hdr_size + src.nbytes
+        size = body + (EXT_SIZE + TRACE_SIZE if trace is not None else 0)
+        if size > len(self._bufs[i]):
+            self._bufs[i]  = bytearray(size)
+            self._views[i] = memoryview(self._bufs[i])
+        view = self._views[i]
+
+        if self.version == 1:
+            ts = int(time.time()) & 0xFFFFFFFF
+            _HDR.pack_into(
+                view, 0, ts, width, height, src.nbytes,
+                pos[0], pos[1], pos[2],
+                vel[0], vel[1], vel[2],
+                acc[0], acc[1], acc[2],
+                gyr[0], gyr[1], gyr[2],
+                pitch, roll, yaw,
+                gps_fix,
+            )
+        else:
+            _HDR2.pack_into(
+                view, 0, HDR2_MAGIC, width, height, src.nbytes,
+                pos[0], pos[1], pos[2],
+                vel[0], vel[1], vel[2],
+                pitch, roll, yaw,
+                gps_fix,
+            )
+        view[self.hdr_size:body] = src
+        self._cur = i
+        self._trace_at = -1
+        if trace is not None:
+            cap_ns, wall_ns, claim_ns, enc_ns = trace
+            _EXT.pack_into(view, body, EXT_MAGIC, TRACE_VERSION, TRACE_SIZE)
+            _TRACE.pack_into(
+                view, body + EXT_SIZE, cap_ns, wall_ns,
+                (claim_ns - cap_ns) // 1000,
+                (enc_ns - cap_ns) // 1000,
+                (time.monotonic_ns() - cap_ns) // 1000,
+                0,
+            )
+            self._trace_at = body
+            self._cap_ns   = cap_ns
+        return view[:size]
+
+    def send(self, sock, pkt, flags: int = 0) -> None:
+        """Send a packet returned by pack(). Raises zmq.Again like sock.send."""
+        if self._trace_at >= 0:
+            _SEND_US.pack_into(pkt, self._trace_at + _SEND_US_OFF,
+                               (time.monotonic_ns() - self._cap_ns) // 1000)
+        if pkt.nbytes < sock.copy_threshold:
+            sock.send(pkt, flags, copy=True)
+        else:
+            self._trackers[self._cur] = sock.send(pkt, flags, copy=False, track=True)
+
+
+def header_size(pkt) -> int:
+    """Header bytes in front of the JPEG: HDR2_SIZE for a version 2
+    packet, else HDR_SIZE. pkt needs only its first 4 bytes."""
+    return HDR2_SIZE if bytes(memoryview(pkt)[:4]) == HDR2_MAGIC else HDR_SIZE
+
+
+def read_header(pkt, timestamp: int = 0) -> np.void:
+    """Header of a version 1 or 2 packet as a HEADER_DTYPE record (a copy).
+    Version 2 carries no timestamp or raw IMU sample: timestamp comes from
+    the argument, acc and gyr are NaN. The caller checks that pkt holds at
+    least header_size(pkt) bytes."""
+    buf = memoryview(pkt)
+    if bytes(buf[:4]) != HDR2_MAGIC:
+        return np.frombuffer(buf, HEADER_DTYPE, 1)[0].copy()
+    src = np.frombuffer(buf, HEADER_V2_DTYPE, 1)[0]
+    hdr = np.zeros(1, HEADER_DTYPE)[0]
+    for name in _V2_FIELDS:
+        hdr[name] = src[name]
+    hdr['timestamp'] = timestamp & 0xFFFFFFFF
+    hdr['acc'] = hdr['gyr'] = np.nan
+    return hdr
+
+
+def v1_header(pkt, timestamp: int = 0) -> bytes:
+    """The packet's header in the version 1 layout (see read_header), e.g.
+    for the flight log index."""
+    buf = memoryview(pkt)
+    if bytes(buf[:4]) != HDR2_MAGIC:
+        return bytes(buf[:HDR_SIZE])
+    return read_header(buf, timestamp).tobytes()
+
+
+def pack_meta(values: dict[str, float], timestamp: int | None = None) -> bytes:
+    """Metadata message for values ({name: number}, names of at most
+    META_NAME_LEN ASCII characters)."""
+    ts = int(time.time()) if timestamp is None else timestamp
+    buf = bytearray(META_SIZE + META_ENTRY_SIZE * len(values))
+    _META.pack_into(buf, 0, ts & 0xFFFFFFFF, len(values))
+    for i, (name, value) in enumerate(values.items()):
+        key = name.encode('ascii')
+        if len(key) > META_NAME_LEN:
+            raise ValueError(f"metadata name longer than {META_NAME_LEN} bytes: {name!r}")
+        _META_ENTRY.pack_into(buf, META_SIZE + i * META_ENTRY_SIZE, key, value)
+    return bytes(buf)
+
+
+def parse_meta(msg) -> tuple[int, dict[str, float]]:
+    """(timestamp, {name: value}) of a metadata message. Raises ValueError
+    if it is shorter than its count says."""
+    buf = memoryview(msg)
+    if buf.nbytes < META_SIZE:
+        raise ValueError(f"metadata message too short ({buf.nbytes} bytes)")
+    ts, count = _META.unpack_from(buf, 0)
+    if buf.nbytes < META_SIZE + count * META_ENTRY_SIZE:
+        raise ValueError(f"metadata message truncated ({count} entries, {buf.nbytes} bytes)")
+    values = {}
+    for i in range(count):
+        key, value = _META_ENTRY.unpack_from(buf, META_SIZE + i * META_ENTRY_SIZE)
+        values[key.rstrip(b'\0').decode('ascii', 'replace')] = value
+    return ts, values
+
+
+def parse_trace(pkt) -> dict | None:
+    """Trace marks of a received packet, or None if it carries no trace
+    trailer. pkt is the whole wire message (bytes, memoryview, zmq.Frame
+    buffer)."""
+    buf = memoryview(pkt)
+    hdr = header_size(buf)
+    if buf.nbytes < hdr:
+        return None
+    jpeg_size = struct.unpack_from('<I', buf, 12)[0]
+    off = hdr + jpeg_size
+    while off + EXT_SIZE <= buf.nbytes:
+        magic, version, length = _EXT.unpack_from(buf, off)
+        if magic != EXT_MAGIC:
+            return None
+        if version == TRACE_VERSION and length >= TRACE_SIZE:
+            cap_ns, wall_ns, claim, enc, packed, send = _TRACE.unpack_from(buf, off + EXT_SIZE)
+            return {
+                "capture_ns":      cap_ns,
+                "capture_wall_ns": wall_ns,
+                "claim_us":        claim,
+                "encoded_us":      enc,
+                "packed_us":       packed,
+                "send_us":         send,
+            }
+        off += EXT_SIZE + length
+    return None
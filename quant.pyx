@@ -4,9 +4,22 @@
 
 import numpy as np
 cimport numpy as np
+cimport openmp
+from cython.parallel cimport prange
+from libc.stdint cimport uint32_t, uint64_t
 
 ctypedef np.uint8_t u8
 
+# Packing kernels work on C arrays of per-channel bit counts so the pixel
+# loops can run without the GIL, split into row bands that start on a byte
+# boundary and are packed in parallel.
+cdef enum:
+    MAX_CHANNELS   = 16
+    BANDS_PER_THREAD = 4    # more bands than threads evens out the tail
+    LAYOUT_GENERIC = 0
+    LAYOUT_565     = 1
+    LAYOUT_444     = 2
+
 def quantize_bitdepth(np.ndarray[u8, ndim=3] img, int bits):
     cdef int h = img.shape[0]
     cdef int w = img.shape[1]
@@ -45,75 +58,329 @@ def quantize_bitdepth_variable(np.ndarray[u8, ndim=3] img, list channel_bits):
 
     return out
 
-def pack_bits(np.ndarray[u8, ndim=3] img, int bits):
-    cdef Py_ssize_t total_vals = img.size
-    cdef Py_ssize_t total_bits = total_vals * bits
-    cdef Py_ssize_t total_bytes = (total_bits + 7) // 8
-
-    cdef np.ndarray[u8, ndim=1] packed = np.zeros(total_bytes, dtype=np.uint8)
+cdef int _load_bits(list channel_bits, int c, int* bits) except -1:
+    cdef int ch, b
+    if c > MAX_CHANNELS:
+        raise ValueError(f"at most {MAX_CHANNELS} channels supported, got {c}")
+    for ch in range(c):
+        b = channel_bits[ch]
+        if not 1 <= b <= 8:
+            raise ValueError(f"channel_bits[{ch}] must be 1-8, got {b}")
+        bits[ch] = b
+    return 0
+
+
+cdef int _layout(int c, const int* bits) noexcept:
+    if c == 3 and bits[0] == 5 and bits[1] == 6 and bits[2] == 5:
+        return LAYOUT_565
+    if c == 3 and bits[0] == 4 and bits[1] == 4 and bits[2] == 4:
+        return LAYOUT_444
+    return LAYOUT_GENERIC
+
+
+cdef int _threads(int num_threads) noexcept:
+    if num_threads <= 0:
+        return openmp.omp_get_max_threads()
+    return num_threads
+
+
+cdef Py_ssize_t _band_rows(Py_ssize_t h, Py_ssize_t row_bits, int nbands) noexcept:
+    # Smallest row count whose packed length is a whole number of bytes, so
+    # no two bands ever write into the same output byte.
+    cdef Py_ssize_t g = 1
+    cdef Py_ssize_t rows
+    while (g * row_bits) % 8:
+        g += 1
+    rows = (h + nbands - 1) // nbands
+    rows = (rows + g - 1) // g * g
+    return rows if rows > 0 else g
+
+
+cdef inline void _put32(u8* dst, uint64_t v) noexcept nogil:
+    dst[0] = v & 0xFF
+    dst[1] = (v >> 8) & 0xFF
+    dst[2] = (v >> 16) & 0xFF
+    dst[3] = (v >> 24) & 0xFF
+
+
+cdef void _pack_band(const u8* src, u8* dst, Py_ssize_t npix, int c,
+                     const int* bits, const int* shift, int layout) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef int ch
+    cdef uint32_t p0, p1
+    cdef uint64_t acc = 0
+    cdef int nacc = 0
+
+    if layout == LAYOUT_565:
+        for i in range(npix):
+            p0 = (((src[0] >> shift[0]) & 0x1F)
+                  | (((src[1] >> shift[1]) & 0x3F) << 5)
+                  | (((src[2] >> shift[2]) & 0x1F) << 11))
+            dst[0] = p0 & 0xFF
+            dst[1] = p0 >> 8
+            src += 3
+            dst += 2
+        return
+
+    if layout == LAYOUT_444:
+        for i in range(npix // 2):
+            p0 = (((src[0] >> shift[0]) & 0xF)
+                  | (((src[1] >> shift[1]) & 0xF) << 4)
+                  | (((src[2] >> shift[2]) & 0xF) << 8))
+            p1 = (((src[3] >> shift[0]) & 0xF)
+                  | (((src[4] >> shift[1]) & 0xF) << 4)
+                  | (((src[5] >> shift[2]) & 0xF) << 8))
+            p0 |= p1 << 12
+            dst[0] = p0 & 0xFF
+            dst[1] = (p0 >> 8) & 0xFF
+            dst[2] = p0 >> 16
+            src += 6
+            dst += 3
+        if npix & 1:
+            p0 = (((src[0] >> shift[0]) & 0xF)
+                  | (((src[1] >> shift[1]) & 0xF) << 4)
+                  | (((src[2] >> shift[2]) & 0xF) << 8))
+            dst[0] = p0 & 0xFF
+            dst[1] = p0 >> 8
+        return
+
+    # Generic: accumulate LSB-first into a 64-bit word and store 32 bits at
+    # a time. At most 31 + 8 bits are pending after any channel.
+    for i in range(npix):
+        for ch in range(c):
+            acc |= (<uint64_t>((src[ch] >> shift[ch]) & ((1 << bits[ch]) - 1))) << nacc
+            nacc += bits[ch]
+            if nacc >= 32:
+                _put32(dst, acc)
+                dst += 4
+                acc >>= 32
+                nacc -= 32
+        src += c
+    while nacc > 0:
+        dst[0] = acc & 0xFF
+        dst += 1
+        acc >>= 8
+        nacc -= 8
+
+
+cdef void _build_lut(int c, const int* bits, bint expand, u8* lut) noexcept:
+    # Per-channel map from a b-bit code to its output byte: either the raw
+    # code, or the code expanded to 8 bits by bit replication (0 -> 0,
+    # max -> 255, evenly spaced in between).
+    cdef int ch, v, b, pos, r
+    for ch in range(c):
+        b = bits[ch]
+        for v in range(256):
+            if v >= (1 << b):
+                r = 0
+            elif not expand:
+                r = v
+            else:
+                r = 0
+                pos = 8
+                while pos > 0:
+                    pos -= b
+                    if pos >= 0:
+                        r |= v << pos
+                    else:
+                        r |= v >> (-pos)
+            lut[ch * 256 + v] = r
+
+
+cdef inline void _emit3(u8* dst, uint32_t* xdst, Py_ssize_t i, const u8* lut,
+                        uint32_t c0, uint32_t c1, uint32_t c2) noexcept nogil:
+    if xdst != NULL:
+        # MiniFB 0x00BBGGRR from BGR channels: R in the lowest byte.
+        xdst[i] = ((<uint32_t>lut[c0] << 16) | (<uint32_t>lut[256 + c1] << 8)
+                   | lut[512 + c2])
+    else:
+        dst[3 * i]     = lut[c0]
+        dst[3 * i + 1] = lut[256 + c1]
+        dst[3 * i + 2] = lut[512 + c2]
+
+
+cdef void _unpack_band(const u8* src, Py_ssize_t nbytes, u8* dst, uint32_t* xdst,
+                       Py_ssize_t npix, int c, const int* bits, int layout,
+                       const u8* lut) noexcept nogil:
+    # Writes either c bytes per pixel to dst or, when xdst is set (c == 3),
+    # one 0x00BBGGRR word per pixel. Every code goes through lut.
+    cdef Py_ssize_t i
+    cdef int ch
+    cdef uint32_t p0
+    cdef uint64_t acc = 0
+    cdef int nacc = 0
+    cdef u8 px[MAX_CHANNELS]
+
+    if layout == LAYOUT_565:
+        for i in range(npix):
+            p0 = src[0] | (<uint32_t>src[1] << 8)
+            _emit3(dst, xdst, i, lut, p0 & 0x1F, (p0 >> 5) & 0x3F, p0 >> 11)
+            src += 2
+        return
+
+    if layout == LAYOUT_444:
+        for i in range(0, npix - 1, 2):
+            p0 = src[0] | (<uint32_t>src[1] << 8) | (<uint32_t>src[2] << 16)
+            _emit3(dst, xdst, i, lut, p0 & 0xF, (p0 >> 4) & 0xF, (p0 >> 8) & 0xF)
+            _emit3(dst, xdst, i + 1, lut, (p0 >> 12) & 0xF, (p0 >> 16) & 0xF, p0 >> 20)
+            src += 3
+        if npix & 1:
+            p0 = src[0] | (<uint32_t>src[1] << 8)
+            _emit3(dst, xdst, npix - 1, lut, p0 & 0xF, (p0 >> 4) & 0xF, (p0 >> 8) & 0xF)
+        return
+
+    for i in range(npix):
+        for ch in range(c):
+            if nacc < bits[ch]:
+                if nbytes >= 4:
+                    acc |= (<uint64_t>(src[0] | (<uint32_t>src[1] << 8)
+                                       | (<uint32_t>src[2] << 16)
+                                       | (<uint32_t>src[3] << 24))) << nacc
+                    src += 4
+                    nbytes -= 4
+                    nacc += 32
+                else:
+                    while nbytes > 0 and nacc < 32:
+                        acc |= (<uint64_t>src[0]) << nacc
+                        src += 1
+                        nbytes -= 1
+                        nacc += 8
+            px[ch] = lut[ch * 256 + (acc & ((1 << bits[ch]) - 1))]
+            acc >>= bits[ch]
+            nacc -= bits[ch]
+        if xdst != NULL:
+            xdst[i] = (<uint32_t>px[0] << 16) | (<uint32_t>px[1] << 8) | px[2]
+        else:
+            for ch in range(c):
+                dst[ch] = px[ch]
+            dst += c
 
-    cdef u8[:] flat = img.reshape(-1)
-    cdef u8[:] out = packed
 
-    cdef Py_ssize_t i
-    cdef Py_ssize_t bit_pos = 0
-    cdef Py_ssize_t byte_idx, offset
-    cdef u8 value
+cdef object _pack(np.ndarray img, int c, int* bits, int* shift, int num_threads):
+    cdef Py_ssize_t h = img.shape[0]
+    cdef Py_ssize_t w = img.size // h if h else 0
+    cdef Py_ssize_t bits_per_pixel = 0
+    cdef int ch
+    for ch in range(c):
+        bits_per_pixel += bits[ch]
+    w //= c
 
-    for i in range(total_vals):
-        value = flat[i]
+    cdef Py_ssize_t total_bits = h * w * bits_per_pixel
+    cdef Py_ssize_t total_bytes = (total_bits + 7) // 8
+    cdef np.ndarray[u8, ndim=1] packed = np.empty(total_bytes, dtype=np.uint8)
+    if total_bytes == 0:
+        return packed
+
+    cdef const u8[::1] flat = np.ascontiguousarray(img).reshape(-1)
+    cdef u8[::1] out = packed
+    cdef const u8* src = &flat[0]
+    cdef u8* dst = &out[0]
+
+    cdef int nthreads = _threads(num_threads)
+    cdef int layout = _layout(c, bits)
+    cdef Py_ssize_t rows = _band_rows(h, w * bits_per_pixel, nthreads * BANDS_PER_THREAD)
+    cdef Py_ssize_t nbands = (h + rows - 1) // rows
+    cdef Py_ssize_t b, y0, y1
+
+    with nogil:
+        for b in prange(nbands, num_threads=nthreads, schedule='static'):
+            y0 = b * rows
+            y1 = y0 + rows
+            if y1 > h:
+                y1 = h
+            _pack_band(src + y0 * w * c, dst + y0 * w * bits_per_pixel // 8,
+                       (y1 - y0) * w, c, bits, shift, layout)
+    return packed
 
-        byte_idx = bit_pos // 8
-        offset = bit_pos % 8
 
-        out[byte_idx] |= (value << offset) & 0xFF
+cdef object _unpack(np.ndarray packed, int height, int width, int c, int* bits,
+                    bint expand, object out, bint xbgr, int num_threads):
+    cdef Py_ssize_t bits_per_pixel = 0
+    cdef int ch
+    for ch in range(c):
+        bits_per_pixel += bits[ch]
+
+    cdef Py_ssize_t h = height
+    cdef Py_ssize_t w = width
+    cdef Py_ssize_t total_bytes = (h * w * bits_per_pixel + 7) // 8
+    if packed.shape[0] < total_bytes:
+        raise ValueError(f"packed buffer too short ({packed.shape[0]} < {total_bytes} bytes)")
+
+    if xbgr and c != 3:
+        raise ValueError(f"0x00BBGGRR output needs 3 channels, got {c}")
+    if xbgr:
+        shape, dtype = (height, width), np.uint32
+    else:
+        shape, dtype = (height, width, c), np.uint8
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif (out.shape != shape or out.dtype != dtype
+            or not out.flags.c_contiguous or not out.flags.writeable):
+        raise ValueError(f"out must be a writeable C-contiguous {np.dtype(dtype).name} "
+                         f"array of shape {shape}")
+    if total_bytes == 0:
+        return out
+
+    cdef u8 lut[MAX_CHANNELS * 256]
+    _build_lut(c, bits, expand, lut)
+
+    cdef const u8[::1] flat = np.ascontiguousarray(packed)
+    cdef const u8* src = &flat[0]
+    cdef u8[::1] out8
+    cdef uint32_t[::1] out32
+    cdef u8* dst = NULL
+    cdef uint32_t* xdst = NULL
+    if xbgr:
+        out32 = out.reshape(-1)
+        xdst = &out32[0]
+    else:
+        out8 = out.reshape(-1)
+        dst = &out8[0]
+
+    cdef int nthreads = _threads(num_threads)
+    cdef int layout = _layout(c, bits)
+    cdef Py_ssize_t rows = _band_rows(h, w * bits_per_pixel, nthreads * BANDS_PER_THREAD)
+    cdef Py_ssize_t nbands = (h + rows - 1) // rows
+    cdef Py_ssize_t b, y0, y1, start
+
+    with nogil:
+        for b in prange(nbands, num_threads=nthreads, schedule='static'):
+            y0 = b * rows
+            y1 = y0 + rows
+            if y1 > h:
+                y1 = h
+            start = y0 * w * bits_per_pixel // 8
+            _unpack_band(src + start, (y1 * w * bits_per_pixel + 7) // 8 - start,
+                         dst + y0 * w * c if dst != NULL else NULL,
+                         xdst + y0 * w if xdst != NULL else NULL,
+                         (y1 - y0) * w, c, bits, layout, lut)
+    return out
 
-        if offset + bits > 8:
-            out[byte_idx + 1] |= value >> (8 - offset)
 
-        bit_pos += bits
+def pack_bits(np.ndarray[u8, ndim=3] img, int bits, int num_threads=0):
+    cdef int c = img.shape[2]
+    cdef int cbits[MAX_CHANNELS]
+    cdef int shift[MAX_CHANNELS]
+    cdef int ch
+    _load_bits([bits] * c, c, cbits)
+    for ch in range(c):
+        shift[ch] = 0
+    return _pack(img, c, cbits, shift, num_threads)
 
-    return packed
 
-def pack_bits_variable(np.ndarray[u8, ndim=3] img, list channel_bits):
-    cdef int h = img.shape[0]
-    cdef int w = img.shape[1]
+def pack_bits_variable(np.ndarray[u8, ndim=3] img, list channel_bits, int num_threads=0):
     cdef int c = img.shape[2]
-    
+
     if len(channel_bits) != c:
         raise ValueError(f"channel_bits length ({len(channel_bits)}) must match image channels ({c})")
-    
-    cdef Py_ssize_t bits_per_pixel = sum(channel_bits)
-    cdef Py_ssize_t total_pixels = h * w
-    cdef Py_ssize_t total_bits = total_pixels * bits_per_pixel
-    cdef Py_ssize_t total_bytes = (total_bits + 7) // 8
-    
-    cdef np.ndarray[u8, ndim=1] packed = np.zeros(total_bytes, dtype=np.uint8)
-    cdef u8[:] out = packed
-    
-    cdef Py_ssize_t bit_pos = 0
-    cdef Py_ssize_t byte_idx, offset
-    cdef u8 value
-    cdef int x, y, ch
-    cdef int ch_bits
-    
-    for y in range(h):
-        for x in range(w):
-            for ch in range(c):
-                value = img[y, x, ch]
-                ch_bits = channel_bits[ch]
-                
-                byte_idx = bit_pos // 8
-                offset = bit_pos % 8
-                
-                out[byte_idx] |= (value << offset) & 0xFF
-                
-                if offset + ch_bits > 8:
-                    out[byte_idx + 1] |= value >> (8 - offset)
-                
-                bit_pos += ch_bits
-    
-    return packed
+
+    cdef int bits[MAX_CHANNELS]
+    cdef int shift[MAX_CHANNELS]
+    cdef int ch
+    _load_bits(channel_bits, c, bits)
+    for ch in range(c):
+        shift[ch] = 0
+    return _pack(img, c, bits, shift, num_threads)
 
 
 def unpack_bits(
@@ -121,43 +388,21 @@ def unpack_bits(
     int bits,
     int height,
     int width,
-    int channels
+    int channels,
+    int num_threads=0,
 ):
-    cdef Py_ssize_t total_vals = height * width * channels
-
-    cdef np.ndarray[u8, ndim=1] flat = np.zeros(total_vals, dtype=np.uint8)
-    cdef u8[:] out = flat
-    cdef u8[:] src = packed
-
-    cdef Py_ssize_t i
-    cdef Py_ssize_t bit_pos = 0
-    cdef Py_ssize_t byte_idx, offset
-
-    cdef u8 mask = (1 << bits) - 1
-    cdef u8 value
-
-    for i in range(total_vals):
-        byte_idx = bit_pos // 8
-        offset = bit_pos % 8
+    cdef int cbits[MAX_CHANNELS]
+    _load_bits([bits] * channels, channels, cbits)
+    return _unpack(packed, height, width, channels, cbits, False, None, False, num_threads)
 
-        value = (src[byte_idx] >> offset) & mask
 
-        if offset + bits > 8:
-            value |= (src[byte_idx + 1] << (8 - offset)) & mask
-
-        out[i] = value
-        bit_pos += bits
-
-    return flat.reshape((height, width, channels))
-
-def quantize_and_pack(np.ndarray[u8, ndim=3] img, list channel_bits):
+def quantize_and_pack(np.ndarray[u8, ndim=3] img, list channel_bits, int num_threads=0):
     """
     Quantize each channel to its target bit depth and pack into a flat byte
     array in a single pass — equivalent to calling quantize_bitdepth_variable
     followed by pack_bits_variable but without the intermediate array.
+    Runs without the GIL on num_threads threads (0 = OpenMP default).
     """
-    cdef int h = img.shape[0]
-    cdef int w = img.shape[1]
     cdef int c = img.shape[2]
 
     if len(channel_bits) != c:
@@ -165,38 +410,13 @@ def quantize_and_pack(np.ndarray[u8, ndim=3] img, list channel_bits):
             f"channel_bits length ({len(channel_bits)}) must match image channels ({c})"
         )
 
-    cdef Py_ssize_t bits_per_pixel = sum(channel_bits)
-    cdef Py_ssize_t total_bits = <Py_ssize_t>h * w * bits_per_pixel
-    cdef Py_ssize_t total_bytes = (total_bits + 7) // 8
-
-    cdef np.ndarray[u8, ndim=1] packed = np.zeros(total_bytes, dtype=np.uint8)
-    cdef u8[:] out = packed
-
-    cdef Py_ssize_t bit_pos = 0
-    cdef Py_ssize_t byte_idx, offset_bits
-    cdef u8 value
-    cdef int x, y, ch, ch_bits, shift
-
-    for y in range(h):
-        for x in range(w):
-            for ch in range(c):
-                ch_bits = channel_bits[ch]
-                shift = 8 - ch_bits
-                # quantize: drop the low bits
-                value = img[y, x, ch] >> shift
-
-                # pack into output bitstream
-                byte_idx = bit_pos // 8
-                offset_bits = bit_pos % 8
-
-                out[byte_idx] |= (value << offset_bits) & 0xFF
-
-                if offset_bits + ch_bits > 8:
-                    out[byte_idx + 1] |= value >> (8 - offset_bits)
-
-                bit_pos += ch_bits
-
-    return packed
+    cdef int bits[MAX_CHANNELS]
+    cdef int shift[MAX_CHANNELS]
+    cdef int ch
+    _load_bits(channel_bits, c, bits)
+    for ch in range(c):
+        shift[ch] = 8 - bits[ch]
+    return _pack(img, c, bits, shift, num_threads)
 
 
 def unpack_bits_variable(
@@ -204,35 +424,36 @@ def unpack_bits_variable(
     list channel_bits,
     int height,
     int width,
-    int channels
+    int channels,
+    int num_threads=0,
 ):
     if len(channel_bits) != channels:
         raise ValueError(f"channel_bits length ({len(channel_bits)}) must match channels ({channels})")
-    
-    cdef np.ndarray[u8, ndim=3] img = np.zeros((height, width, channels), dtype=np.uint8)
-    cdef u8[:] src = packed
-    
-    cdef Py_ssize_t bit_pos = 0
-    cdef Py_ssize_t byte_idx, offset
-    cdef u8 value, mask
-    cdef int x, y, ch
-    cdef int ch_bits
-    
-    for y in range(height):
-        for x in range(width):
-            for ch in range(channels):
-                ch_bits = channel_bits[ch]
-                mask = (1 << ch_bits) - 1
-                
-                byte_idx = bit_pos // 8
-                offset = bit_pos % 8
-                
-                value = (src[byte_idx] >> offset) & mask
-                
-                if offset + ch_bits > 8:
-                    value |= (src[byte_idx + 1] << (8 - offset)) & mask
-                
-                img[y, x, ch] = value
-                bit_pos += ch_bits
-    
-    return img
+
+    cdef int bits[MAX_CHANNELS]
+    _load_bits(channel_bits, channels, bits)
+    return _unpack(packed, height, width, channels, bits, False, None, False, num_threads)
+
+
+def unpack_dequantize(
+    np.ndarray[u8, ndim=1] packed,
+    list channel_bits,
+    int height,
+    int width,
+    out=None,
+    bint xbgr=False,
+    int num_threads=0,
+):
+    """
+    Unpack and expand every channel back to 8 bits (bit replication) in one
+    pass — the inverse of quantize_and_pack. Writes into out when given so a
+    receiver can keep decoding into the same frame buffer:
+      xbgr=False  out is uint8 (height, width, channels)
+      xbgr=True   out is uint32 (height, width) of 0x00BBGGRR pixels built
+                  from BGR channels, the MiniFB layout lib/packet.c produces
+    Returns out (allocated if None).
+    """
+    cdef int channels = len(channel_bits)
+    cdef int bits[MAX_CHANNELS]
+    _load_bits(channel_bits, channels, bits)
+    return _unpack(packed, height, width, channels, bits, True, out, xbgr, num_threads)
@@ -0,0 +1,271 @@
+"""Ground-station receiver: subscribe to the relay and decode frames in Python.
+
+    python receiver.py [tcp://relay:5556] [--meta tcp://relay:5558] [--workers 2] [--show]
+
+Same socket semantics as the C client (SUB, CONFLATE: only the newest
+packet is kept). Headers of either version are read through
+packet.read_header as HEADER_DTYPE records; JPEGs are decoded on a small
+thread pool (cv2.imdecode releases the GIL) into a fixed set of reused
+frame buffers. With a metadata address, rx.meta holds the newest metadata
+message ({name: value}, packet.parse_meta).
+
+    with Receiver(addr) as rx:
+        for frame in rx:                 # blocks for each new frame
+            frame.image, frame.header['yaw']
+        frame = rx.latest()              # or poll: newest frame or None
+
+A returned frame's image stays valid until the next latest()/iteration
+step; copy it to keep it longer. Telemetry-only keepalives (sent while the
+scene is static) yield no frame; rx.telemetry holds the newest header."""
+
+import argparse
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+import zmq
+
+from env import FLYCAM_META_SERVER, FLYCAM_SERVER
+from packet import header_size, parse_meta, parse_trace, read_header
+
+DECODE_WORKERS = 2
+RECV_TIMEOUT_MS = 200
+
+
+@dataclass
+class Frame:
+    seq: int                 # receive order
+    header: np.void          # HEADER_DTYPE record (copied out of the packet)
+    image: np.ndarray        # BGR, a view of a pool buffer
+    recv_ns: int             # time.time_ns() at receive
+    trace: dict | None       # packet.parse_trace marks, if the sender added them
+    _slot: int = -1
+
+
+class Receiver:
+    """SUB socket + receive thread + decode pool.
+
+    Slots: each decode worker fills one, one holds the latest decoded frame
+    and one is lent to the caller, so workers + 2 buffers never run dry.
+    Packets that arrive while every worker is busy replace the pending one
+    (dropped), like CONFLATE does on the socket."""
+
+    def __init__(self, addr: str = FLYCAM_SERVER, workers: int = DECODE_WORKERS,
+                 meta_addr: str | None = None) -> None:
+        if not addr:
+            raise ValueError("no relay address (argument or FLYCAM_SERVER)")
+        self._ctx  = zmq.Context()
+        self._sock = self._subscribe(addr)
+        self._meta_sock = self._subscribe(meta_addr) if meta_addr else None
+        self._poller = zmq.Poller()
+        self._poller.register(self._sock, zmq.POLLIN)
+        if self._meta_sock is not None:
+            self._poller.register(self._meta_sock, zmq.POLLIN)
+
+        self._cv       = threading.Condition()
+        self._bufs: list[np.ndarray | None] = [None] * (workers + 2)
+        self._free     = list(range(workers + 2))
+        self._pending  = None          # (seq, msg, recv_ns) awaiting a worker
+        self._latest: Frame | None = None
+        self._lent: Frame | None   = None
+        self._last_seq = -1            # newest seq handed to the caller
+        self._stopped  = False
+        self.received      = 0
+        self.decoded       = 0
+        self.dropped       = 0         # replaced before a worker took it
+        self.errors        = 0         # short packets, undecodable JPEG or metadata
+        self.keepalives    = 0         # telemetry-only packets (jpeg_size 0)
+        self.telemetry: np.void | None = None   # header of the newest packet of any kind
+        self.meta: dict[str, float] = {}        # newest metadata message
+        self.meta_time = 0                      # its timestamp (seconds since epoch)
+
+        self._threads = [threading.Thread(target=self._recv_loop, daemon=True)]
+        self._threads += [threading.Thread(target=self._decode_loop, daemon=True)
+                          for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _subscribe(self, addr: str) -> zmq.Socket:
+        sock = self._ctx.socket(zmq.SUB)
+        sock.setsockopt(zmq.CONFLATE, 1)
+        sock.setsockopt(zmq.RCVHWM, 1)
+        sock.connect(addr)
+        sock.setsockopt(zmq.SUBSCRIBE, b"")
+        return sock
+
+    def _recv_meta(self) -> None:
+        try:
+            self.meta_time, self.meta = parse_meta(self._meta_sock.recv())
+        except ValueError:
+            with self._cv:
+                self.errors += 1
+
+    def _recv_loop(self) -> None:
+        seq = 0
+        while not self._stopped:
+            try:
+                ready = dict(self._poller.poll(RECV_TIMEOUT_MS))
+                if self._meta_sock in ready:
+                    self._recv_meta()
+                if self._sock not in ready:
+                    continue
+                msg = self._sock.recv(copy=False)
+            except zmq.ContextTerminated:
+                return
+            recv_ns = time.time_ns()
+            buf = msg.buffer
+            if buf.nbytes >= header_size(buf):
+                hdr = read_header(buf, recv_ns // 1_000_000_000)
+                self.telemetry = hdr
+                if hdr['jpeg_size'] == 0:
+                    # Static scene: the sender skipped the frame, keep the last image.
+                    with self._cv:
+                        self.received += 1
+                        self.keepalives += 1
+                    continue
+            with self._cv:
+                self.received += 1
+                if self._pending is not None:
+                    self.dropped += 1
+                self._pending = (seq, msg, recv_ns)
+                self._cv.notify_all()
+            seq += 1
+
+    def _decode_loop(self) -> None:
+        while True:
+            with self._cv:
+                while (self._pending is None or not self._free) and not self._stopped:
+                    self._cv.wait()
+                if self._stopped:
+                    return
+                seq, msg, recv_ns = self._pending
+                self._pending = None
+                slot = self._free.pop()
+
+            frame = self._decode(seq, msg, recv_ns, slot)
+
+            with self._cv:
+                if frame is None:
+                    self.errors += 1
+                    self._free.append(slot)
+                elif self._latest is not None and self._latest.seq > seq:
+                    self._free.append(slot)      # a newer frame finished first
+                else:
+                    old, self._latest = self._latest, frame
+                    if old is not None and old is not self._lent:
+                        self._free.append(old._slot)
+                    self.decoded += 1
+                self._cv.notify_all()
+
+    def _decode(self, seq: int, msg, recv_ns: int, slot: int) -> Frame | None:
+        buf = msg.buffer
+        hdr_size = header_size(buf)
+        if buf.nbytes < hdr_size:
+            return None
+        hdr = read_header(buf, recv_ns // 1_000_000_000)
+        jpeg_size, w, h = int(hdr['jpeg_size']), int(hdr['width']), int(hdr['height'])
+        if hdr_size + jpeg_size > buf.nbytes:
+            return None
+        img = cv2.imdecode(np.frombuffer(buf, np.uint8, jpeg_size, hdr_size), cv2.IMREAD_COLOR)
+        if img is None or img.shape[:2] != (h, w):
+            return None
+        # imdecode cannot decode into a given array, so the pool bounds
+        # how many frames are alive and keeps the lend-out contract simple.
+        out = self._bufs[slot]
+        if out is None or out.shape != img.shape:
+            out = self._bufs[slot] = np.empty_like(img)
+        np.copyto(out, img)
+        return Frame(seq, hdr, out, recv_ns, parse_trace(buf), slot)
+
+    def _lend(self) -> Frame:
+        """Hand the latest frame to the caller; caller holds _cv."""
+        prev, self._lent = self._lent, self._latest
+        if prev is not None and prev is not self._latest:
+            self._free.append(prev._slot)
+            self._cv.notify_all()
+        self._last_seq = self._latest.seq
+        return self._latest
+
+    def latest(self) -> Frame | None:
+        """Newest decoded frame not returned before, or None."""
+        with self._cv:
+            if self._latest is None or self._latest.seq == self._last_seq:
+                return None
+            return self._lend()
+
+    def next(self, timeout: float | None = None) -> Frame | None:
+        """Block until a frame newer than the last one returned is decoded.
+        None on timeout or after close()."""
+        with self._cv:
+            ok = self._cv.wait_for(
+                lambda: self._stopped or (self._latest is not None
+                                          and self._latest.seq != self._last_seq),
+                timeout)
+            if not ok or self._stopped:
+                return None
+            return self._lend()
+
+    def __iter__(self):
+        while True:
+            frame = self.next()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self) -> None:
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
+        for t in self._threads:
+            t.join(timeout=1)
+        self._sock.close(linger=0)
+        if self._meta_sock is not None:
+            self._meta_sock.close(linger=0)
+        self._ctx.term()
+
+    def __enter__(self) -> "Receiver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("addr", nargs="?", default=FLYCAM_SERVER)
+    ap.add_argument("--meta", default=FLYCAM_META_SERVER, help="metadata address, e.g. tcp://relay:5558")
+    ap.add_argument("--workers", type=int, default=DECODE_WORKERS)
+    ap.add_argument("--show", action="store_true", help="display frames (needs a GUI OpenCV build)")
+    args = ap.parse_args()
+
+    rx = Receiver(args.addr, args.workers, args.meta)
+    print(f"[rx] listening on {args.addr}" + (f"  meta {args.meta}" if args.meta else ""), flush=True)
+    t_log, frames = time.monotonic(), 0
+    try:
+        for frame in rx:
+            frames += 1
+            if args.show:
+                cv2.imshow("flycam", frame.image)
+                if cv2.waitKey(1) == 27:
+                    break
+            now = time.monotonic()
+            if now - t_log >= 1.0:
+                h = frame.header
+                print(f"[rx] {frames / (now - t_log):.1f} fps  {h['width']}x{h['height']}"
+                      f"  {h['jpeg_size'] / 1024:.1f} KB  yaw={np.degrees(h['yaw']):.1f}"
+                      f"  recv={rx.received} dec={rx.decoded} drop={rx.dropped} err={rx.errors}"
+                      f" ka={rx.keepalives}"
+                      + (f"  sats={rx.meta.get('sats', 0):.0f} temp={rx.meta.get('imu_temp', 0):.1f}C"
+                         if rx.meta else ""),
+                      flush=True)
+                t_log, frames = now, 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rx.close()
+
+
+if __name__ == "__main__":
+    main()
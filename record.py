@@ -1,91 +1,276 @@
 DEBUG = False
 DEBUG_VIDEO = "fpv.mp4"
+DEBUG_FPS = 0           # pace the debug video like the camera (e.g. 60); 0 reads as fast as it decodes
 
-import math
+import argparse
+import multiprocessing
 import time
-import struct
 import threading
-import queue
 import cv2
-
-from gyro import read_gyro_records
-from gps import GPSReader
-
-if not DEBUG:
-    from picamera2 import Picamera2
-
-from env import GO_SERVER
+import numpy as np
+
+import datafussion
+import sensors
+from packet import HDR2_SIZE, HDR_SIZE, PacketRing, pack_meta
+from bitrate import BitrateController
+from encoder import ENCODERS, make_encoder
+from flightlog import FlightRecorder
+from scenegate import KEEPALIVE, SEND, SceneGate
+from servo import Ticker
+from env import GO_META_SERVER, GO_PREVIEW_SERVER, GO_SERVER
 import zmq
 
-JPEG_QUALITY = 75
+JPEG_QUALITY = 75      # starting quality; BitrateController adjusts it
+ABR = True              # False: stay at JPEG_QUALITY and W x H (bitrate.py)
 H = 480
 W = 720
-GPS_ANCHOR_INTERVAL = 60  # frames between GPS anchor attempts
-
-# Zero-velocity update (ZUPT): if the IMU looks stationary, zero velocity
-# to prevent bias double-integration drift.
-ZUPT_ACC_THRESH = 0.3   # m/s² — max deviation of |acc| from G to be considered still
-ZUPT_GYR_THRESH = 0.05  # rad/s — max gyro magnitude to be considered still
-
-# Packet layout (80-byte header + JPEG):
-#   [0]  timestamp  u32
-#   [4]  width      u32
-#   [8]  height     u32
-#   [12] jpeg_size  u32
-#   [16] pos_x      f32  (lat/lon/alt from GPS, or dead-reckoned metres)
-#   [20] pos_y      f32
-#   [24] pos_z      f32
-#   [28] vel_x      f32  (m/s world frame, or speed_knots from GPS)
-#   [32] vel_y      f32  (m/s, or course_deg from GPS)
-#   [36] vel_z      f32
-#   [40] acc_x      f32
-#   [44] acc_y      f32
-#   [48] acc_z      f32
-#   [52] gyr_x      f32
-#   [56] gyr_y      f32
-#   [60] gyr_z      f32
-#   [64] pitch      f32  (radians, complementary filter)
-#   [68] roll       f32
-#   [72] yaw        f32  (radians, gyro-integrated — drifts without magnetometer)
-#   [76] gps_fix    f32  (0=no fix)
-#   [80] jpeg bytes
-_HDR_FMT  = '<IIII16f'
-_HDR_SIZE = struct.calcsize(_HDR_FMT)  # 80
-_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
-
-print(f"JPEG quality: {JPEG_QUALITY}  resolution: {W}x{H}  header: {_HDR_SIZE}B")
-
-
-def _pack(jpeg_bytes: bytes, pos, vel, acc, gyr, pitch: float, roll: float, yaw: float, gps_fix: float) -> bytes:
-    ts = int(time.time()) & 0xFFFFFFFF
-    return struct.pack(
-        _HDR_FMT, ts, W, H, len(jpeg_bytes),
-        pos[0], pos[1], pos[2],
-        vel[0], vel[1], vel[2],
-        acc[0], acc[1], acc[2],
-        gyr[0], gyr[1], gyr[2],
-        pitch, roll, yaw,
-        gps_fix,
-    ) + jpeg_bytes
-
-
-# Shared sensor state — class fields are mutable so inner functions can write
-class _S:
-    acc          = [0.0, 0.0, 0.0]
-    gyr          = [0.0, 0.0, 0.0]
-    vel          = [0.0, 0.0, 0.0]   # m/s world frame
-    pos          = [0.0, 0.0, 0.0]   # metres from origin (or lat/lon/alt after GPS anchor)
-    pitch        = 0.0               # radians, complementary filter
-    roll         = 0.0
-    yaw          = 0.0               # radians, gyro-integrated
-    gps_fix      = 0.0               # 0 = never had fix
-    gps_pending  = None              # latest GPS fix dict, set by GPS thread
-
-
-_lock = threading.Lock()
+ENCODE_WORKERS = 3      # parallel JPEG encoders; cv2.imencode releases the GIL
+LATENCY_TRACE = True    # append per-stage timing trailer (see packet.py, latency.py)
+SENSOR_PROCESS = True   # IMU/GPS/fusion in a separate process, read via shared memory
+GIMBAL_STABILIZE = False  # run gimbal.py's servo loop with the sensors
+SIM_SENSORS = False     # simulated IMU, GPS (pty) and servo bus instead of the hardware (sensors.py)
+FLIGHT_LOG_DIR = None   # e.g. "/home/pi/flights": keep every sent packet on disk (flightlog.py)
+SCENE_SKIP = True       # static scene: telemetry-only keepalives instead of frames (scenegate.py)
+ENCODER = "auto"        # "yuv420" (camera YUV420 -> libjpeg-turbo raw planes), "cv2" (BGR888), "auto"
+HEADER_VERSION = 1      # 2: slim 56-byte header (packet.py) once every client reads it
+META_INTERVAL_S = 1.0   # status on the metadata channel (GO_META_SERVER), if set
+PREVIEW_W = 360         # second, downscaled stream from the same frames to GO_PREVIEW_SERVER, if set
+PREVIEW_H = 240
+PREVIEW_QUALITY = 40
+PREVIEW_WORKERS = 1
+
+_NO_JPEG = np.empty(0, np.uint8)   # keepalive payload: header only, jpeg_size 0
+
+
+class _FrameRing:
+    """Fixed set of capture buffers, reused instead of allocating ~1 MB per
+    frame. The capture thread takes a free buffer, fills it in place and
+    submits it; the encode pool gives it back once the frame is encoded or
+    was replaced in the submit slot. A frame submitted to several pools
+    is retain()ed once per extra pool and free after the last release.
+
+    Per pool one buffer per encode worker and one waiting in the slot,
+    plus one being filled, never run dry. Buffers are allocated on first
+    use, in the shape the capture path asks for."""
+
+    def __init__(self, size: int) -> None:
+        self._bufs: list[np.ndarray | None] = [None] * size
+        self._refs = [0] * size
+        self._free = list(range(size))
+        self._cv   = threading.Condition()
+
+    def acquire(self, shape: tuple[int, ...], timeout: float = 0.1) -> tuple[int, np.ndarray | None]:
+        """(index, buffer), or (-1, None) if none came free in time."""
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._free, timeout):
+                return -1, None
+            i = self._free.pop()
+            self._refs[i] = 1
+        buf = self._bufs[i]
+        if buf is None or buf.shape != shape:
+            buf = self._bufs[i] = np.empty(shape, np.uint8)
+        return i, buf
+
+    def retain(self, i: int) -> None:
+        with self._cv:
+            self._refs[i] += 1
+
+    def release(self, i: int) -> None:
+        if i < 0:
+            return
+        with self._cv:
+            self._refs[i] -= 1
+            if self._refs[i] == 0:
+                self._free.append(i)
+                self._cv.notify()
+
+
+class _EncodePool:
+    """JPEG-encode frames on several worker threads and hand them back in
+    capture order. settings() returns the (quality, width, height) to
+    encode at; frames of another size are downscaled first. encoder is an
+    encoder.make_encoder backend and frames are in its format.
+
+    Input is a single latest-wins slot: a frame nobody has claimed yet is
+    replaced by a newer one. Sequence numbers are assigned when a worker
+    claims the slot, so claimed frames are numbered in capture order with no
+    gaps. On output, when several consecutive frames are already encoded the
+    older ones are dropped and only the newest is returned.
+
+    Each frame carries monotonic_ns marks for latency tracing: capture (from
+    the caller), claim by a worker, and encode done. release(slot) is called
+    with the caller's buffer index once a frame no longer needs its buffer.
+
+    A frame of None is a keepalive: it is not encoded and comes back with
+    an empty JPEG. It never replaces a real frame waiting in the slot."""
+
+    def __init__(self, workers: int, settings, encoder, release=lambda slot: None) -> None:
+        self._settings   = settings
+        self._encoder    = encoder
+        self._release    = release
+        self._cv         = threading.Condition()
+        self._frame      = None   # latest unclaimed (frame, capture_ns, capture_wall_ns, slot)
+        self._next_in    = 0      # seq given to the next claimed frame
+        self._next_out   = 0      # seq the consumer is waiting for
+        self._done: dict[int, tuple | None] = {}   # seq -> (jpeg, w, h, secs, marks), None if encode failed
+        self._stopped    = False
+        self._enc_time   = [0.0] * workers
+        self._enc_count  = [0] * workers
+        self.dropped_in  = 0      # frames replaced before a worker claimed them
+        self.dropped_out = 0      # encoded frames skipped because a newer one was ready
+        self._threads = [
+            threading.Thread(target=self._worker, args=(i,), daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, frame, capture_ns: int, capture_wall_ns: int, slot: int = -1) -> None:
+        with self._cv:
+            replaced = self._frame
+            if replaced is not None:
+                if frame is None:
+                    return
+                self.dropped_in += 1
+            self._frame = (frame, capture_ns, capture_wall_ns, slot)
+            self._cv.notify_all()
+        if replaced is not None:
+            self._release(replaced[3])
+
+    def _worker(self, idx: int) -> None:
+        resized = None    # this worker's downscale buffer, reused while the size holds
+        while True:
+            with self._cv:
+                while self._frame is None and not self._stopped:
+                    self._cv.wait()
+                if self._stopped:
+                    return
+                frame, cap_ns, wall_ns, slot = self._frame
+                self._frame = None
+                seq = self._next_in
+                self._next_in += 1
+            claim_ns = time.monotonic_ns()
+
+            quality, w, h = self._settings()
+            enc = self._encoder
+            t0 = time.perf_counter()
+            if frame is None:
+                jpeg_buf = _NO_JPEG
+            else:
+                if enc.size(frame) != (w, h):
+                    self._release(slot)
+                    slot = -1
+                    frame = resized = enc.resize(frame, w, h, resized)
+                jpeg_buf = enc.encode(frame, quality)
+            self._release(slot)
+            dt = time.perf_counter() - t0
+            marks = (cap_ns, wall_ns, claim_ns, time.monotonic_ns())
+
+            with self._cv:
+                self._done[seq] = (jpeg_buf, w, h, dt, marks) if jpeg_buf is not None else None
+                if frame is not None:
+                    self._enc_time[idx]  += dt
+                    self._enc_count[idx] += 1
+                self._cv.notify_all()
+
+    def get(self):
+        """Block until the next frame in capture order is encoded and return
+        (jpeg_buf, width, height, encode_seconds, marks) where marks is
+        (capture_ns, capture_wall_ns, claim_ns, encoded_ns). Returns None once
+        the pool is stopped."""
+        with self._cv:
+            while True:
+                while self._next_out not in self._done and not self._stopped:
+                    self._cv.wait()
+                if self._stopped:
+                    return None
+                result = self._done.pop(self._next_out)
+                self._next_out += 1
+                if self._next_out in self._done:
+                    newer = self._done[self._next_out]
+                    # A keepalive never displaces an encoded frame.
+                    if not (result is not None and result[0].size
+                            and newer is not None and newer[0].size == 0):
+                        self.dropped_out += 1
+                        continue
+                if result is not None:
+                    return result
+
+    def worker_stats(self) -> list[tuple[int, float]]:
+        """Per-worker (frames, mean encode ms) since the last call."""
+        with self._cv:
+            stats = [
+                (n, t / n * 1000.0 if n else 0.0)
+                for n, t in zip(self._enc_count, self._enc_time)
+            ]
+            self._enc_time[:]  = [0.0] * len(self._enc_time)
+            self._enc_count[:] = [0] * len(self._enc_count)
+        return stats
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
+        for t in self._threads:
+            t.join(timeout=1)
+
+
+def _size(text: str) -> tuple[int, int]:
+    w, _, h = text.lower().partition("x")
+    try:
+        return int(w), int(h)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WxH, got {text!r}") from None
+
+
+def _parse_args() -> argparse.Namespace:
+    """Command-line overrides for the settings above (bench_pipeline.py
+    uses them); without arguments the constants apply as they are."""
+    ap = argparse.ArgumentParser(description="Capture, encode and send the camera stream to GO_SERVER.")
+    ap.add_argument("--debug-video", metavar="PATH", help="read PATH instead of the camera (DEBUG)")
+    ap.add_argument("--debug-fps", type=float, default=DEBUG_FPS, help="pace the debug video, 0: unpaced")
+    ap.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    ap.add_argument("--size", type=_size, default=(W, H), metavar="WxH")
+    ap.add_argument("--fixed", action="store_true", help="no bitrate control: stay at --quality, --size")
+    ap.add_argument("--encoder", choices=("auto", *ENCODERS), default=ENCODER)
+    ap.add_argument("--workers", type=int, default=ENCODE_WORKERS)
+    ap.add_argument("--sim-sensors", action="store_true", default=SIM_SENSORS)
+    ap.add_argument("--no-scene-skip", action="store_true")
+    return ap.parse_args()
 
 
 if __name__ == "__main__":
+    _args = _parse_args()
+    if _args.debug_video:
+        DEBUG, DEBUG_VIDEO = True, _args.debug_video
+    DEBUG_FPS      = _args.debug_fps
+    JPEG_QUALITY   = _args.quality
+    W, H           = _args.size
+    ABR            = ABR and not _args.fixed
+    ENCODER        = _args.encoder
+    ENCODE_WORKERS = _args.workers
+    SIM_SENSORS    = _args.sim_sensors
+    SCENE_SKIP     = SCENE_SKIP and not _args.no_scene_skip
+
+    _enc = make_encoder(ENCODER, W, H)
+    print(f"JPEG quality: {JPEG_QUALITY}{'' if ABR else ' (fixed)'}  resolution: {W}x{H}"
+          f"  header: v{HEADER_VERSION} {HDR_SIZE if HEADER_VERSION == 1 else HDR2_SIZE}B"
+          f"  encoders: {ENCODE_WORKERS} x {_enc.name}  sensors: {'process' if SENSOR_PROCESS else 'threads'}"
+          f"{' (simulated)' if SIM_SENSORS else ''}")
+
+    # Fork the sensor process before any threads or zmq sockets exist.
+    if SENSOR_PROCESS:
+        _mp          = multiprocessing.get_context("fork")
+        _shared      = datafussion.SharedFused(create=True)
+        _sensor_stop = _mp.Event()
+        _sensor_proc = _mp.Process(target=sensors.run_process,
+                                   args=(_shared.name, _sensor_stop, GIMBAL_STABILIZE, SIM_SENSORS),
+                                   daemon=True)
+        _sensor_proc.start()
+        read_fused = _shared.read
+    else:
+        read_fused = datafussion.get_fused
+
     context = zmq.Context()
     sock = context.socket(zmq.PUSH)
     sock.setsockopt(zmq.SNDHWM, 2)
@@ -93,10 +278,28 @@ if __name__ == "__main__":
     sock.setsockopt(zmq.LINGER, 0)
     sock.connect(GO_SERVER)
 
+    meta_sock = None
+    if GO_META_SERVER:
+        meta_sock = context.socket(zmq.PUSH)
+        meta_sock.setsockopt(zmq.SNDHWM, 1)
+        meta_sock.setsockopt(zmq.SNDTIMEO, 0)
+        meta_sock.setsockopt(zmq.LINGER, 0)
+        meta_sock.connect(GO_META_SERVER)
+
+    preview_sock = None
+    if GO_PREVIEW_SERVER:
+        preview_sock = context.socket(zmq.PUSH)
+        preview_sock.setsockopt(zmq.SNDHWM, 2)
+        preview_sock.setsockopt(zmq.SNDTIMEO, 0)
+        preview_sock.setsockopt(zmq.LINGER, 0)
+        preview_sock.connect(GO_PREVIEW_SERVER)
+
     if not DEBUG:
+        # Imported here so record.py loads (and DEBUG runs) without picamera2.
+        from picamera2 import MappedArray, Picamera2
         picam2 = Picamera2()
         config = picam2.create_preview_configuration(
-            main={"size": (W, H), "format": "BGR888"},
+            main={"size": (W, H), "format": _enc.camera_format},
             controls={"FrameDurationLimits": (16666, 16666)},
         )
         picam2.configure(config)
@@ -105,201 +308,250 @@ if __name__ == "__main__":
         cap = cv2.VideoCapture(DEBUG_VIDEO)
         if not cap.isOpened():
             raise RuntimeError(f"Cannot open debug video: {DEBUG_VIDEO}")
-        print(f"Debug mode: reading from '{DEBUG_VIDEO}'")
+        print(f"Debug mode: reading from '{DEBUG_VIDEO}'"
+              + (f" at {DEBUG_FPS:g} fps" if DEBUG_FPS > 0 else ""))
 
-    _frame_q: queue.Queue = queue.Queue(maxsize=1)
     _stop_evt = threading.Event()
+    _abr  = BitrateController(W, H, JPEG_QUALITY)
+    _frames = _FrameRing(ENCODE_WORKERS + 2 + (PREVIEW_WORKERS + 1 if preview_sock else 0))
+    _pool = _EncodePool(ENCODE_WORKERS, lambda: _abr.settings, _enc, _frames.release)
+    # The preview stream encodes the same frames on its own workers, at a
+    # fixed low size and quality; the bitrate controller only steers the
+    # main stream.
+    _preview = None
+    if preview_sock is not None:
+        _preview = _EncodePool(PREVIEW_WORKERS, lambda: (PREVIEW_QUALITY, PREVIEW_W, PREVIEW_H),
+                               _enc, _frames.release)
+        print(f"Preview: q{PREVIEW_QUALITY} {PREVIEW_W}x{PREVIEW_H} to {GO_PREVIEW_SERVER}"
+              f"  encoders: {PREVIEW_WORKERS}", flush=True)
+    _pv_rates = {"fps": 0.0, "kbps": 0.0, "enc_cpu": 0.0}   # last preview log period
+    _ring = PacketRing(version=HEADER_VERSION)
+    _rec  = FlightRecorder(FLIGHT_LOG_DIR) if FLIGHT_LOG_DIR else None
+    _gate = SceneGate() if SCENE_SKIP else None
+
+    def _offer(frame, slot: int, cap_ns: int) -> None:
+        action = _gate.check(_enc.luma(frame), cap_ns * 1e-9) if _gate is not None else SEND
+        wall_ns = time.time_ns()
+        if action == SEND:
+            if _preview is not None:
+                _frames.retain(slot)
+                _preview.submit(frame, cap_ns, wall_ns, slot)
+            _pool.submit(frame, cap_ns, wall_ns, slot)
+            return
+        _frames.release(slot)
+        if action == KEEPALIVE:
+            if _preview is not None:
+                _preview.submit(None, cap_ns, wall_ns)
+            _pool.submit(None, cap_ns, wall_ns)
 
     def _capture_loop():
+        # Frames are copied straight into ring buffers; nothing is
+        # allocated per frame.
         if not DEBUG:
             while not _stop_evt.is_set():
-                frame = picam2.capture_array()
-                if _frame_q.full():
-                    try:
-                        _frame_q.get_nowait()
-                    except queue.Empty:
-                        pass
-                _frame_q.put(frame)
+                with picam2.captured_request() as req:
+                    cap_ns = time.monotonic_ns()
+                    with MappedArray(req, "main") as m:
+                        slot, buf = _frames.acquire(m.array.shape)
+                        if buf is None:
+                            continue
+                        np.copyto(buf, m.array)
+                _offer(_enc.from_camera(buf), slot, cap_ns)
         else:
+            raw = None
+            bgr = np.empty((H, W, 3), np.uint8)
+            # Like the camera, a late read skips frames rather than catching up.
+            ticker = Ticker(DEBUG_FPS, spin_s=0.0) if DEBUG_FPS > 0 else None
             while not _stop_evt.is_set():
-                ret, raw = cap.read()
+                if ticker is not None:
+                    ticker.wait()
+                ret, raw = cap.read(raw)
                 if not ret:
                     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ret, raw = cap.read()
-                raw = cv2.resize(raw, (W, H))
-                if _frame_q.full():
-                    try:
-                        _frame_q.get_nowait()
-                    except queue.Empty:
-                        pass
-                _frame_q.put(raw)
-
-    def _imu_loop():
-        # Complementary filter coefficient: 0.98 = trust gyro 98 %, acc 2 %.
-        # Acc corrects long-term tilt drift; gyro handles fast motion.
-        ALPHA = 0.98
-        G = 9.80665
-        t_last = 0.0
-        print("[imu] thread started", flush=True)
-        while not _stop_evt.is_set():
+                    ret, raw = cap.read(raw)
+                cap_ns = time.monotonic_ns()
+                slot, buf = _frames.acquire(_enc.raw_shape)
+                if buf is None:
+                    continue
+                # The cv2 backend's buffer is BGR itself; others convert from bgr.
+                dst = buf if buf.ndim == 3 else bgr
+                cv2.resize(raw, (W, H), dst=dst)
+                _offer(_enc.from_bgr(dst, buf), slot, cap_ns)
+
+    def _pack(ring: PacketRing, f, encoded):
+        jpeg_buf, out_w, out_h, _, marks = encoded
+        return ring.pack(jpeg_buf, out_w, out_h,
+                         (f.pos_x, f.pos_y, f.pos_z), (f.vel_x, f.vel_y, f.vel_z),
+                         (f.acc_x, f.acc_y, f.acc_z), (f.gyr_x, f.gyr_y, f.gyr_z),
+                         f.rot_x, f.rot_y, f.rot_z, float(f.gps_fix),
+                         trace=marks if LATENCY_TRACE and jpeg_buf.size else None)
+
+    def _enc_cpu(stats: list[tuple[int, float]], elapsed: float) -> float:
+        """Encode time of a pool's worker_stats() as % of one core."""
+        return sum(n * ms for n, ms in stats) / (elapsed * 10.0)
+
+    def _preview_loop():
+        # Same packets as the main stream, from its own pool and ring; the
+        # uplink decides what a slow client sees, so there is no ABR here.
+        ring = PacketRing(version=HEADER_VERSION)
+        log_bytes, log_frames, log_time = 0, 0, time.time()
+        while True:
+            encoded = _preview.get()
+            if encoded is None:
+                return
+            pkt = _pack(ring, read_fused(), encoded)
+            if pkt is None:
+                continue
             try:
-                rec = read_gyro_records()[0]
-                ax, ay, az = rec.acceleration
-                gx, gy, gz = rec.gyro
-                now = time.time()
-                dt  = now - t_last if t_last > 0.0 else 0.0
-                t_last = now
-
-                with _lock:
-                    _S.acc[:] = [ax, ay, az]
-                    _S.gyr[:] = [gx, gy, gz]
-
-                    if 0.0 < dt < 0.1:
-                        # --- Orientation (complementary filter) ---
-                        mag = math.sqrt(ax*ax + ay*ay + az*az)
-                        if 0.5 * G < mag < 2.0 * G:
-                            acc_pitch = math.atan2(-ax, math.sqrt(ay*ay + az*az))
-                            acc_roll  = math.atan2(ay, az)
-                            _S.pitch = ALPHA * (_S.pitch + gy * dt) + (1.0 - ALPHA) * acc_pitch
-                            _S.roll  = ALPHA * (_S.roll  + gx * dt) + (1.0 - ALPHA) * acc_roll
-                        else:
-                            _S.pitch += gy * dt
-                            _S.roll  += gx * dt
-                        _S.yaw += gz * dt
-
-                        # --- Dead-reckoning (always runs; GPS anchor resets pos/vel) ---
-                        cp = math.cos(_S.pitch); sp = math.sin(_S.pitch)
-                        cr = math.cos(_S.roll);  sr = math.sin(_S.roll)
-                        cy = math.cos(_S.yaw);   sy = math.sin(_S.yaw)
-
-                        # Remove gravity from body-frame acceleration.
-                        lax = ax - (-G * sp)
-                        lay = ay - ( G * cp * sr)
-                        laz = az - ( G * cp * cr)
-
-                        # Rotate to world frame: R = Rz(yaw)*Ry(pitch)*Rx(roll)
-                        wx = cy*cp*lax + (cy*sp*sr - sy*cr)*lay + (cy*sp*cr + sy*sr)*laz
-                        wy = sy*cp*lax + (sy*sp*sr + cy*cr)*lay + (sy*sp*cr - cy*sr)*laz
-                        wz =   -sp*lax +        cp*sr*lay       +        cp*cr*laz
-
-                        _S.vel[0] += wx * dt
-                        _S.vel[1] += wy * dt
-                        _S.vel[2] += wz * dt
-
-                        # ZUPT: if stationary, zero velocity to stop bias drift.
-                        gyr_mag = math.sqrt(gx*gx + gy*gy + gz*gz)
-                        if abs(mag - G) < ZUPT_ACC_THRESH and gyr_mag < ZUPT_GYR_THRESH:
-                            _S.vel[:] = [0.0, 0.0, 0.0]
-
-                        _S.pos[0] += _S.vel[0] * dt
-                        _S.pos[1] += _S.vel[1] * dt
-                        _S.pos[2] += _S.vel[2] * dt
-            except Exception:
+                ring.send(preview_sock, pkt)
+            except zmq.Again:
                 pass
-
-    def _gps_loop():
-        print("[gps] thread started", flush=True)
-        reader: GPSReader | None = None
-        while not _stop_evt.is_set():
-            try:
-                if reader is None:
-                    reader = GPSReader()
-                rec = reader.read_one()
-                if rec is not None and rec.fix_quality and rec.fix_quality > 0:
-                    # Store the fix for the main loop to consume every 60 frames.
-                    with _lock:
-                        _S.gps_pending = {
-                            'lat': rec.latitude   or 0.0,
-                            'lon': rec.longitude  or 0.0,
-                            'alt': rec.altitude_m or 0.0,
-                            'spd': rec.speed_knots or 0.0,
-                            'crs': rec.course_deg  or 0.0,
-                            'fix': float(rec.fix_quality),
-                        }
-                elif rec is None:
-                    reader.close()
-                    reader = None
-            except Exception:
-                if reader is not None:
-                    reader.close()
-                    reader = None
-        if reader is not None:
-            reader.close()
+            now = time.time()
+            log_bytes  += encoded[0].size
+            log_frames += encoded[0].size > 0
+            if now - log_time >= 1.0:
+                elapsed = now - log_time
+                stats = _preview.worker_stats()
+                _pv_rates.update(fps=log_frames / elapsed, kbps=log_bytes / elapsed / 1024,
+                                 enc_cpu=_enc_cpu(stats, elapsed))
+                enc = " ".join(f"{ms:.1f}ms/{n}" for n, ms in stats)
+                print(f"[pv]  {_pv_rates['kbps']:.1f} KB/s  {_pv_rates['fps']:.1f} fps"
+                      f"  q{PREVIEW_QUALITY} {PREVIEW_W}x{PREVIEW_H}"
+                      f"  enc=[{enc}] {_pv_rates['enc_cpu']:.0f}%"
+                      f"  drop={_preview.dropped_in}/{_preview.dropped_out}", flush=True)
+                log_bytes, log_frames, log_time = 0, 0, now
+
+    def _send_meta(f, fps: float, kbps: float, enc_cpu: float) -> None:
+        """Slow-changing status as one metadata message; dropped if the
+        relay is not keeping up."""
+        quality, out_w, out_h = _abr.settings
+        values = {
+            "gps_fix":  f.gps_fix,
+            "sats":     f.gps_sats,
+            "hdop":     f.gps_hdop,
+            "imu_temp": f.imu_temp,
+            "quality":  quality,
+            "width":    out_w,
+            "height":   out_h,
+            "encoder":  ENCODERS.index(_enc.name),
+            "hdr_ver":  HEADER_VERSION,
+            "fps":      fps,
+            "kbps":     kbps,
+            "enc_cpu":  enc_cpu,
+            "drop_in":  _pool.dropped_in,
+            "drop_out": _pool.dropped_out,
+        }
+        if _preview is not None:
+            values.update(pv_fps=_pv_rates["fps"], pv_kbps=_pv_rates["kbps"],
+                          pv_cpu=_pv_rates["enc_cpu"])
+        if _gate is not None:
+            values["static"] = _gate.skipped + _gate.keepalives
+        if _rec is not None:
+            values["rec_drop"] = _rec.dropped
+        if HEADER_VERSION > 1:
+            # Not in the slim header; a snapshot is still useful for diagnostics.
+            values.update(acc_x=f.acc_x, acc_y=f.acc_y, acc_z=f.acc_z,
+                          gyr_x=f.gyr_x, gyr_y=f.gyr_y, gyr_z=f.gyr_z)
+        try:
+            meta_sock.send(pack_meta(values), zmq.NOBLOCK)
+        except zmq.Again:
+            pass
 
     cap_thread = threading.Thread(target=_capture_loop, daemon=True)
-    imu_thread = threading.Thread(target=_imu_loop,     daemon=True)
-    gps_thread = threading.Thread(target=_gps_loop,     daemon=True)
     cap_thread.start()
-    imu_thread.start()
-    gps_thread.start()
+    pv_thread = None
+    if _preview is not None:
+        pv_thread = threading.Thread(target=_preview_loop, daemon=True)
+        pv_thread.start()
+    sensor_threads = [] if SENSOR_PROCESS else sensors.start(_stop_evt, sim=SIM_SENSORS)
+    _gimbal = sensors.start_gimbal(SIM_SENSORS) if GIMBAL_STABILIZE and not SENSOR_PROCESS else None
 
     log_bytes   = 0
     log_frames  = 0
     log_time    = time.time()
-    frame_count = 0
+    meta_time   = 0.0
+    fps = kbps = enc_cpu = 0.0
 
     try:
         while True:
-            frame = _frame_q.get()
+            encoded = _pool.get()
+            if encoded is None:
+                break
+            jpeg_buf, out_w, out_h, enc_s, marks = encoded
+            keepalive = jpeg_buf.size == 0
 
-            ok, jpeg_buf = cv2.imencode('.jpg', frame, _JPEG_PARAMS)
-            if not ok:
-                continue
-            jpeg_bytes = jpeg_buf.tobytes()
-
-            frame_count += 1
-
-            with _lock:
-                # Every GPS_ANCHOR_INTERVAL frames: anchor pos/vel from GPS if a fix is pending.
-                if frame_count % GPS_ANCHOR_INTERVAL == 0 and _S.gps_pending is not None:
-                    g = _S.gps_pending
-                    _S.pos[:] = [g['lat'], g['lon'], g['alt']]
-                    # Convert GPS speed (knots) + course (degrees clockwise from North)
-                    # to world-frame velocity (East, North, Up) in m/s.
-                    speed_ms   = g['spd'] * 0.514444
-                    course_rad = math.radians(g['crs'])
-                    _S.vel[:] = [
-                        speed_ms * math.sin(course_rad),
-                        speed_ms * math.cos(course_rad),
-                        0.0,
-                    ]
-                    _S.gps_fix = g['fix']
-                    _S.gps_pending = None
-                    print(f"[gps] anchor  lat={g['lat']:.5f}  lon={g['lon']:.5f}"
-                          f"  alt={g['alt']:.1f}m  fix={int(g['fix'])}", flush=True)
-
-                pkt = _pack(jpeg_bytes, _S.pos, _S.vel, _S.acc, _S.gyr,
-                            _S.pitch, _S.roll, _S.yaw, _S.gps_fix)
+            f = read_fused()
+            pkt = _pack(_ring, f, encoded)
 
+            if pkt is None:
+                continue
             try:
-                sock.send(pkt, copy=False)
+                _ring.send(sock, pkt)
+                ok = True
             except zmq.Again:
-                pass
+                ok = False
+            if not keepalive:
+                # Keepalives say nothing about encoder or uplink capacity.
+                _abr.record_send(ok, jpeg_buf.size, enc_s)
+            if _rec is not None:
+                # Recorded whether or not the uplink took it.
+                _rec.append(pkt, marks[1])
+            if ABR:
+                _abr.update(ENCODE_WORKERS)
 
             now = time.time()
-            log_bytes  += len(jpeg_bytes)
-            log_frames += 1
+            log_bytes  += jpeg_buf.size
+            log_frames += not keepalive
             if now - log_time >= 1.0:
                 elapsed = now - log_time
-                gfix = "fix" if _S.gps_fix > 0 else "none"
+                kbps = log_bytes / elapsed / 1024
+                fps  = log_frames / elapsed
+                gfix = "fix" if f.gps_fix > 0 else "none"
+                stats = _pool.worker_stats()
+                enc_cpu = _enc_cpu(stats, elapsed)
+                enc = " ".join(f"{ms:.1f}ms/{n}" for n, ms in stats)
                 print(
-                    f"[py]  {log_bytes / elapsed / 1024:.1f} KB/s"
-                    f"  {log_frames / elapsed:.1f} fps"
-                    f"  gps={gfix}",
+                    f"[py]  {kbps:.1f} KB/s"
+                    f"  {fps:.1f} fps"
+                    f"  q{_abr.settings[0]} {_abr.settings[1]}x{_abr.settings[2]}"
+                    f"  gps={gfix}"
+                    f"  enc=[{enc}] {enc_cpu:.0f}%"
+                    f"  drop={_pool.dropped_in}/{_pool.dropped_out}"
+                    + (f"  static={_gate.skipped + _gate.keepalives}/{_gate.frames}"
+                       if _gate is not None else "")
+                    + (f"  rec_drop={_rec.dropped}" if _rec is not None else ""),
                     flush=True,
                 )
                 log_bytes  = 0
                 log_frames = 0
                 log_time   = now
+            if meta_sock is not None and now - meta_time >= META_INTERVAL_S:
+                _send_meta(f, fps, kbps, enc_cpu)
+                meta_time = now
 
     except KeyboardInterrupt:
         pass
     finally:
         _stop_evt.set()
         cap_thread.join(timeout=2)
-        imu_thread.join(timeout=1)
-        gps_thread.join(timeout=2)
+        _pool.stop()
+        if _preview is not None:
+            _preview.stop()
+            pv_thread.join(timeout=2)
+        if _rec is not None:
+            _rec.close()
+        sensors.stop_gimbal(_gimbal)
+        for t in sensor_threads:
+            t.join(timeout=2)
+        if SENSOR_PROCESS:
+            _sensor_stop.set()
+            _sensor_proc.join(timeout=3)
+            _shared.close()
         if not DEBUG:
             picam2.stop()
         sock.close()
+        if meta_sock is not None:
+            meta_sock.close()
+        if preview_sock is not None:
+            preview_sock.close()
         context.term()
@@ -0,0 +1,95 @@
+# cython: boundscheck=False
+# cython: wraparound=False
+# cython: cdivision=True
+
+# Change detection for scenegate.SceneGate: a frame is reduced to a small
+# grid of tile mean lumas (its signature) and compared with the signature
+# of the last frame that was sent.
+
+ctypedef unsigned char u8
+
+
+def signature(const u8[:, :, :] img, u8[:, ::1] out, int step=2):
+    """
+    Mean luma ((B + 2G + R) / 4) of each tile of a BGR frame into out. The
+    tile size is the frame size divided by out's shape (edge pixels that do
+    not fill a tile are ignored); every step-th row and column is sampled.
+    img may have padded rows (camera strides).
+    """
+    cdef Py_ssize_t h = img.shape[0], w = img.shape[1]
+    cdef Py_ssize_t th = out.shape[0], tw = out.shape[1]
+    if img.shape[2] < 3:
+        raise ValueError("expected a BGR frame")
+    if th == 0 or tw == 0 or th > h or tw > w:
+        raise ValueError(f"signature shape {th}x{tw} does not fit a {h}x{w} frame")
+    if step < 1:
+        raise ValueError("step must be >= 1")
+
+    cdef Py_ssize_t ph = h // th, pw = w // tw
+    cdef Py_ssize_t rows = (ph + step - 1) // step, cols = (pw + step - 1) // step
+    cdef Py_ssize_t n = rows * cols
+    cdef Py_ssize_t ty, tx, i, j, y, x
+    cdef unsigned int acc
+    with nogil:
+        for ty in range(th):
+            for tx in range(tw):
+                acc = 0
+                for i in range(rows):
+                    y = ty * ph + i * step
+                    for j in range(cols):
+                        x = tx * pw + j * step
+                        acc += img[y, x, 0] + 2 * img[y, x, 1] + img[y, x, 2]
+                out[ty, tx] = <u8>((acc + 2 * n) // (4 * n))
+
+
+def signature_luma(const u8[:, :] y, u8[:, ::1] out, int step=2):
+    """
+    signature() for a luma plane (the Y of a YUV420 capture).
+    """
+    cdef Py_ssize_t h = y.shape[0], w = y.shape[1]
+    cdef Py_ssize_t th = out.shape[0], tw = out.shape[1]
+    if th == 0 or tw == 0 or th > h or tw > w:
+        raise ValueError(f"signature shape {th}x{tw} does not fit a {h}x{w} plane")
+    if step < 1:
+        raise ValueError("step must be >= 1")
+
+    cdef Py_ssize_t ph = h // th, pw = w // tw
+    cdef Py_ssize_t rows = (ph + step - 1) // step, cols = (pw + step - 1) // step
+    cdef Py_ssize_t n = rows * cols
+    cdef Py_ssize_t ty, tx, i, j, r
+    cdef unsigned int acc
+    with nogil:
+        for ty in range(th):
+            for tx in range(tw):
+                acc = 0
+                for i in range(rows):
+                    r = ty * ph + i * step
+                    for j in range(cols):
+                        acc += y[r, tx * pw + j * step]
+                out[ty, tx] = <u8>((acc + n // 2) // n)
+
+
+def tile_diff(const u8[:, ::1] a, const u8[:, ::1] b, int threshold, u8[:, ::1] mask=None):
+    """
+    Number of tiles whose signatures differ by more than threshold. mask,
+    if given, is set to 1 for those tiles and 0 elsewhere.
+    """
+    cdef Py_ssize_t th = a.shape[0], tw = a.shape[1]
+    if b.shape[0] != th or b.shape[1] != tw:
+        raise ValueError("signatures differ in shape")
+    if mask is not None and (mask.shape[0] != th or mask.shape[1] != tw):
+        raise ValueError("mask differs in shape")
+
+    cdef Py_ssize_t y, x, changed = 0
+    cdef int d
+    cdef bint hit
+    cdef bint write = mask is not None
+    with nogil:
+        for y in range(th):
+            for x in range(tw):
+                d = <int>a[y, x] - <int>b[y, x]
+                hit = d > threshold or -d > threshold
+                changed += hit
+                if write:
+                    mask[y, x] = hit
+    return changed
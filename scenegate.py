@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+
+try:
+    from scene import signature, signature_luma, tile_diff
+except ImportError:
+    # Not built (python setup.py build_ext --inplace): same results from
+    # NumPy, several times slower per frame.
+    signature = signature_luma = tile_diff = None
+
+# Static-scene frame skipping for the video sender.
+#
+# Each captured frame is reduced to a grid of TILE x TILE tile mean lumas
+# and compared with the grid of the last frame that was actually encoded.
+# While no more than STATIC_FRAC of the tiles moved by more than TILE_DIFF
+# levels the frame is not encoded; instead a telemetry-only keepalive
+# (jpeg_size 0) goes out every KEEPALIVE_S, and a full frame at least every
+# REFRESH_S. Comparing with the last sent frame, not the previous capture,
+# means slow drift (light, clouds) still adds up to a send.
+
+TILE         = 16      # pixels per signature tile side
+SAMPLE_STEP  = 2       # every 2nd row/column inside a tile
+TILE_DIFF    = 6       # mean-luma change that marks a tile as changed
+STATIC_FRAC  = 0.002   # changed-tile share still counted as static
+KEEPALIVE_S  = 0.1     # telemetry rate while static
+REFRESH_S    = 2.0     # full frame at least this often
+
+SEND      = 0
+KEEPALIVE = 1
+SKIP      = 2
+
+
+def _signature_np(img: np.ndarray, out: np.ndarray, step: int) -> None:
+    th, tw = out.shape
+    ph, pw = img.shape[0] // th, img.shape[1] // tw
+    if img.ndim == 2:
+        tiles = img[:th * ph, :tw * pw].reshape(th, ph, tw, pw)[:, ::step, :, ::step]
+        n = tiles.shape[1] * tiles.shape[3]
+        out[:] = (tiles.sum(axis=(1, 3), dtype=np.uint32) + n // 2) // n
+        return
+    tiles = img[:th * ph, :tw * pw, :3].reshape(th, ph, tw, pw, 3)[:, ::step, :, ::step]
+    s = tiles.astype(np.uint32)
+    sums = (s[..., 0] + 2 * s[..., 1] + s[..., 2]).sum(axis=(1, 3))
+    n = tiles.shape[1] * tiles.shape[3]
+    out[:] = (sums + 2 * n) // (4 * n)
+
+
+def _tile_diff_np(a: np.ndarray, b: np.ndarray, threshold: int, mask=None) -> int:
+    hit = np.abs(a.astype(np.int16) - b) > threshold
+    if mask is not None:
+        mask[:] = hit
+    return int(hit.sum())
+
+
+class SceneGate:
+    """Decides per captured frame whether to SEND, send a KEEPALIVE or
+    SKIP. Frames are BGR or a luma plane (encoder.Yuv420Encoder.luma).
+    Called from the capture thread only."""
+
+    def __init__(self, tile: int = TILE, threshold: int = TILE_DIFF,
+                 static_frac: float = STATIC_FRAC, keepalive_s: float = KEEPALIVE_S,
+                 refresh_s: float = REFRESH_S) -> None:
+        self.tile        = tile
+        self.threshold   = threshold
+        self.static_frac = static_frac
+        self.keepalive_s = keepalive_s
+        self.refresh_s   = refresh_s
+        self._sig: np.ndarray | None = None
+        self._ref: np.ndarray | None = None
+        self._t_send      = float("-inf")
+        self._t_keepalive = float("-inf")
+        self.changed     = 0     # changed tiles in the last checked frame
+        self.frames      = 0
+        self.sent        = 0
+        self.keepalives  = 0
+        self.skipped     = 0
+
+    def _grid(self, shape: tuple[int, ...]) -> tuple[int, int]:
+        return max(1, shape[0] // self.tile), max(1, shape[1] // self.tile)
+
+    def _reset(self, shape: tuple[int, ...]) -> None:
+        grid = self._grid(shape)
+        self._sig = np.zeros(grid, np.uint8)
+        self._ref = None
+        self._max_changed = int(grid[0] * grid[1] * self.static_frac)
+
+    def check(self, frame: np.ndarray, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        if self._sig is None or self._sig.shape != self._grid(frame.shape):
+            self._reset(frame.shape)
+        kernel = signature if frame.ndim == 3 else signature_luma
+        if kernel is not None:
+            kernel(frame, self._sig, SAMPLE_STEP)
+        else:
+            _signature_np(frame, self._sig, SAMPLE_STEP)
+
+        if self._ref is None or now - self._t_send >= self.refresh_s:
+            static = False
+        else:
+            diff = tile_diff if tile_diff is not None else _tile_diff_np
+            self.changed = diff(self._sig, self._ref, self.threshold)
+            static = self.changed <= self._max_changed
+
+        if not static:
+            # The new signature becomes the reference; reuse the old buffer.
+            if self._ref is None:
+                self._ref = np.empty_like(self._sig)
+            self._sig, self._ref = self._ref, self._sig
+            self._t_send = self._t_keepalive = now
+            self.sent += 1
+            return SEND
+        if now - self._t_keepalive >= self.keepalive_s:
+            self._t_keepalive = now
+            self.keepalives += 1
+            return KEEPALIVE
+        self.skipped += 1
+        return SKIP
@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+
+import datafussion
+from gimbal import Gimbal
+from gps import GPSReader, NmeaEmitter
+from gyro import ImuFifo, SimImu
+from servo import FakeSMBus, ServoDriver
+
+# IMU read + fusion + GPS anchoring, runnable as threads inside record.py or
+# as a separate process that publishes FusedState through
+# datafussion.SharedFused. In the process case the video side never touches
+# the sensor GIL or any lock: it reads the latest snapshot from shared memory.
+#
+# sim swaps every device for its stand-in: gyro.SimImu for the MPU-6050,
+# gps.NmeaEmitter on a pty for the LC76G UART, servo.FakeSMBus for the
+# PCA9685. Nothing else changes, so the whole sensor path runs off the Pi.
+
+IMU_RATE_HZ  = 1000     # MPU-6050 FIFO sample rate
+IMU_POLL_S   = 0.02     # FIFO drain interval; the FIFO holds ~85 ms at 1 kHz
+GPS_RATE_HZ  = 10       # LC76G fix rate (GGA+RMC only); None keeps the receiver's setting
+GPS_ANCHOR_S = 1.0      # minimum seconds between GPS anchors
+
+
+def imu_loop(stop: threading.Event, on_update=None, sim: bool = False) -> None:
+    """Drain the IMU FIFO into datafussion until stop is set. on_update()
+    runs after every non-empty batch; it is the only publisher, so GPS
+    anchors reach shared memory with the next batch (<= IMU_POLL_S)."""
+    fifo: ImuFifo | None = None
+    print("[imu] thread started", flush=True)
+    while not stop.is_set():
+        try:
+            if fifo is None:
+                fifo = SimImu(rate_hz=IMU_RATE_HZ) if sim else ImuFifo(rate_hz=IMU_RATE_HZ)
+                print(f"[imu] FIFO at {fifo.rate_hz:.0f} Hz" + (" (simulated)" if sim else ""),
+                      flush=True)
+            batch = fifo.read_batch()
+            if batch.overflowed:
+                print(f"[imu] FIFO overflow ({fifo.overflows})", flush=True)
+            if len(batch):
+                datafussion.update_imu_batch(batch.timestamp, batch.acceleration, batch.gyro,
+                                             batch.temperature)
+                if on_update is not None:
+                    on_update()
+            time.sleep(IMU_POLL_S)
+        except Exception:
+            if fifo is not None:
+                fifo.close()
+                fifo = None
+            time.sleep(IMU_POLL_S)
+    if fifo is not None:
+        fifo.close()
+
+
+def gps_loop(stop: threading.Event, sim: bool = False) -> None:
+    """Read fixes and anchor datafussion at most every GPS_ANCHOR_S."""
+    print("[gps] thread started", flush=True)
+    emitter = NmeaEmitter(rate_hz=GPS_RATE_HZ or 1) if sim else None
+    reader: GPSReader | None = None
+    t_anchor = 0.0
+    while not stop.is_set():
+        try:
+            if reader is None:
+                if emitter is not None:
+                    reader = GPSReader(port=emitter.port, rate_hz=GPS_RATE_HZ)
+                else:
+                    reader = GPSReader(rate_hz=GPS_RATE_HZ)
+            rec = reader.read_one()
+            if rec is None:
+                reader.close()
+                reader = None
+                continue
+            datafussion.update_gnss_quality(rec.satellites_used, rec.hdop)
+            now = time.monotonic()
+            if not rec.fix_quality or now - t_anchor < GPS_ANCHOR_S:
+                continue
+            t_anchor = now
+            lat, lon, alt = rec.latitude or 0.0, rec.longitude or 0.0, rec.altitude_m or 0.0
+            # Speed (knots) + course (degrees clockwise from North) to
+            # world-frame velocity (East, North, Up) in m/s.
+            speed_ms   = (rec.speed_knots or 0.0) * 0.514444
+            course_rad = math.radians(rec.course_deg or 0.0)
+            datafussion.anchor(
+                (lat, lon, alt),
+                (speed_ms * math.sin(course_rad), speed_ms * math.cos(course_rad), 0.0),
+                rec.fix_quality,
+            )
+            print(f"[gps] anchor  lat={lat:.5f}  lon={lon:.5f}"
+                  f"  alt={alt:.1f}m  fix={rec.fix_quality}", flush=True)
+        except Exception:
+            if reader is not None:
+                reader.close()
+                reader = None
+    if reader is not None:
+        reader.close()
+    if emitter is not None:
+        emitter.close()
+
+
+def start(stop: threading.Event, on_update=None, sim: bool = False) -> list[threading.Thread]:
+    """Run imu_loop and gps_loop on daemon threads."""
+    threads = [
+        threading.Thread(target=imu_loop, args=(stop, on_update, sim), daemon=True),
+        threading.Thread(target=gps_loop, args=(stop, sim), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def start_gimbal(sim: bool = False) -> Gimbal | None:
+    """Stabilize the camera from this process's fused state; None if the
+    PCA9685 cannot be opened."""
+    try:
+        driver = ServoDriver(smbus=FakeSMBus() if sim else None)
+    except (OSError, ImportError) as e:
+        print(f"[gimbal] servo driver unavailable: {e}", flush=True)
+        return None
+    return Gimbal(driver).start()
+
+
+def stop_gimbal(gimbal: Gimbal | None) -> None:
+    if gimbal is not None:
+        gimbal.stop()
+        gimbal.driver.close()
+
+
+def run_process(shm_name: str, stop, gimbal: bool = False, sim: bool = False) -> None:
+    """multiprocessing target: sensor loops publishing to the SharedFused
+    segment shm_name (created by the parent) until stop is set. With gimbal
+    the stabilization loop runs here too, next to the fusion state and away
+    from the video process's GIL."""
+    shared = datafussion.SharedFused(shm_name)
+    threads = start(stop, lambda: shared.publish(datafussion.get_fused()), sim)
+    stab = start_gimbal(sim) if gimbal else None
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        stop_gimbal(stab)
+        for t in threads:
+            t.join(timeout=2)
+        shared.close()
@@ -9,45 +9,79 @@ import (
 )
 
 const (
-	pullAddr = "tcp://*:5555"
-	pubAddr  = "tcp://*:5556"
+	pullAddr     = "tcp://*:5555"
+	pubAddr      = "tcp://*:5556"
+	metaPullAddr = "tcp://*:5557"
+	metaPubAddr  = "tcp://*:5558"
+	// Low-resolution simulcast of the video stream, same packet format.
+	previewPullAddr = "tcp://*:5559"
+	previewPubAddr  = "tcp://*:5560"
 )
 
-func main() {
-	pull, err := zmq.NewSocket(zmq.PULL)
+// bindLatest creates a socket of type t that keeps only the latest message
+// queued (CONFLATE, HWM 1) and binds it to addr.
+func bindLatest(t zmq.Type, addr string) *zmq.Socket {
+	sock, err := zmq.NewSocket(t)
 	if err != nil {
-		log.Fatalf("Failed to create PULL socket: %v", err)
-	}
-	defer pull.Close()
-	// Keep only the latest frame in the receive buffer; drop older ones.
-	if err := pull.SetConflate(true); err != nil {
-		log.Fatalf("Failed to set CONFLATE on PULL socket: %v", err)
+		log.Fatalf("Failed to create %v socket: %v", t, err)
 	}
-	if err := pull.SetRcvhwm(1); err != nil {
-		log.Fatalf("Failed to set RCVHWM on PULL socket: %v", err)
+	if err := sock.SetConflate(true); err != nil {
+		log.Fatalf("Failed to set CONFLATE on %v socket: %v", t, err)
 	}
-	if err := pull.Bind(pullAddr); err != nil {
-		log.Fatalf("Failed to bind PULL socket: %v", err)
+	if t == zmq.PUB {
+		err = sock.SetSndhwm(1)
+	} else {
+		err = sock.SetRcvhwm(1)
 	}
-
-	pub, err := zmq.NewSocket(zmq.PUB)
 	if err != nil {
-		log.Fatalf("Failed to create PUB socket: %v", err)
-	}
-	defer pub.Close()
-	// Only keep the latest frame queued for each subscriber.
-	if err := pub.SetConflate(true); err != nil {
-		log.Fatalf("Failed to set CONFLATE on PUB socket: %v", err)
+		log.Fatalf("Failed to set HWM on %v socket: %v", t, err)
 	}
-	if err := pub.SetSndhwm(1); err != nil {
-		log.Fatalf("Failed to set SNDHWM on PUB socket: %v", err)
+	if err := sock.Bind(addr); err != nil {
+		log.Fatalf("Failed to bind %v socket to %s: %v", t, addr, err)
 	}
-	if err := pub.Bind(pubAddr); err != nil {
-		log.Fatalf("Failed to bind PUB socket: %v", err)
+	return sock
+}
+
+// relay forwards every message from pull to pub on its own goroutine, so
+// the video path never waits on it. Metadata messages are full snapshots
+// and preview packets are whole frames: only the latest of either matters.
+func relay(name string, pull, pub *zmq.Socket) {
+	for {
+		data, err := pull.RecvBytes(0)
+		if err != nil {
+			log.Printf("%s recv error: %v", name, err)
+			continue
+		}
+		if _, err := pub.SendBytes(data, 0); err != nil {
+			log.Printf("%s pub send error: %v", name, err)
+		}
 	}
+}
+
+func main() {
+	// Keep only the latest frame in the receive buffer and queued for each
+	// subscriber; drop older ones.
+	pull := bindLatest(zmq.PULL, pullAddr)
+	defer pull.Close()
+	pub := bindLatest(zmq.PUB, pubAddr)
+	defer pub.Close()
+
+	metaPull := bindLatest(zmq.PULL, metaPullAddr)
+	defer metaPull.Close()
+	metaPub := bindLatest(zmq.PUB, metaPubAddr)
+	defer metaPub.Close()
+	go relay("Meta", metaPull, metaPub)
+
+	previewPull := bindLatest(zmq.PULL, previewPullAddr)
+	defer previewPull.Close()
+	previewPub := bindLatest(zmq.PUB, previewPubAddr)
+	defer previewPub.Close()
+	go relay("Preview", previewPull, previewPub)
 
 	fmt.Printf("flycam server running\n")
 	fmt.Printf("  video PULL %s  PUB %s\n", pullAddr, pubAddr)
+	fmt.Printf("  meta  PULL %s  PUB %s\n", metaPullAddr, metaPubAddr)
+	fmt.Printf("  preview PULL %s  PUB %s\n", previewPullAddr, previewPubAddr)
 
 	var totalBytes int64
 	var frameCount int64
@@ -1,11 +1,21 @@
 import time
 import math
-import smbus2
+import threading
+
+try:
+    import smbus2
+except ImportError:
+    # ServoDriver(smbus=FakeSMBus()) runs without it.
+    smbus2 = None
 
 # PCA9685 register map
 _MODE1        = 0x00
 _PRESCALE     = 0xFE
 _LED0_ON_L    = 0x06
+_MODE1_AI     = 0x20   # register auto-increment: block writes span channels
+_CHANNELS     = 16
+_BLOCK_MAX    = 32     # SMBus block write limit -> 8 channels of 4 registers
+_MERGE_GAP    = 1      # rewrite up to this many unchanged channels to join two runs
 
 # Servo pulse bounds in microseconds (standard SG90/MG996R)
 PULSE_MIN_US  = 500
@@ -14,11 +24,98 @@ ANGLE_MIN     = 0
 ANGLE_MAX     = 180
 
 
+class Ticker:
+    """Fixed-rate deadline scheduler. wait() sleeps until the next absolute
+    deadline, so a late tick does not push the following ones back, and
+    returns how late it woke (seconds). When a whole period or more has
+    already passed the missed deadlines are counted and skipped instead of
+    run back to back. The last spin_s before a deadline is busy-waited,
+    since sleep() wake-ups are only good to ~100 us."""
+
+    def __init__(self, rate_hz: float, spin_s: float = 0.0002) -> None:
+        self.period = 1.0 / rate_hz
+        self.spin_s = spin_s
+        self.ticks  = 0
+        self.missed = 0
+        self._next  = time.perf_counter() + self.period
+
+    def wait(self) -> float:
+        now = time.perf_counter()
+        if now - self._next >= self.period:
+            skip = int((now - self._next) / self.period)
+            self.missed += skip
+            self._next  += skip * self.period
+        delay = self._next - now - self.spin_s
+        if delay > 0:
+            time.sleep(delay)
+        while time.perf_counter() < self._next:
+            pass
+        late = time.perf_counter() - self._next
+        self._next += self.period
+        self.ticks += 1
+        return late
+
+
+class FakeSMBus:
+    """In-memory stand-in for smbus2.SMBus with PCA9685 register semantics
+    (auto-increment only when MODE1 AI is set). Counts transactions and
+    payload bytes so callers can compare bus cost."""
+
+    def __init__(self) -> None:
+        self.regs: dict[int, bytearray] = {}
+        self.transactions = 0
+        self.bytes        = 0
+
+    def _chip(self, address: int) -> bytearray:
+        return self.regs.setdefault(address, bytearray(256))
+
+    def write_byte_data(self, address: int, reg: int, value: int) -> None:
+        self.transactions += 1
+        self.bytes += 1
+        self._chip(address)[reg] = value & 0xFF
+
+    def read_byte_data(self, address: int, reg: int) -> int:
+        self.transactions += 1
+        self.bytes += 1
+        return self._chip(address)[reg]
+
+    def write_i2c_block_data(self, address: int, reg: int, data) -> None:
+        if len(data) > _BLOCK_MAX:
+            raise ValueError(f"block write of {len(data)} bytes (max {_BLOCK_MAX})")
+        self.transactions += 1
+        self.bytes += len(data)
+        chip = self._chip(address)
+        if chip[_MODE1] & _MODE1_AI:
+            chip[reg:reg + len(data)] = bytes(data)
+        elif data:
+            chip[reg] = data[-1]
+
+    def close(self) -> None:
+        pass
+
+
 class ServoDriver:
-    def __init__(self, address: int = 0x40, bus: int = 1, freq: int = 50):
-        self._bus     = smbus2.SMBus(bus)
-        self._address = address
-        self._write(_MODE1, 0x00)
+    """PCA9685 servo outputs.
+
+    Runs the chip in auto-increment mode so one block write updates up to
+    8 consecutive channels, and caches the OFF count last written to each
+    channel so unchanged outputs cost no bus traffic. smbus injects a bus
+    object (e.g. FakeSMBus) instead of opening /dev/i2c-<bus>. set_offs is
+    serialized, so the gimbal loop and a MotionScheduler can share one
+    driver on different channels."""
+
+    def __init__(self, address: int = 0x40, bus: int = 1, freq: int = 50, smbus=None):
+        if smbus is None:
+            if smbus2 is None:
+                raise ImportError("smbus2 not installed. Run: pip install smbus2")
+            smbus = smbus2.SMBus(bus)
+        self._bus       = smbus
+        self._address   = address
+        self._period_us = 1_000_000.0 / freq
+        self._off       = [-1] * _CHANNELS    # last OFF count per channel, -1 unknown
+        self.skipped    = 0                   # channel updates elided by the cache
+        self._lock      = threading.Lock()
+        self._write(_MODE1, _MODE1_AI)
         self._set_freq(freq)
 
     def _write(self, reg: int, value: int) -> None:
@@ -36,26 +133,72 @@ class ServoDriver:
         time.sleep(0.005)
         self._write(_MODE1, old_mode | 0x80)             # restart
 
-    def _set_pwm(self, channel: int, on: int, off: int) -> None:
-        base = _LED0_ON_L + 4 * channel
-        self._bus.write_byte_data(self._address, base,     on  & 0xFF)
-        self._bus.write_byte_data(self._address, base + 1, on  >> 8)
-        self._bus.write_byte_data(self._address, base + 2, off & 0xFF)
-        self._bus.write_byte_data(self._address, base + 3, off >> 8)
+    def _write_run(self, first: int, offs: list[int]) -> None:
+        """One block write of ON=0 / OFF=offs[k] for channels first.. ."""
+        data = []
+        for off in offs:
+            data += (0, 0, off & 0xFF, off >> 8)
+        self._bus.write_i2c_block_data(self._address, _LED0_ON_L + 4 * first, data)
+        self._off[first:first + len(offs)] = offs
+
+    def _pulse_to_off(self, pulse_us: float) -> int:
+        pulse_us = max(PULSE_MIN_US, min(PULSE_MAX_US, pulse_us))
+        return int(pulse_us * 4096 / self._period_us)
+
+    def set_offs(self, offs: dict[int, int]) -> int:
+        """Write OFF counts for many channels; only changed ones go on the
+        bus, grouped into runs of consecutive channels. Returns the number
+        of I2C transactions used."""
+        with self._lock:
+            target = list(self._off)
+            for ch, off in offs.items():
+                if not 0 <= ch < _CHANNELS:
+                    raise ValueError(f"channel must be 0-15, got {ch}")
+                target[ch] = off
+            changed = [ch for ch in sorted(offs) if target[ch] != self._off[ch]]
+            self.skipped += len(offs) - len(changed)
+
+            runs: list[list[int]] = []
+            for ch in changed:
+                if runs:
+                    run = runs[-1]
+                    gap = range(run[-1] + 1, ch)
+                    # Joining rewrites the (known) outputs in the gap unchanged.
+                    if (len(gap) <= _MERGE_GAP and ch - run[0] < _BLOCK_MAX // 4
+                            and all(target[g] >= 0 for g in gap)):
+                        run.extend(gap)
+                        run.append(ch)
+                        continue
+                runs.append([ch])
+            for run in runs:
+                self._write_run(run[0], [target[ch] for ch in run])
+        return len(runs)
+
+    def set_pulses(self, pulses: dict[int, float]) -> int:
+        """{channel: pulse width in microseconds (500-2500)} in as few
+        transactions as possible."""
+        return self.set_offs({ch: self._pulse_to_off(us) for ch, us in pulses.items()})
+
+    def set_angles(self, angles: dict[int, float]) -> int:
+        """{channel: angle in degrees (0-180)}, see set_pulses."""
+        return self.set_pulses({ch: self.angle_to_pulse(a) for ch, a in angles.items()})
+
+    @staticmethod
+    def angle_to_pulse(angle_deg: float) -> float:
+        angle_deg = max(ANGLE_MIN, min(ANGLE_MAX, angle_deg))
+        return PULSE_MIN_US + (PULSE_MAX_US - PULSE_MIN_US) * angle_deg / ANGLE_MAX
 
     def set_pulse(self, channel: int, pulse_us: float) -> None:
         """Drive channel to an explicit pulse width in microseconds (500-2500)."""
-        if not 0 <= channel <= 15:
-            raise ValueError(f"channel must be 0-15, got {channel}")
-        pulse_us = max(PULSE_MIN_US, min(PULSE_MAX_US, pulse_us))
-        off = int(pulse_us * 4096 / 20_000)   # 50 Hz -> 20 000 us period
-        self._set_pwm(channel, 0, off)
+        self.set_pulses({channel: pulse_us})
 
     def set_angle(self, channel: int, angle_deg: float) -> None:
         """Move servo on channel to angle_deg (0-180)."""
-        angle_deg = max(ANGLE_MIN, min(ANGLE_MAX, angle_deg))
-        pulse_us  = PULSE_MIN_US + (PULSE_MAX_US - PULSE_MIN_US) * angle_deg / ANGLE_MAX
-        self.set_pulse(channel, pulse_us)
+        self.set_pulses({channel: self.angle_to_pulse(angle_deg)})
+
+    def invalidate(self) -> None:
+        """Forget cached outputs, e.g. after the chip was reset externally."""
+        self._off = [-1] * _CHANNELS
 
     def close(self) -> None:
         self._bus.close()
@@ -2,16 +2,29 @@ from setuptools import setup, Extension
 from Cython.Build import cythonize
 import numpy as np
 
-ext = Extension(
-    "quant",
-    sources=["quant.pyx"],
-    include_dirs=[np.get_include()],
-    extra_compile_args=["-O3", "-march=native", "-ffast-math"],
-)
+exts = [
+    Extension(
+        "quant",
+        sources=["quant.pyx"],
+        include_dirs=[np.get_include()],
+        extra_compile_args=["-O3", "-march=native", "-ffast-math", "-fopenmp"],
+        extra_link_args=["-fopenmp"],
+    ),
+    Extension(
+        "fusion",
+        sources=["fusion.pyx"],
+        extra_compile_args=["-O3", "-march=native"],
+    ),
+    Extension(
+        "scene",
+        sources=["scene.pyx"],
+        extra_compile_args=["-O3", "-march=native"],
+    ),
+]
 
 setup(
     ext_modules=cythonize(
-        ext,
+        exts,
         compiler_directives={
             "language_level": "3",
             "boundscheck": False,